@@ -0,0 +1,118 @@
+# Asynchronous evaluation of compiled expressions
+#
+# Variables bound to coroutines (or coroutine functions) are resolved
+# concurrently before the expression is evaluated, so the latency of an
+# evaluation is the one of its slowest variable instead of their sum. Other
+# variables that resolve to an awaitable, e.g. through a dynamic variable or a
+# callable object with an `async def __call__`, are awaited when the
+# evaluation reaches them.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import asyncio
+import inspect
+from collections import ChainMap
+
+import syntaxtree
+from prattparser import Expression, ParserError, Scope
+
+
+class Pending(Exception):
+    """
+    Raised by an `AwaitingScope` to suspend an evaluation until the awaitable
+    a variable resolved to is awaited.
+    """
+    def __init__(self, name: str, awaitable):
+        super().__init__(name)
+        self.name = name
+        self.awaitable = awaitable
+
+
+class AwaitingScope(Scope):
+    """
+    A scope that raises `Pending` for the variables whose value, or the value
+    returned by their resolver, is awaitable. The variables resolved before
+    are kept, the evaluation is started again once the value is awaited.
+    """
+    def __missing__(self, name: str):
+        value = self.runtime.get(name)
+        if not callable(value) and inspect.isawaitable(value):
+            raise Pending(name, value)
+        return super().__missing__(name)
+
+    def resolve(self, name: str, resolver):
+        value = super().resolve(name, resolver)
+        if inspect.isawaitable(value):
+            raise Pending(name, value)
+        return value
+
+
+def is_async(value) -> bool:
+    return inspect.iscoroutinefunction(value) or inspect.isawaitable(value)
+
+
+async def resolve(name: str, value, timeout: float, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        awaitable = value() if inspect.iscoroutinefunction(value) else value
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except TimeoutError:
+            raise ParserError(f'timeout when resolving variable [{name}] after [{timeout}s]')
+
+
+async def resolve_all(names: list[str], runtime: dict, timeout: float = None, concurrency: int = None) -> dict:
+    """
+    Resolves concurrently the variables of `names` bound to a coroutine function
+    or an awaitable in `runtime`, returns a dictionary with their values.
+    """
+    pending = {name: runtime[name] for name in names if name in runtime and is_async(runtime[name])}
+    if not pending:
+        return {}
+
+    semaphore = asyncio.Semaphore(concurrency or len(pending))
+    tasks = [asyncio.ensure_future(resolve(name, value, timeout, semaphore)) for name, value in pending.items()]
+    try:
+        values = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    return dict(zip(pending, values))
+
+
+async def evaluate_async(expression: Expression, runtime: dict = None, timeout: float = None,
+                         concurrency: int = None) -> any:
+    """
+    Evaluates `expression` after resolving concurrently all of its variables
+    bound to coroutines:
+        ```
+        async def price():
+            return await store.get('price')
+
+        await evaluate_async(expression, {'price': price, 'amount': 3}, timeout=1.0)
+        ```
+
+    `timeout` limits (in seconds) the time to resolve each variable and
+    `concurrency` limits how many variables are resolved at the same time.
+    Variables that are not asynchronous are resolved as in `Expression.evaluate`.
+    Awaitables found while evaluating, e.g. returned by a dynamic variable, are
+    awaited one at a time, when the evaluation reaches them.
+    """
+    runtime = {} if runtime is None else runtime
+    names = syntaxtree.variables(expression.tree)
+    resolved = await resolve_all(names, runtime, timeout, concurrency)
+
+    backend = expression.backend
+    scope = AwaitingScope(ChainMap(resolved, runtime), None if backend is None else backend.convert)
+    semaphore = asyncio.Semaphore(1)
+    while True:
+        try:
+            if backend is None:
+                return expression.evaluate_scope(scope)
+            with backend.activate():
+                return expression.evaluate_scope(scope)
+        except Pending as pending:
+            resolved[pending.name] = await resolve(pending.name, pending.awaitable, timeout, semaphore)
@@ -0,0 +1,142 @@
+# Batch evaluation of expressions in a pool of processes
+#
+# Every distinct expression of a batch is compiled once, in the calling
+# process, and its tree is shipped once to each worker when the worker starts.
+# The (expression, runtime) pairs are then sent in chunks that only reference
+# the expressions by index, a few chunks at a time, and the results are
+# yielded chunk by chunk.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+
+from prattparser import Expression, Parser, ParserError
+from registry import DEFAULT_FUNCTIONS, FunctionRegistry
+from syntaxtree import Node
+from tokenizer import TokenizerError
+
+# exactly one of `value` and `error` is set
+Result = namedtuple('Result', 'value error')
+
+# errors reported per item instead of failing the whole batch
+ITEM_ERRORS = (ParserError, TokenizerError, ArithmeticError, ValueError, TypeError)
+
+# expressions of the batch, set in each pool worker by `init_worker`
+_expressions: list[Expression] = []
+
+
+def init_worker(sources: list[str], trees: list[Node], functions: FunctionRegistry):
+    global _expressions
+    _expressions = [Expression(source, tree, functions) for source, tree in zip(sources, trees)]
+
+
+def evaluate_items(expressions: list[Expression], items: Iterable[tuple[int, dict]]) -> list[Result]:
+    results = []
+    for index, runtime in items:
+        try:
+            results.append(Result(expressions[index].evaluate(runtime), None))
+        except ITEM_ERRORS as error:
+            results.append(Result(None, error))
+    return results
+
+
+def evaluate_chunk(chunk: list[tuple[int, dict]]) -> list[Result]:
+    return evaluate_items(_expressions, chunk)
+
+
+def compile_batch(pairs: Iterable[tuple[str, dict]], parser: Parser) -> tuple[list, list, list]:
+    """
+    Compiles the distinct sources of `pairs`. Returns the compiled expressions,
+    the items as `(expression index, runtime)` and the compile errors as
+    `(item position, error)`.
+    """
+    indexes: dict[str, int] = {}
+    expressions: list[Expression] = []
+    items: list[tuple[int, dict]] = []
+    errors: list[tuple[int, Exception]] = []
+    failed: dict[str, Exception] = {}
+
+    for position, (source, runtime) in enumerate(pairs):
+        if source in failed:
+            errors.append((position, failed[source]))
+            continue
+
+        if source not in indexes:
+            try:
+                expressions.append(parser.compile(source))
+            except (ParserError, TokenizerError) as error:
+                failed[source] = error
+                errors.append((position, error))
+                continue
+            indexes[source] = len(expressions) - 1
+
+        items.append((indexes[source], runtime))
+
+    return expressions, items, errors
+
+
+def evaluate_many(pairs: Iterable[tuple[str, dict]], workers: int = None, chunksize: int = 1024,
+                  functions: FunctionRegistry = DEFAULT_FUNCTIONS) -> list[Result]:
+    """
+    Evaluates every `(expression, runtime)` pair of `pairs` in a pool of
+    `workers` processes (as many as CPUs by default). Returns one `Result` per
+    pair, in the same order:
+        ```
+        results = evaluate_many([('a + 1', {'a': 1}), ('1 / a', {'a': 0})], workers=4)
+        # [Result(value=2.0, error=None), Result(value=None, error=ZeroDivisionError(...))]
+        ```
+
+    Errors, e.g. a `ParserError` or a `TokenizerError`, are reported in the
+    result of their item. With `workers=1` the batch is evaluated in the calling
+    process. Functions and runtimes must be picklable to reach the workers.
+    See `iter_evaluate` to process the results as they are computed.
+    """
+    return list(iter_evaluate(pairs, workers, chunksize, functions))
+
+
+def iter_evaluate(pairs: Iterable[tuple[str, dict]], workers: int = None, chunksize: int = 1024,
+                  functions: FunctionRegistry = DEFAULT_FUNCTIONS) -> Iterator[Result]:
+    """
+    As `evaluate_many`, but yields the results in order, chunk by chunk. At
+    most two chunks per worker are in flight, so the results held in memory do
+    not depend on the size of the batch:
+        ```
+        for result in iter_evaluate(pairs, workers=4):
+            print(result.value)
+        ```
+    """
+    expressions, items, errors = compile_batch(pairs, Parser(functions=functions))
+    chunks = (items[start:start + chunksize] for start in range(0, len(items), chunksize))
+
+    # the calling process keeps the expressions of its batch local, batches may
+    # run concurrently or nest
+    if workers == 1:
+        results = (result for chunk in chunks for result in evaluate_items(expressions, chunk))
+    else:
+        results = evaluate_in_pool(expressions, chunks, workers, functions)
+
+    # put the compile errors back in the position of their items
+    failed = dict(errors)
+    for position in range(len(items) + len(errors)):
+        yield Result(None, failed[position]) if position in failed else next(results)
+
+
+def evaluate_in_pool(expressions: list[Expression], chunks: Iterable[list], workers: int,
+                     functions: FunctionRegistry) -> Iterator[Result]:
+    sources = [expression.source for expression in expressions]
+    trees = [expression.tree for expression in expressions]
+    window = 2 * (workers or os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(sources, trees, functions)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(evaluate_chunk, chunk))
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,42 @@
+# Process pool batch evaluation benchmark
+#
+# Evaluates the same batch of (expression, runtime) pairs with an increasing
+# number of worker processes and reports the speedup over a single process.
+#
+#   python benchmarks/bench_batch.py
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from batch import evaluate_many  # noqa: E402
+
+EXPRESSIONS = [
+    '5 * (sqrt(y) + sin(2 * x)) - x / 2 + max(x, y, 3) ^ 2',
+    'log(x + 10, 2) * pow(y, 2) - min(x, y) / (1 + x ^ 2)',
+    'sin(x) * cos(y) + tan(x / (y + 1)) - sqrt(x * y + 1)',
+]
+ITEMS = 400_000
+
+
+def main():
+    pairs = [(EXPRESSIONS[i % len(EXPRESSIONS)], {'x': i % 100, 'y': i % 7}) for i in range(ITEMS)]
+
+    baseline = None
+    print(f'{"workers":>8} {"seconds":>10} {"items/sec":>12} {"speedup":>8}')
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        evaluate_many(pairs, workers=workers, chunksize=4096)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f'{workers:>8} {elapsed:>10.3f} {ITEMS / elapsed:>12,.0f} {baseline / elapsed:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# Evaluation backends benchmark
+#
+# Compares evaluating the same expression with `Parser.parse`, with a compiled
+# `Expression` and with the function generated by `codegen.compile_function`,
+# using an equivalent hand-written lambda as reference.
+#
+#   python benchmarks/bench_codegen.py
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import math
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from codegen import compile_function  # noqa: E402
+from prattparser import Parser  # noqa: E402
+
+EXPRESSION = '5 * (sqrt(y) + sin(2 * x)) - x / 2 + max(x, y) ^ 2'
+RUNTIME = {'x': 1.5, 'y': 9.0}
+NUMBER = 20_000
+
+
+def main():
+    parser = Parser(RUNTIME)
+    expression = parser.compile(EXPRESSION)
+    function = compile_function(expression)
+
+    candidates = {
+        'Parser.parse': lambda: parser.parse(EXPRESSION),
+        'Expression.evaluate': lambda: expression.evaluate(RUNTIME),
+        'compile_function': lambda: function(RUNTIME),
+        'hand-written lambda': lambda: (
+            5 * (math.sqrt(RUNTIME['y']) + math.sin(2 * RUNTIME['x'])) - RUNTIME['x'] / 2 + max(
+                RUNTIME['x'], RUNTIME['y']) ** 2),
+    }
+
+    print(f'{"backend":<22} {"usec/call":>10} {"calls/sec":>14}')
+    for name, candidate in candidates.items():
+        elapsed = min(timeit.repeat(candidate, number=NUMBER, repeat=3))
+        print(f'{name:<22} {elapsed / NUMBER * 1e6:>10.2f} {NUMBER / elapsed:>14,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# Recursive vs iterative parser benchmark
+#
+# Compares the parsing throughput of the recursive Pratt parser with the
+# explicit stack one (`Parser(iterative=True)`), on a regular expression and on
+# nested expressions deeper than the recursion limit.
+#
+#   python benchmarks/bench_iterative.py
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from prattparser import Parser  # noqa: E402
+
+EXPRESSION = '5 * (sqrt(y) + sin(2 * x)) - x / 2 + max(x, y, 3) ^ 2 ^ -1'
+NUMBER = 5_000
+DEPTHS = [100, 10_000, 100_000]
+
+
+def nested(depth: int) -> str:
+    return '1 + (' * depth + 'x' + ')' * depth
+
+
+def bench_regular():
+    print(f'{"parser":<12} {"usec/parse":>12}')
+    for iterative in (False, True):
+        parser = Parser(iterative=iterative)
+        elapsed = min(timeit.repeat(lambda: parser.compile(EXPRESSION), number=NUMBER, repeat=3))
+        print(f'{"iterative" if iterative else "recursive":<12} {elapsed / NUMBER * 1e6:>12.2f}')
+
+
+def bench_nested():
+    print(f'\n{"depth":>8} {"recursive (s)":>14} {"iterative (s)":>14}')
+    for depth in DEPTHS:
+        expression = nested(depth)
+        results = []
+        for iterative in (False, True):
+            start = time.perf_counter()
+            try:
+                Parser(iterative=iterative).compile(expression)
+                results.append(f'{time.perf_counter() - start:.4f}')
+            except RecursionError:
+                results.append('RecursionError')
+        print(f'{depth:>8} {results[0]:>14} {results[1]:>14}')
+
+
+if __name__ == '__main__':
+    bench_regular()
+    bench_nested()
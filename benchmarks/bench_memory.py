@@ -0,0 +1,54 @@
+# Memory benchmark of compiled expressions
+#
+# Compares the memory held by many compiled expressions as trees of `Node`s
+# (`Expression`) and as flat postfix `Program`s, measured with tracemalloc.
+#
+#   python benchmarks/bench_memory.py
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from prattparser import Parser  # noqa: E402
+from program import Program  # noqa: E402
+
+COUNT = 20_000
+TEMPLATE = '5 * (sqrt(y{i}) + sin(2 * x{i})) - x{i} / {i} + max(x{i}, y{i}, 3) ^ 2'
+
+
+def measure(build) -> tuple[int, list]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, objects
+
+
+def main():
+    parser = Parser()
+    sources = [TEMPLATE.format(i=i) for i in range(COUNT)]
+    expressions = [parser.compile(source) for source in sources]
+
+    # only the compiled form is measured, the sources are shared by both
+    tree_size, _ = measure(lambda: [parser.compile(source).tree for source in sources])
+    program_size, programs = measure(lambda: [Program.from_expression(expression) for expression in expressions])
+    bytes_size = sum(len(program.to_bytes()) for program in programs)
+
+    print(f'{COUNT} expressions, {len(programs[0])} instructions each')
+    print(f'{"representation":<16} {"total (KiB)":>12} {"per expression (B)":>20}')
+    for name, size in [('Node tree', tree_size), ('Program', program_size), ('Program bytes', bytes_size)]:
+        print(f'{name:<16} {size / 1024:>12,.0f} {size / COUNT:>20,.0f}')
+
+
+if __name__ == '__main__':
+    main()
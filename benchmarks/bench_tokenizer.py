@@ -0,0 +1,44 @@
+# Tokenizer scaling benchmark
+#
+# Tokenizes expressions from 10k to 1M characters and reports the throughput
+# for each size. A linear tokenizer keeps the characters/sec roughly constant
+# as the input grows.
+#
+#   python benchmarks/bench_tokenizer.py
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tokenizer import Tokenizer  # noqa: E402
+
+SIZES = [10_000, 100_000, 1_000_000]
+TERM = 'sin(x_1) * 2.5 +   max(y, 3) ^ 2 - '
+
+
+def make_expression(size: int) -> str:
+    return (TERM * (size // len(TERM) + 1))[:size - 1] + '1'
+
+
+def bench(size: int) -> tuple[int, float]:
+    expression = make_expression(size)
+    start = time.perf_counter()
+    tokens = sum(1 for _ in Tokenizer(expression))
+    return tokens, time.perf_counter() - start
+
+
+def main():
+    print(f'{"chars":>10} {"tokens":>10} {"seconds":>10} {"chars/sec":>14}')
+    for size in SIZES:
+        tokens, elapsed = bench(size)
+        print(f'{size:>10} {tokens:>10} {elapsed:>10.4f} {size / elapsed:>14,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# Synthetic expression generator for the benchmark suite
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import random
+from collections import namedtuple
+
+# `length` is the number of terms at the top level of the expression, `depth`
+# the maximum nesting of parentheses and function calls, `function_density`
+# the probability of a nested term being a function call and `variables` the
+# number of distinct variables
+GeneratorConfig = namedtuple('GeneratorConfig', 'length depth function_density variables',
+                             defaults=(20, 3, 0.3, 5))
+
+# functions and operators that never fail or overflow on the generated values
+FUNCTIONS: list[tuple[str, int]] = [('sin', 1), ('cos', 1), ('max', 2), ('min', 3)]
+OPERATORS: list[str] = ['+', '-', '*']
+NESTED_WIDTH = 3
+
+
+class ExpressionGenerator:
+    def __init__(self, config: GeneratorConfig = GeneratorConfig(), seed: int = 0):
+        self.config = config
+        self.random = random.Random(seed)
+        self.names = [f'x{i}' for i in range(config.variables)]
+
+    def runtime(self) -> dict[str, float]:
+        return {name: self.random.uniform(-2, 2) for name in self.names}
+
+    def leaf(self) -> str:
+        if self.names and self.random.random() < 0.5:
+            return self.random.choice(self.names)
+        return f'{self.random.randint(0, 9)}.{self.random.randint(0, 99)}'
+
+    def term(self, depth: int) -> str:
+        if depth <= 0 or self.random.random() < 0.4:
+            return self.leaf()
+
+        if self.random.random() < self.config.function_density:
+            name, arity = self.random.choice(FUNCTIONS)
+            return f'{name}({", ".join(self.terms(NESTED_WIDTH, depth - 1) for _ in range(arity))})'
+
+        return f'({self.terms(NESTED_WIDTH, depth - 1)})'
+
+    def terms(self, length: int, depth: int) -> str:
+        parts = [self.term(depth)]
+        for _ in range(length - 1):
+            parts.append(self.random.choice(OPERATORS))
+            parts.append(self.term(depth))
+        return ' '.join(parts)
+
+    def expression(self) -> str:
+        return self.terms(self.config.length, self.config.depth)
+
+
+def generate(count: int, config: GeneratorConfig = GeneratorConfig(), seed: int = 0) -> list[tuple[str, dict]]:
+    """
+    Generates `count` pairs of (expression, runtime), the same seed always
+    generates the same pairs.
+    """
+    generator = ExpressionGenerator(config, seed)
+    return [(generator.expression(), generator.runtime()) for _ in range(count)]
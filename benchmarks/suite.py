@@ -0,0 +1,140 @@
+# Benchmark suite of the tokenizer, parser and evaluation hot paths
+#
+# Runs every benchmark on the same synthetic workload and reports, separately,
+# tokens/sec, parses/sec and evaluations/sec. Results can be saved as a JSON
+# baseline and later runs compared against it:
+#
+#   python -m benchmarks --save baseline.json
+#   python -m benchmarks --compare baseline.json --threshold 0.1
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import argparse
+import json
+import platform
+import sys
+import time
+from typing import Callable
+
+from benchmarks.generator import GeneratorConfig, generate
+from codegen import compile_function
+from prattparser import Parser
+from program import Program
+from tokenizer import Tokenizer
+
+FORMAT_VERSION = 1
+
+
+def best_rate(operations: int, run: Callable, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return operations / best
+
+
+def run_suite(pairs: list[tuple[str, dict]], repeat: int = 3) -> dict[str, float]:
+    """
+    Returns the throughput, in operations per second, of each benchmark.
+    """
+    parser = Parser()
+    sources = [source for source, _ in pairs]
+    runtimes = [runtime for _, runtime in pairs]
+    expressions = [parser.compile(source) for source in sources]
+    functions = [compile_function(expression) for expression in expressions]
+    programs = [Program.from_expression(expression) for expression in expressions]
+    tokens = sum(1 for source in sources for _ in Tokenizer(source))
+
+    def tokenize():
+        for source in sources:
+            for _ in Tokenizer(source):
+                pass
+
+    def evaluate(evaluators: list):
+        for evaluator, runtime in zip(evaluators, runtimes):
+            evaluator(runtime)
+
+    return {
+        'tokens/sec': best_rate(tokens, tokenize, repeat),
+        'parses/sec': best_rate(len(sources), lambda: [parser.compile(source) for source in sources], repeat),
+        'evaluations/sec': best_rate(len(pairs), lambda: evaluate([e.evaluate for e in expressions]), repeat),
+        'function evaluations/sec': best_rate(len(pairs), lambda: evaluate(functions), repeat),
+        'program evaluations/sec': best_rate(len(pairs), lambda: evaluate([p.evaluate for p in programs]), repeat),
+        'parse+evaluate/sec': best_rate(len(pairs), lambda: [Parser(runtime).parse(source)
+                                                             for source, runtime in pairs], repeat),
+    }
+
+
+def report(config: GeneratorConfig, count: int, seed: int, results: dict[str, float]) -> dict:
+    return {
+        'version': FORMAT_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workload': {'count': count, 'seed': seed, **config._asdict()},
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[tuple[str, float, float, float]]:
+    """
+    Returns the benchmarks slower than the baseline by more than `threshold`
+    (a fraction, e.g. 0.1 for 10%), as `(name, baseline, current, ratio)`.
+    """
+    regressions = []
+    for name, expected in baseline['results'].items():
+        actual = current['results'].get(name)
+        if actual is None:
+            continue
+        ratio = actual / expected
+        if ratio < 1 - threshold:
+            regressions.append((name, expected, actual, ratio))
+    return regressions
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
+    defaults = GeneratorConfig()
+    arguments = argparse.ArgumentParser(description='Benchmarks the tokenizer, parser and evaluation.')
+    arguments.add_argument('--count', type=int, default=500, help='number of generated expressions')
+    arguments.add_argument('--length', type=int, default=defaults.length, help='top level terms per expression')
+    arguments.add_argument('--depth', type=int, default=defaults.depth, help='maximum nesting depth')
+    arguments.add_argument('--function-density', type=float, default=defaults.function_density,
+                           help='probability of a nested term being a function call')
+    arguments.add_argument('--variables', type=int, default=defaults.variables, help='distinct variables')
+    arguments.add_argument('--seed', type=int, default=0)
+    arguments.add_argument('--repeat', type=int, default=3, help='runs per benchmark, the best one is kept')
+    arguments.add_argument('--save', help='write the results to this JSON file')
+    arguments.add_argument('--compare', help='compare the results with this JSON baseline')
+    arguments.add_argument('--threshold', type=float, default=0.1,
+                           help='slowdown tolerated when comparing with the baseline (fraction)')
+    return arguments
+
+
+def main(argv: list[str] = None) -> int:
+    args = build_argument_parser().parse_args(argv)
+    config = GeneratorConfig(args.length, args.depth, args.function_density, args.variables)
+    pairs = generate(args.count, config, args.seed)
+
+    current = report(config, args.count, args.seed, run_suite(pairs, args.repeat))
+    for name, rate in current['results'].items():
+        print(f'{name:<26} {rate:>16,.0f}')
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(current, file, indent=2)
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare) as file:
+        baseline = json.load(file)
+
+    if baseline['workload'] != current['workload']:
+        print('warning: the baseline was measured on a different workload', file=sys.stderr)
+
+    regressions = compare(baseline, current, args.threshold)
+    for name, expected, actual, ratio in regressions:
+        print(f'REGRESSION {name}: {actual:,.0f} vs {expected:,.0f} ({ratio - 1:+.1%})')
+    return 1 if regressions else 0
@@ -0,0 +1,88 @@
+# Bounded LRU cache of compiled expressions
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Callable
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses evictions maxsize currsize')
+
+
+class ExpressionCache:
+    """
+    Least recently used cache of compiled expressions keyed by their source,
+    or by any hashable key that identifies how they were compiled.
+
+    A `Parser` created with a cache looks the input up before tokenizing it, so
+    repeated expressions skip the `Tokenizer` and the Pratt recursion:
+        ```
+        cache = ExpressionCache(maxsize=1024)
+        parser = Parser(runtime, cache=cache)
+        ```
+
+    The cache holds at most `maxsize` expressions, the least recently used one
+    is evicted when it is full. A single cache can be shared by many parsers
+    and threads: a parser keys its expressions by their source, its function
+    registry and its numeric backend (see `Parser.cache_key`), so parsers with
+    different functions or number types never reuse each other's expressions.
+    """
+    def __init__(self, maxsize: int = 128):
+        if maxsize <= 0:
+            raise ValueError(f'cache maxsize must be positive: [{maxsize}]')
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expression = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return expression
+
+    def put(self, key, expression):
+        with self._lock:
+            self._entries[key] = expression
+            self._entries.move_to_end(key)
+
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # the expression is compiled outside the lock, concurrent misses of the same
+    # source may compile it more than once but never block other lookups.
+    # `key` defaults to the source
+    def get_or_compile(self, source: str, compile: Callable, key=None):
+        key = source if key is None else key
+        expression = self.get(key)
+        if expression is None:
+            expression = compile(source)
+            self.put(key, expression)
+        return expression
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._entries))
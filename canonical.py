@@ -0,0 +1,178 @@
+# Canonical forms and structural fingerprints of expressions
+#
+# Sources that differ only by whitespace or redundant parentheses, e.g.
+# `a + b*2` and `(a)+(b * 2)`, compile to the same tree. Their canonical source
+# is printed from that tree, and their fingerprint is a hash of it. With
+# alpha-renaming, variables are also renamed by order of appearance, so
+# `x * y + x` and `a * b + a` share the canonical source `_0 * _1 + _0`.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import hashlib
+import threading
+from collections import namedtuple
+
+import syntaxtree
+from prattparser import Expression, Parser, ParserError
+from tokenizer import TokenType
+
+# `variables` are the original names of the renamed variables, `_<i>` stands
+# for `variables[i]` (empty without renaming)
+Canonical = namedtuple('Canonical', 'source tree variables fingerprint')
+
+IndexStats = namedtuple('IndexStats', 'sources structures')
+
+
+def canonical_name(index: int) -> str:
+    return f'_{index}'
+
+
+def canonicalize(expression: Expression, rename: bool = False) -> Canonical:
+    """
+    Returns the canonical form of `expression`:
+        ```
+        canonicalize(Parser().compile('(a)+(b * 2)'))
+        # Canonical(source='a + b * 2.0', tree=..., variables=(), fingerprint='...')
+        canonicalize(Parser().compile('x * y + x'), rename=True).source
+        # '_0 * _1 + _0'
+        ```
+
+    The fingerprint also covers the definitions of the functions and operators
+    and the numeric backend, the same source compiled with other functions or
+    another number type has another fingerprint.
+    """
+    tree = expression.tree
+    names = ()
+    if rename:
+        names = tuple(syntaxtree.variables(tree))
+        renamed = {name: canonical_name(index) for index, name in enumerate(names)}
+        tree = syntaxtree.map_leaves(tree, lambda leaf: leaf._replace(value=renamed[leaf.value])
+                                     if leaf.type == TokenType.IDENTIFIER else leaf)
+
+    source = syntaxtree.to_source(tree)
+    backend = b'' if expression.backend is None else expression.backend.fingerprint()
+    digest = hashlib.sha256(expression.functions.fingerprint() + b'\0' + backend + b'\0' + source.encode())
+    return Canonical(source, tree, names, digest.hexdigest()[:32])
+
+
+def fingerprint(expression: Expression, rename: bool = False) -> str:
+    return canonicalize(expression, rename).fingerprint
+
+
+class Renamed:
+    """
+    A read-only view of a runtime under canonical names: `_<i>` reads the
+    variable `variables[i]` and other names are read unchanged.
+    """
+    __slots__ = ('runtime', 'variables')
+
+    def __init__(self, runtime: dict[str, any], variables: tuple[str]):
+        self.runtime = runtime
+        self.variables = variables
+
+    def __getitem__(self, name: str):
+        original = self.original(name)
+        try:
+            return self.runtime[original]
+        except KeyError:
+            raise ParserError(f'cannot resolve variable [{original}]')
+
+    def original(self, name: str) -> str:
+        if name.startswith('_') and name[1:].isdigit() and int(name[1:]) < len(self.variables):
+            return self.variables[int(name[1:])]
+        return name
+
+
+class Member:
+    """
+    A source of a `StructureIndex`: the shared compiled form of its structure
+    and the names of its own variables.
+    """
+    __slots__ = ('source', 'expression', 'variables')
+
+    def __init__(self, source: str, expression: Expression, variables: tuple[str]):
+        self.source = source
+        self.expression = expression
+        self.variables = variables
+
+    def __repr__(self):
+        return f'Member({self.source!r} -> {self.expression.source!r})'
+
+    def evaluate(self, runtime: dict[str, float] = None) -> any:
+        if not self.variables:
+            return self.expression.evaluate(runtime)
+        return self.expression.evaluate(Renamed({} if runtime is None else runtime, self.variables))
+
+
+class StructureIndex:
+    """
+    Maps sources to one shared compiled form per structure:
+        ```
+        index = StructureIndex(rename=True)
+        first = index.add('a + b*2')
+        second = index.add('(x)+(y * 2)')
+        first.expression is second.expression  # True
+        second.evaluate({'x': 1, 'y': 3})       # 7.0
+        index.stats()                           # IndexStats(sources=2, structures=1)
+        ```
+
+    Each distinct source is compiled once, to find its structure. The shared
+    compiled form holds the canonical tree and source, so caches and batch jobs
+    keyed by `Member.expression` (or its source) only see unique structures.
+    The index can be shared by threads.
+    """
+    def __init__(self, parser: Parser = None, rename: bool = False):
+        self.parser = parser or Parser()
+        self.rename = rename
+        self.members: dict[str, Member] = {}
+        self.structures: dict[str, Expression] = {}
+        self.sources: dict[str, list[str]] = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.structures)
+
+    def __contains__(self, source: str):
+        return source in self.members
+
+    def add(self, source: str) -> Member:
+        member = self.members.get(source)
+        if member is not None:
+            return member
+
+        compiled = self.parser.compile(source)
+        canonical = canonicalize(compiled, self.rename)
+        with self.lock:
+            member = self.members.get(source)
+            if member is not None:
+                return member
+
+            expression = self.structures.get(canonical.fingerprint)
+            if expression is None:
+                expression = Expression(canonical.source, canonical.tree, compiled.functions, compiled.backend)
+                self.structures[canonical.fingerprint] = expression
+                self.sources[canonical.fingerprint] = []
+
+            member = self.members[source] = Member(source, expression, canonical.variables)
+            self.sources[canonical.fingerprint].append(source)
+        return member
+
+    def compile(self, source: str) -> Expression:
+        """
+        Returns the shared compiled form of `source`. With renaming its variables
+        are the canonical ones, use `add(source).evaluate` to evaluate it with
+        the names of `source`.
+        """
+        return self.add(source).expression
+
+    def groups(self) -> dict[str, list[str]]:
+        """
+        Returns the sources of each structure, by fingerprint.
+        """
+        with self.lock:
+            return {fingerprint: list(sources) for fingerprint, sources in self.sources.items()}
+
+    def stats(self) -> IndexStats:
+        return IndexStats(len(self.members), len(self.structures))
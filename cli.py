@@ -0,0 +1,148 @@
+# Command line evaluator for newline-delimited expression files
+#
+# Reads one expression per line from files or stdin and writes one result per
+# line, as it goes:
+#
+#   python cli.py expressions.txt
+#   cat expressions.jsonl | python cli.py --json --keep-going
+#
+# Lines are processed by a pipeline of generators, so the memory used does not
+# depend on the size of the input.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import argparse
+import json
+import sys
+from collections import namedtuple
+from typing import Iterable, Iterator, TextIO
+
+from batch import ITEM_ERRORS, Result
+from cache import ExpressionCache
+from prattparser import Parser
+
+
+# a line of the input, `error` is set when the line cannot be read
+Record = namedtuple('Record', 'line_number expression runtime error', defaults=(None, None, None))
+
+
+def read_lines(paths: list[str], stdin: TextIO) -> Iterator[str]:
+    for path in paths:
+        if path == '-':
+            yield from stdin
+            continue
+
+        with open(path) as file:
+            yield from file
+
+
+# plain lines hold an expression, JSON lines an object with the keys
+# `expression` and (optionally) `runtime`
+def parse_records(lines: Iterable[str], is_json: bool, runtime: dict) -> Iterator[Record]:
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            yield Record(line_number)
+            continue
+
+        if not is_json:
+            yield Record(line_number, line, runtime)
+            continue
+
+        try:
+            document = json.loads(line)
+            yield Record(line_number, document['expression'], {**runtime, **document.get('runtime', {})})
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            yield Record(line_number, error=ValueError(f'invalid JSON record: {error}'))
+
+
+def evaluate_records(records: Iterable[Record], parser: Parser) -> Iterator[tuple[Record, Result]]:
+    for record in records:
+        if record.error is not None:
+            yield record, Result(None, record.error)
+            continue
+
+        if record.expression is None:
+            yield record, Result(None, None)
+            continue
+
+        try:
+            yield record, Result(parser.compile(record.expression).evaluate(record.runtime), None)
+        except (*ITEM_ERRORS, RecursionError) as error:
+            yield record, Result(None, error)
+
+
+# values JSON has no type for, e.g. complex numbers or the `Decimal` and
+# `Fraction` of the numeric backends, are written as strings
+def format_result(result: Result, is_json: bool) -> str:
+    if is_json:
+        if result.error is not None:
+            return json.dumps({'error': str(result.error)}) + '\n'
+        return json.dumps({'value': result.value}, default=str) + '\n'
+
+    if result.error is not None:
+        return f'ERROR: {result.error}\n'
+    return '\n' if result.value is None else f'{result.value}\n'
+
+
+# the lines already produced are written even if producing the next one fails
+def write_buffered(lines: Iterable[str], output: TextIO, buffer_size: int):
+    chunk = []
+    try:
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= buffer_size:
+                output.writelines(chunk)
+                chunk.clear()
+    finally:
+        output.writelines(chunk)
+        output.flush()
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
+    arguments = argparse.ArgumentParser(description='Evaluates one math expression per line.')
+    arguments.add_argument('files', nargs='*', default=['-'], help='input files, `-` (default) reads stdin')
+    arguments.add_argument('--json', action='store_true',
+                           help='lines are JSON objects: {"expression": "...", "runtime": {...}}')
+    arguments.add_argument('--runtime', help='JSON file with the variables shared by all expressions')
+    arguments.add_argument('--keep-going', action='store_true',
+                           help='report errors in the output and continue with the next line')
+    arguments.add_argument('--buffer-size', type=int, default=1024, help='number of results written at once')
+    arguments.add_argument('--cache-size', type=int, default=1024, help='number of compiled expressions kept')
+    return arguments
+
+
+def main(argv: list[str] = None, stdin: TextIO = None, stdout: TextIO = None, stderr: TextIO = None) -> int:
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    args = build_argument_parser().parse_args(argv)
+
+    runtime = {}
+    if args.runtime:
+        with open(args.runtime) as file:
+            runtime = json.load(file)
+
+    # deeply nested lines are parsed without recursion
+    parser = Parser(cache=ExpressionCache(args.cache_size), iterative=True)
+    records = parse_records(read_lines(args.files, stdin), args.json, runtime)
+    failures = 0
+
+    def results():
+        nonlocal failures
+        for record, result in evaluate_records(records, parser):
+            if result.error is not None:
+                failures += 1
+                if not args.keep_going:
+                    stderr.write(f'line {record.line_number}: {result.error}\n')
+                    return
+            yield format_result(result, args.json)
+
+    write_buffered(results(), stdout, args.buffer_size)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
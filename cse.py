@@ -0,0 +1,180 @@
+# Common subexpression elimination across a group of expressions
+#
+# Compiles many expressions into one DAG where identical subtrees are a single
+# node (hash-consing), e.g. `sqrt(a^2 + b^2)` in
+#
+#   sqrt(a^2 + b^2) / 2
+#   max(sqrt(a^2 + b^2), c)
+#
+# is evaluated once per runtime and its value is shared by both expressions.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import operator
+from collections import namedtuple
+from typing import Iterable
+
+import syntaxtree
+from batch import ITEM_ERRORS, Result
+from prattparser import Expression, Parser, ParserError, Scope
+from registry import OPERATORS
+from syntaxtree import Node
+from tokenizer import TokenType
+
+# `tree_nodes` is the number of nodes of the expressions compiled separately,
+# `dag_nodes` the number of nodes once identical subtrees are merged and
+# `shared_nodes` the number of DAG nodes used more than once
+DedupStats = namedtuple('DedupStats', 'expressions tree_nodes dag_nodes deduplicated shared_nodes')
+
+# kinds of DAG nodes, the payload of CONST is the number, of LOAD the variable
+# name and of CALL the callable applied to the values of the children
+CONST, LOAD, CALL = range(3)
+
+
+def number_key(value) -> tuple:
+    # 1.0 and 1 or 0.0 and -0.0 are equal but may not be interchangeable, NaN is
+    # not equal to itself
+    return type(value), value.hex() if isinstance(value, float) else value
+
+
+class ExpressionGroup:
+    """
+    A group of expressions compiled into a single DAG of shared subtrees:
+        ```
+        group = compile_group(['sqrt(a^2 + b^2) / 2', 'max(sqrt(a^2 + b^2), c)'])
+        group.evaluate({'a': 3, 'b': 4, 'c': 1})  # [2.5, 5.0], sqrt(...) is computed once
+        group.stats  # DedupStats(expressions=2, tree_nodes=20, dag_nodes=10, deduplicated=10, shared_nodes=7)
+        ```
+
+    Each node of the DAG is evaluated once per runtime, children before
+    parents, and dynamic variables are resolved once for the whole group.
+    Subtrees are merged only when they call the same callables, so expressions
+    compiled with different function registries can be grouped together.
+    The expressions of a group must share their `numeric.Backend`, the group
+    is computed with its number type.
+    """
+    def __init__(self, expressions: Iterable[Expression]):
+        self.expressions: list[Expression] = list(expressions)
+        backends = {expression.backend for expression in self.expressions}
+        if len(backends) > 1:
+            raise ParserError(f'expressions of a group must share their numeric backend, found {backends}')
+        self.backend = backends.pop() if backends else None
+        # (kind, payload, child indexes), children always come before parents
+        self.nodes: list[tuple] = []
+        self.roots: list[int] = []
+        self.uses: list[int] = []
+        indexes: dict[tuple, int] = {}
+        tree_nodes = 0
+
+        for expression in self.expressions:
+            index, count = self.add(expression, indexes)
+            self.roots.append(index)
+            tree_nodes += count
+
+        dag_nodes = len(self.nodes)
+        self.stats = DedupStats(len(self.expressions), tree_nodes, dag_nodes, tree_nodes - dag_nodes,
+                                sum(1 for uses in self.uses if uses > 1))
+
+    def __len__(self):
+        return len(self.expressions)
+
+    def __repr__(self):
+        return f'ExpressionGroup({len(self.expressions)} expressions, {len(self.nodes)} nodes)'
+
+    # adds the tree of `expression`, in post-order, returns the index of its root
+    # and the number of nodes of the tree
+    def add(self, expression: Expression, indexes: dict[tuple, int]) -> tuple[int, int]:
+        functions = expression.functions
+        children_of: dict[int, int] = {}
+        count = 0
+        stack = [(expression.tree, False)]
+
+        while stack:
+            node, visited = stack.pop()
+            if node.children and not visited:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
+                continue
+
+            count += 1
+            if node.type == TokenType.NUMBER:
+                key, entry = (CONST, number_key(node.value)), (CONST, node.value, ())
+            elif node.type == TokenType.IDENTIFIER:
+                key, entry = (LOAD, node.value), (LOAD, node.value, ())
+            else:
+                children = tuple(children_of[id(child)] for child in node.children)
+                callable = self.callable_of(node, functions)
+                key, entry = (CALL, callable, children), (CALL, callable, children)
+
+            index = indexes.get(key)
+            if index is None:
+                index = indexes[key] = len(self.nodes)
+                self.nodes.append(entry)
+                self.uses.append(0)
+            self.uses[index] += 1
+            children_of[id(node)] = index
+
+        return children_of[id(expression.tree)], count
+
+    @staticmethod
+    def callable_of(node: Node, functions) -> callable:
+        if node.type == TokenType.FUNCTION:
+            return functions[node.value].callable
+        if syntaxtree.is_unary(node):
+            return operator.neg
+        return OPERATORS[node.type].callable
+
+    def evaluate_results(self, runtime: dict[str, float] = None) -> list[Result]:
+        """
+        Evaluates every expression of the group, returns one `Result` per
+        expression, in order. An error, e.g. a `ZeroDivisionError`, fails only
+        the expressions that contain the failing subtree.
+        """
+        if self.backend is None:
+            return self.evaluate_scope(Scope({} if runtime is None else runtime))
+
+        with self.backend.activate():
+            return self.evaluate_scope(self.backend.scope(runtime))
+
+    def evaluate_scope(self, scope: Scope) -> list[Result]:
+        values = []
+        errors: dict[int, Exception] = {}
+
+        for index, (kind, payload, children) in enumerate(self.nodes):
+            if errors:
+                failed = next((child for child in children if child in errors), None)
+                if failed is not None:
+                    errors[index] = errors[failed]
+                    values.append(None)
+                    continue
+
+            try:
+                if kind == CONST:
+                    values.append(payload)
+                elif kind == LOAD:
+                    values.append(scope[payload])
+                else:
+                    values.append(payload(*[values[child] for child in children]))
+            except ITEM_ERRORS as error:
+                errors[index] = error
+                values.append(None)
+
+        return [Result(None, errors[root]) if root in errors else Result(values[root], None) for root in self.roots]
+
+    def evaluate(self, runtime: dict[str, float] = None) -> list:
+        """
+        Returns the value of every expression of the group, in order. Raises the
+        error of the first expression that fails.
+        """
+        results = self.evaluate_results(runtime)
+        for result in results:
+            if result.error is not None:
+                raise result.error
+        return [result.value for result in results]
+
+
+def compile_group(sources: Iterable[str], parser: Parser = None) -> ExpressionGroup:
+    parser = parser or Parser()
+    return ExpressionGroup(parser.compile(source) for source in sources)
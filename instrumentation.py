@@ -0,0 +1,277 @@
+# Opt-in profiling of the tokenize, parse and evaluate phases
+#
+# A parser created with an `Instrumentation` times each phase of every
+# expression it handles and counts tokens, nodes, function calls and variable
+# lookups:
+#
+#   instrumentation = Instrumentation()
+#   parser = Parser(runtime, instrumentation=instrumentation)
+#   ...
+#   print(instrumentation.format_report())
+#
+# Parsers without instrumentation only pay for one `is None` check per compile
+# and per `parse`, the timed tokenizer, scope and functions are used only by
+# instrumented parsers.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import contextlib
+import threading
+from collections import namedtuple
+from time import perf_counter
+from typing import Callable
+
+import syntaxtree
+from prattparser import Expression, Scope, evaluate, evaluate_iterative, evaluate_lazy
+from registry import Function, FunctionRegistry
+from tokenizer import Token, Tokenizer, TokenPattern
+
+# passed to the hooks after each phase, `counters` maps a counter name to its
+# increment, e.g. {'tokens': 7}
+Event = namedtuple('Event', 'phase source elapsed counters')
+
+TOKENIZE, PARSE, EVALUATE = 'tokenize', 'parse', 'evaluate'
+
+
+class TimedTokenizer(Tokenizer):
+    def __init__(self, input: str, token_pattern: TokenPattern):
+        super().__init__(input, token_pattern)
+        self.elapsed = 0.0
+        self.tokens = 0
+
+    def get_next_token(self) -> Token:
+        started = perf_counter()
+        token = super().get_next_token()
+        self.elapsed += perf_counter() - started
+        if token is not None:
+            self.tokens += 1
+        return token
+
+
+class CountingScope(Scope):
+    def __init__(self, runtime: dict[str, any], convert: Callable[[any], any] = None):
+        super().__init__(runtime, convert)
+        self.lookups = 0
+        self.resolutions = 0
+        self.elapsed = 0.0
+
+    def __getitem__(self, name: str):
+        self.lookups += 1
+        return super().__getitem__(name)
+
+    # time spent resolving variables, including dynamic ones, the first time
+    # they are read
+    def __missing__(self, name: str):
+        self.resolutions += 1
+        # variables read by a dynamic variable are timed as part of it
+        if self.resolving:
+            return super().__missing__(name)
+
+        started = perf_counter()
+        try:
+            return super().__missing__(name)
+        finally:
+            self.elapsed += perf_counter() - started
+
+
+class TimedFunctions:
+    """
+    Stands for a `FunctionRegistry` during an evaluation, its callables count
+    and time their calls.
+    """
+    def __init__(self, functions: FunctionRegistry):
+        self.functions = functions
+        self.timed: dict[str, Function] = {}
+        self.calls = 0
+        self.elapsed = 0.0
+
+    def __getitem__(self, name: str) -> Function:
+        function = self.timed.get(name)
+        if function is None:
+            function = self.timed[name] = self.wrap(self.functions[name])
+        return function
+
+    def wrap(self, function: Function) -> Function:
+        callable, lazy = function.callable, function.lazy
+
+        def timed(*arguments):
+            started = perf_counter()
+            try:
+                return callable(*arguments)
+            finally:
+                self.elapsed += perf_counter() - started
+                self.calls += 1
+
+        # lazy calls are only counted, their time includes the evaluation of the
+        # arguments they force
+        def counted(*thunks):
+            self.calls += 1
+            return lazy(*thunks)
+
+        return function._replace(callable=timed, lazy=None if lazy is None else counted)
+
+
+class Profile:
+    """
+    What was measured for one expression (source), over all of its compilations
+    and evaluations. Times are in seconds.
+    """
+    __slots__ = ('source', 'compilations', 'evaluations', 'tokenize_time', 'parse_time', 'evaluate_time',
+                 'function_time', 'resolve_time', 'tokens', 'nodes', 'function_calls', 'variable_lookups',
+                 'variable_resolutions')
+
+    def __init__(self, source: str):
+        self.source = source
+        self.compilations = self.evaluations = 0
+        self.tokenize_time = self.parse_time = self.evaluate_time = 0.0
+        self.function_time = self.resolve_time = 0.0
+        self.tokens = self.nodes = 0
+        self.function_calls = self.variable_lookups = self.variable_resolutions = 0
+
+    @property
+    def total_time(self) -> float:
+        return self.tokenize_time + self.parse_time + self.evaluate_time
+
+    def __repr__(self):
+        return f'Profile({self.source!r}, total_time={self.total_time:.6f})'
+
+
+class Instrumentation:
+    """
+    Collects per-expression timers and counters from the parsers it is given to.
+
+    `hooks` are called with an `Event` after each phase (tokenize, parse and
+    evaluate) of each expression, e.g. to forward the measures to a metrics
+    system:
+        ```
+        def forward(event):
+            statsd.timing(f'expression.{event.phase}', event.elapsed)
+
+        parser = Parser(instrumentation=Instrumentation(hooks=[forward]))
+        ```
+
+    Expressions found in the parser cache are not tokenized nor parsed again,
+    only their evaluations are measured. An instrumentation can be shared by
+    parsers of different threads.
+
+    At most `max_profiles` expressions are profiled at once. When a new one
+    does not fit, the cheaper half of the profiles is dropped, so the report
+    keeps the most expensive expressions; `dropped` counts the profiles lost.
+    """
+    def __init__(self, hooks: list[Callable[[Event], None]] = (), max_profiles: int = 1024):
+        self.hooks = list(hooks)
+        self.profiles: dict[str, Profile] = {}
+        self.max_profiles = max_profiles
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def add_hook(self, hook: Callable[[Event], None]):
+        self.hooks.append(hook)
+
+    def clear(self):
+        with self.lock:
+            self.profiles.clear()
+            self.dropped = 0
+
+    # called with the lock held
+    def profile(self, source: str) -> Profile:
+        profile = self.profiles.get(source)
+        if profile is None:
+            if len(self.profiles) >= self.max_profiles:
+                self.evict()
+            profile = self.profiles[source] = Profile(source)
+        return profile
+
+    # keeps the most expensive half of the profiles, evicting in bulk makes the
+    # cost of a new profile constant on average
+    def evict(self):
+        kept = sorted(self.profiles.values(), key=lambda profile: profile.total_time,
+                      reverse=True)[:self.max_profiles // 2]
+        self.dropped += len(self.profiles) - len(kept)
+        self.profiles = {profile.source: profile for profile in kept}
+
+    def emit(self, *events: Event):
+        for hook in self.hooks:
+            for event in events:
+                hook(event)
+
+    def tokenizer(self, input: str, token_pattern: TokenPattern) -> TimedTokenizer:
+        return TimedTokenizer(input, token_pattern)
+
+    # called by the parser once it built `expression`, `elapsed` includes the
+    # time spent by the tokenizer
+    def parsed(self, expression: Expression, tokenizer: TimedTokenizer, elapsed: float):
+        nodes = sum(1 for _ in syntaxtree.walk(expression.tree))
+        parse_time = elapsed - tokenizer.elapsed
+
+        with self.lock:
+            profile = self.profile(expression.source)
+            profile.compilations += 1
+            profile.tokenize_time += tokenizer.elapsed
+            profile.parse_time += parse_time
+            profile.tokens += tokenizer.tokens
+            profile.nodes += nodes
+
+        self.emit(Event(TOKENIZE, expression.source, tokenizer.elapsed, {'tokens': tokenizer.tokens}),
+                  Event(PARSE, expression.source, parse_time, {'nodes': nodes}))
+
+    def evaluate(self, expression: Expression, runtime: dict[str, float] = None, lazy: bool = False) -> any:
+        """
+        Evaluates `expression` as `Expression.evaluate` does, or as
+        `Expression.evaluate_lazy` if `lazy` is set, measuring it. Failed
+        evaluations are measured too.
+        """
+        backend = expression.backend
+        # variables are converted to the number type of the backend, and decimals
+        # are computed in its context, as in `Expression.evaluate`
+        scope = CountingScope({} if runtime is None else runtime, None if backend is None else backend.convert)
+        functions = TimedFunctions(expression.functions)
+        started = perf_counter()
+        try:
+            with contextlib.nullcontext() if backend is None else backend.activate():
+                try:
+                    if lazy:
+                        return evaluate_lazy(expression.tree, scope, functions)
+                    return evaluate(expression.tree, scope, functions)
+                except RecursionError:
+                    return evaluate_iterative(expression.tree, scope, functions)
+        finally:
+            elapsed = perf_counter() - started
+            with self.lock:
+                profile = self.profile(expression.source)
+                profile.evaluations += 1
+                profile.evaluate_time += elapsed
+                profile.function_time += functions.elapsed
+                profile.resolve_time += scope.elapsed
+                profile.function_calls += functions.calls
+                profile.variable_lookups += scope.lookups
+                profile.variable_resolutions += scope.resolutions
+
+            self.emit(Event(EVALUATE, expression.source, elapsed, {
+                'function_calls': functions.calls,
+                'function_time': functions.elapsed,
+                'variable_lookups': scope.lookups,
+                'variable_resolutions': scope.resolutions,
+                'resolve_time': scope.elapsed,
+            }))
+
+    def report(self, limit: int = 10) -> list[Profile]:
+        """
+        Returns the `limit` expressions that took the longest, tokenize, parse
+        and evaluate times summed, the slowest first.
+        """
+        with self.lock:
+            profiles = list(self.profiles.values())
+        return sorted(profiles, key=lambda profile: profile.total_time, reverse=True)[:limit]
+
+    def format_report(self, limit: int = 10) -> str:
+        lines = [f'{"total ms":>10} {"tokenize":>10} {"parse":>10} {"evaluate":>10} {"functions":>10} '
+                 f'{"variables":>10} {"evals":>7}  expression']
+        for profile in self.report(limit):
+            times = [profile.total_time, profile.tokenize_time, profile.parse_time, profile.evaluate_time,
+                     profile.function_time, profile.resolve_time]
+            columns = ' '.join(f'{time * 1000:>10.3f}' for time in times)
+            lines.append(f'{columns} {profile.evaluations:>7}  {profile.source}')
+        return '\n'.join(lines)
@@ -0,0 +1,178 @@
+# Numeric backends
+#
+# A backend chooses the number type an expression is computed with:
+#
+#   - FLOAT:    floats, the default
+#   - INTEGER:  floats, but integer literals stay Python ints, e.g. `2 ^ 100`
+#               is exact
+#   - FRACTION: exact rational numbers (`fractions.Fraction`)
+#   - decimal_backend(context): `decimal.Decimal` numbers computed with the
+#               precision and rounding of `context`
+#
+# Literals are converted once, when the expression is compiled, and variables
+# once per evaluation, when they are resolved. Functions without an exact
+# equivalent for the number type, e.g. `sin`, are computed with floats.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import contextlib
+import decimal
+import math
+import weakref
+from decimal import Decimal
+from fractions import Fraction
+from typing import Callable
+
+import syntaxtree
+from prattparser import Expression, Scope
+from registry import FunctionRegistry
+from syntaxtree import Node
+from tokenizer import TokenType
+
+
+class Backend:
+    """
+    A number type for compiled expressions:
+        ```
+        parser = Parser(backend=decimal_backend(decimal.Context(prec=50)))
+        parser.parse('0.1 + 0.2')  # Decimal('0.3')
+        ```
+
+    `literal` converts the text of a number literal, `convert` the values of the
+    variables (None keeps them unchanged) and `overrides` maps the callables of
+    the default functions to their equivalent for the number type.
+    """
+    def __init__(self, name: str, literal: Callable[[str], any], convert: Callable[[any], any] = None,
+                 overrides: dict[Callable, Callable] = None, context: decimal.Context = None):
+        self.name = name
+        self.literal = literal
+        self.convert = convert
+        self.overrides = overrides or {}
+        self.context = context
+        self.adapted: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def __repr__(self):
+        return f'Backend({self.name!r})'
+
+    def adapt(self, functions: FunctionRegistry) -> FunctionRegistry:
+        """
+        Returns a registry with the functions of `functions` that have an
+        override replaced by it. Functions registered by the user are kept.
+        """
+        if not self.overrides:
+            return functions
+
+        adapted = self.adapted.get(functions)
+        if adapted is None:
+            adapted = self.adapted[functions] = FunctionRegistry([
+                function._replace(callable=self.overrides[function.callable])
+                if function.callable in self.overrides else function
+                for function in functions
+            ])
+        return adapted
+
+    def apply(self, expression: Expression) -> Expression:
+        """
+        Returns `expression` computed with this backend instead of the one it
+        was compiled with, its literals are converted once, here. Literals are
+        read from their shortest decimal form, e.g. the float `0.1` becomes
+        `Decimal('0.1')`.
+        """
+        def convert(leaf: Node) -> Node:
+            if leaf.type == TokenType.NUMBER:
+                return leaf._replace(value=self.literal(literal_text(leaf.value)))
+            return leaf
+
+        tree = syntaxtree.map_leaves(expression.tree, convert)
+        return Expression(expression.source, tree, self.adapt(expression.functions), self)
+
+    def fingerprint(self) -> bytes:
+        """
+        Identifies the number type, for decimals its precision (part of the
+        name) and the rounding of its context.
+        """
+        rounding = '' if self.context is None else self.context.rounding
+        return f'{self.name} {rounding}'.encode()
+
+    def scope(self, runtime: dict[str, any] = None) -> Scope:
+        return Scope({} if runtime is None else runtime, self.convert)
+
+    # the decimal context of the evaluations
+    def activate(self):
+        if self.context is None:
+            return contextlib.nullcontext()
+        return decimal.localcontext(self.context)
+
+
+def literal_text(value) -> str:
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, Fraction):
+        # literals have a finite decimal form
+        value = Decimal(value.numerator) / Decimal(value.denominator)
+    return str(value)
+
+
+def integer_literal(text: str):
+    return int(text) if text.isdigit() else float(text)
+
+
+FLOAT = Backend('float', float)
+
+INTEGER = Backend('integer', integer_literal)
+
+
+def to_fraction(value) -> Fraction:
+    if isinstance(value, float):
+        # the shortest decimal form is the number the user meant, e.g. 0.1
+        return Fraction(repr(value))
+    return Fraction(value)
+
+
+def fraction_sqrt(value: Fraction):
+    value = Fraction(value)
+    numerator, denominator = math.isqrt(value.numerator), math.isqrt(value.denominator)
+    if value >= 0 and numerator * numerator == value.numerator and denominator * denominator == value.denominator:
+        return Fraction(numerator, denominator)
+    return math.sqrt(value)
+
+
+# `^` and `pow` are exact for integer exponents, other powers are floats
+FRACTION = Backend('fraction', Fraction, to_fraction, {
+    math.sqrt: fraction_sqrt,
+    math.pow: pow,
+})
+
+
+def decimal_backend(context: decimal.Context = None) -> Backend:
+    """
+    Returns a backend computing with `decimal.Decimal` numbers rounded by
+    `context` (the default context has 28 significant digits).
+    """
+    context = context or decimal.Context()
+
+    def to_decimal(value) -> Decimal:
+        if isinstance(value, float):
+            return Decimal(repr(value))
+        if isinstance(value, Fraction):
+            return context.divide(Decimal(value.numerator), Decimal(value.denominator))
+        return Decimal(value)
+
+    def from_float(function: Callable) -> Callable:
+        def decimal_function(*arguments):
+            return context.create_decimal_from_float(function(*map(float, arguments)))
+        return decimal_function
+
+    return Backend(f'decimal(prec={context.prec})', Decimal, to_decimal, {
+        math.sin: from_float(math.sin),
+        math.cos: from_float(math.cos),
+        math.tan: from_float(math.tan),
+        math.sqrt: context.sqrt,
+        math.pow: context.power,
+        math.log: lambda value, base: context.divide(context.ln(value), context.ln(base)),
+    }, context)
+
+
+DECIMAL = decimal_backend()
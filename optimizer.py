@@ -0,0 +1,109 @@
+# Optimization pass over compiled expressions
+#
+# Folds constant subtrees, e.g. `sin(2 * 3.14)`, into a single number and
+# removes operations that do not change their operand, e.g. `x * 1`, so that
+# evaluating an expression only does the work that depends on the runtime.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import contextlib
+from collections import namedtuple
+
+import syntaxtree
+from prattparser import Expression, ParserError, evaluate
+from registry import DEFAULT_FUNCTIONS, FunctionRegistry
+from syntaxtree import Node
+from tokenizer import TokenType
+
+# `rule` is either 'constant' or the identity that was applied, e.g. 'x * 1'
+Fold = namedtuple('Fold', 'rule original replacement')
+
+
+def is_number(node: Node, value=None) -> bool:
+    return node.type == TokenType.NUMBER and (value is None or node.value == value)
+
+
+def fold_constant(node: Node, folds: list[Fold], functions: FunctionRegistry) -> Node:
+    try:
+        value = evaluate(node, {}, functions)
+    except (ArithmeticError, ValueError, TypeError, ParserError):
+        # keep the subtree, the error is raised when the expression is evaluated
+        return node
+
+    replacement = syntaxtree.number(value)
+    folds.append(Fold('constant', node, replacement))
+    return replacement
+
+
+def fold_identity(node: Node, folds: list[Fold]) -> Node:
+    if syntaxtree.is_unary(node):
+        operand = node.children[0]
+        if syntaxtree.is_unary(operand):
+            folds.append(Fold('- - x', node, operand.children[0]))
+            return operand.children[0]
+        return node
+
+    if node.type == TokenType.FUNCTION:
+        return node
+
+    left, right = node.children
+    rule = replacement = None
+    if node.type == TokenType.MULTIPLICATION:
+        if is_number(right, 1):
+            rule, replacement = 'x * 1', left
+        elif is_number(left, 1):
+            rule, replacement = '1 * x', right
+    elif node.type == TokenType.ADDITION:
+        if is_number(right, 0):
+            rule, replacement = 'x + 0', left
+        elif is_number(left, 0):
+            rule, replacement = '0 + x', right
+    elif node.type == TokenType.SUBTRACTION and is_number(right, 0):
+        rule, replacement = 'x - 0', left
+    elif node.type == TokenType.DIVISION and is_number(right, 1):
+        rule, replacement = 'x / 1', left
+    elif node.type == TokenType.EXPONENTIATION and is_number(right, 1):
+        rule, replacement = 'x ^ 1', left
+
+    if rule is None:
+        return node
+
+    folds.append(Fold(rule, node, replacement))
+    return replacement
+
+
+def fold(node: Node, folds: list[Fold], functions: FunctionRegistry = DEFAULT_FUNCTIONS) -> Node:
+    if not node.children:
+        return node
+
+    children = tuple(fold(child, folds, functions) for child in node.children)
+    if children != node.children:
+        node = node._replace(children=children)
+
+    if all(is_number(child) for child in children):
+        return fold_constant(node, folds, functions)
+
+    return fold_identity(node, folds)
+
+
+def optimize(expression: Expression) -> tuple[Expression, list[Fold]]:
+    """
+    Returns an equivalent expression with its constant subtrees folded and the
+    safe identities (`x * 1`, `x + 0`, `x - 0`, `x / 1`, `x ^ 1` and `- - x`)
+    removed, along with the list of folds that were applied:
+        ```
+        optimized, folds = optimize(Parser().compile('x * sqrt(9) ^ 1'))
+        # optimized.tree == Node(MULTIPLICATION, '*', (x, 3.0))
+        ```
+
+    Subtrees that raise an error, e.g. `sqrt(-1)`, are kept unchanged so the
+    error is still reported when the expression is evaluated. Constants are
+    folded with the backend of the expression, which the result keeps.
+    """
+    folds = []
+    backend = expression.backend
+    with contextlib.nullcontext() if backend is None else backend.activate():
+        tree = fold(expression.tree, folds, expression.functions)
+    return Expression(expression.source, tree, expression.functions, backend), folds
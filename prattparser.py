@@ -11,9 +11,16 @@
 #
 # Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
 
-import math
-
+import inspect
+from time import perf_counter
+from typing import Callable
+
+import syntaxtree
+from cache import ExpressionCache
+from registry import DEFAULT_FUNCTIONS, OPERATORS, PRECEDENCE, Function, FunctionRegistry
+from syntaxtree import Node
 from tokenizer import Token, Tokenizer, TokenType
+from validation import Diagnostic, validate
 
 
 class ParserError(RuntimeError):
@@ -21,6 +28,372 @@ class ParserError(RuntimeError):
         super().__init__(message)
 
 
+# kept for backwards compatibility, evaluates a function of the default registry
+def fn(id: str, value: list[float]):
+    return call(DEFAULT_FUNCTIONS, id, value)
+
+
+def call(functions: FunctionRegistry, id: str, value: list[float]):
+    try:
+        function = functions[id]
+    except KeyError:
+        raise ParserError(f'ivalid operation: {id}')
+
+    check_arity(function, len(value))
+    return function.callable(*value)
+
+
+def check_arity(function: Function, count: int):
+    if count < function.min_arity or (function.max_arity is not None and count > function.max_arity):
+        raise ParserError(f'function [{function.name}] received wrong number of parameters [{count}]')
+
+
+def accepts_scope(resolver: Callable) -> bool:
+    try:
+        inspect.signature(resolver).bind(None)
+        return True
+    except TypeError:
+        return False
+    except ValueError:
+        # builtins without a signature
+        return False
+
+
+class Scope(dict):
+    """
+    The variables of a runtime, resolved during one evaluation.
+
+    A variable is resolved the first time the evaluation reads it and its value
+    is kept until the end of the evaluation. Variables bound to a callable are
+    dynamic: the callable is invoked to compute the value, at most once per
+    evaluation, and only if the evaluated expression needs it. A callable that
+    takes one argument receives the scope, to read the variables it depends on:
+        ```
+        runtime = {
+            'a': lambda scope: 3 + scope['b'],
+            'b': lambda: db.query('select count(*) from my_table'),
+        }
+        ```
+
+    Dependent variables that form a cycle raise a `ParserError` naming the path
+    of the cycle, e.g. `a -> b -> a`.
+
+    `convert`, when given, is applied to the values once they are resolved, to
+    turn them into the number type of a `numeric.Backend`.
+    """
+    def __init__(self, runtime: dict[str, any], convert: Callable[[any], any] = None):
+        super().__init__()
+        self.runtime = runtime
+        self.convert = convert
+        self.resolving: list[str] = []
+
+    def __missing__(self, name: str):
+        try:
+            value = self.runtime[name]
+        except KeyError:
+            raise ParserError(f'cannot resolve variable [{name}]')
+
+        if callable(value):
+            value = self.resolve(name, value)
+
+        if self.convert is not None:
+            value = self.convert(value)
+
+        self[name] = value
+        return value
+
+    def resolve(self, name: str, resolver: Callable):
+        if name in self.resolving:
+            cycle = self.resolving[self.resolving.index(name):] + [name]
+            raise ParserError(f'cycle identified when resolving variable [{name}]: {" -> ".join(cycle)}')
+
+        self.resolving.append(name)
+        try:
+            return resolver(self) if accepts_scope(resolver) else resolver()
+        finally:
+            self.resolving.pop()
+
+
+# `runtime` is expected to raise a `ParserError` for unknown variables, as a
+# `Scope` does
+def evaluate(node: Node, runtime: dict[str, float], functions: FunctionRegistry = DEFAULT_FUNCTIONS) -> any:
+    node_type = node.type
+
+    if node_type == TokenType.NUMBER:
+        return node.value
+
+    if node_type == TokenType.IDENTIFIER:
+        return runtime[node.value]
+
+    # the arity was checked when the expression was compiled
+    if node_type == TokenType.FUNCTION:
+        return functions[node.value].callable(*[evaluate(child, runtime, functions) for child in node.children])
+
+    if syntaxtree.is_unary(node):
+        return -evaluate(node.children[0], runtime, functions)
+
+    left = evaluate(node.children[0], runtime, functions)
+    right = evaluate(node.children[1], runtime, functions)
+    return OPERATORS[node_type].callable(left, right)
+
+
+# evaluates the tree in post-order with an explicit stack, for trees too deep
+# for `evaluate`
+def evaluate_iterative(node: Node, runtime: dict[str, float], functions: FunctionRegistry = DEFAULT_FUNCTIONS) -> any:
+    values = []
+    stack = [(node, False)]
+    while stack:
+        node, visited = stack.pop()
+        node_type = node.type
+
+        if node_type == TokenType.NUMBER:
+            values.append(node.value)
+        elif node_type == TokenType.IDENTIFIER:
+            values.append(runtime[node.value])
+        elif not visited:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+        else:
+            arguments = values[len(values) - len(node.children):]
+            del values[len(values) - len(node.children):]
+            if node_type == TokenType.FUNCTION:
+                values.append(functions[node.value].callable(*arguments))
+            elif syntaxtree.is_unary(node):
+                values.append(-arguments[0])
+            else:
+                values.append(OPERATORS[node_type].callable(*arguments))
+
+    return values[0]
+
+
+class LazyStats:
+    """
+    Counters of lazy evaluations: thunks created for the arguments of lazy
+    functions, thunks forced, and variables of the expression that were never
+    resolved.
+    """
+    __slots__ = ('thunks', 'forced', 'skipped_resolutions')
+
+    def __init__(self):
+        self.thunks = self.forced = self.skipped_resolutions = 0
+
+    @property
+    def skipped(self) -> int:
+        return self.thunks - self.forced
+
+    def __repr__(self):
+        return f'LazyStats(thunks={self.thunks}, forced={self.forced}, skipped_resolutions={self.skipped_resolutions})'
+
+
+class Thunk:
+    """
+    An argument of a lazy function, evaluated the first time it is called.
+    """
+    __slots__ = ('node', 'runtime', 'functions', 'stats', 'evaluate', 'value', 'forced')
+
+    def __init__(self, node: Node, runtime: dict[str, float], functions: FunctionRegistry, stats: LazyStats,
+                 evaluate: Callable = None):
+        self.node = node
+        self.runtime = runtime
+        self.functions = functions
+        self.stats = stats
+        self.evaluate = evaluate or evaluate_lazy
+        self.forced = False
+
+    def __call__(self):
+        if not self.forced:
+            if self.stats is not None:
+                self.stats.forced += 1
+            self.value = self.evaluate(self.node, self.runtime, self.functions, self.stats)
+            self.forced = True
+        return self.value
+
+
+# as `evaluate`, but functions with a `lazy` callable receive their arguments as
+# thunks and evaluate only the ones they need
+def evaluate_lazy(node: Node, runtime: dict[str, float], functions: FunctionRegistry = DEFAULT_FUNCTIONS,
+                  stats: LazyStats = None) -> any:
+    node_type = node.type
+
+    if node_type == TokenType.NUMBER:
+        return node.value
+
+    if node_type == TokenType.IDENTIFIER:
+        return runtime[node.value]
+
+    if node_type == TokenType.FUNCTION:
+        function = functions[node.value]
+        if function.lazy is None:
+            return function.callable(*[evaluate_lazy(child, runtime, functions, stats) for child in node.children])
+
+        if stats is not None:
+            stats.thunks += len(node.children)
+        return function.lazy(*[Thunk(child, runtime, functions, stats) for child in node.children])
+
+    if syntaxtree.is_unary(node):
+        return -evaluate_lazy(node.children[0], runtime, functions, stats)
+
+    left = evaluate_lazy(node.children[0], runtime, functions, stats)
+    right = evaluate_lazy(node.children[1], runtime, functions, stats)
+    return OPERATORS[node_type].callable(left, right)
+
+
+# as `evaluate_iterative`, but lazy functions receive thunks, as in
+# `evaluate_lazy`. Only nested lazy functions use the Python stack
+def evaluate_lazy_iterative(node: Node, runtime: dict[str, float], functions: FunctionRegistry = DEFAULT_FUNCTIONS,
+                            stats: LazyStats = None) -> any:
+    values = []
+    stack = [(node, False)]
+    while stack:
+        node, visited = stack.pop()
+        node_type = node.type
+
+        if node_type == TokenType.NUMBER:
+            values.append(node.value)
+        elif node_type == TokenType.IDENTIFIER:
+            values.append(runtime[node.value])
+        elif node_type == TokenType.FUNCTION and functions[node.value].lazy is not None:
+            if stats is not None:
+                stats.thunks += len(node.children)
+            values.append(functions[node.value].lazy(*[Thunk(child, runtime, functions, stats, evaluate_lazy_iterative)
+                                                       for child in node.children]))
+        elif not visited:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+        else:
+            arguments = values[len(values) - len(node.children):]
+            del values[len(values) - len(node.children):]
+            if node_type == TokenType.FUNCTION:
+                values.append(functions[node.value].callable(*arguments))
+            elif syntaxtree.is_unary(node):
+                values.append(-arguments[0])
+            else:
+                values.append(OPERATORS[node_type].callable(*arguments))
+
+    return values[0]
+
+
+class Expression:
+    """
+    A compiled math expression.
+
+    Instances are created by `Parser.compile` and hold the syntax tree of the
+    source expression. Evaluating an expression only walks the tree, thus the
+    same instance can be evaluated over and over with different runtimes:
+        ```
+        expression = Parser().compile('5 * x - sqrt(y)')
+        expression.evaluate({'x': 1, 'y': 4})
+        expression.evaluate({'x': 2, 'y': 9})
+        ```
+
+    `backend` is the `numeric.Backend` the expression was compiled with, None
+    for floats.
+    """
+    def __init__(self, source: str, tree: Node, functions: FunctionRegistry = DEFAULT_FUNCTIONS, backend=None):
+        self.source = source
+        self.tree = tree
+        self.functions = functions
+        self.backend = backend
+
+    def references(self) -> syntaxtree.References:
+        """
+        Returns the names of the variables and functions the expression
+        references, without evaluating it:
+            ```
+            Parser().compile('max(x, y) * sqrt(x)').references()
+            # References(variables=('x', 'y'), functions=('max', 'sqrt'))
+            ```
+        """
+        return syntaxtree.references(self.tree)
+
+    def evaluate(self, runtime: dict[str, float] = None) -> any:
+        if self.backend is None:
+            return self.evaluate_scope(Scope({} if runtime is None else runtime))
+
+        with self.backend.activate():
+            return self.evaluate_scope(self.backend.scope(runtime))
+
+    # trees deeper than the recursion limit are evaluated again iteratively, the
+    # scope keeps the variables already resolved
+    def evaluate_scope(self, scope: Scope) -> any:
+        try:
+            return evaluate(self.tree, scope, self.functions)
+        except RecursionError:
+            return evaluate_iterative(self.tree, scope, self.functions)
+
+    def evaluate_lazy(self, runtime: dict[str, float] = None, stats: LazyStats = None) -> any:
+        """
+        Evaluates the expression forcing only the arguments that lazy functions,
+        e.g. `if`, `clamp`, `max` and `min`, need. Variables are resolved only
+        if they are read, pass `stats` to count what was skipped:
+            ```
+            stats = LazyStats()
+            Parser().compile('if(a, b, c)').evaluate_lazy({'a': 1, 'b': 2, 'c': expensive}, stats)
+            stats.skipped_resolutions  # 1, `c` was never resolved
+            ```
+
+        Trees deeper than the recursion limit are evaluated again with an
+        explicit stack, still lazily.
+        """
+        scope = Scope({} if runtime is None else runtime) if self.backend is None else self.backend.scope(runtime)
+        try:
+            if self.backend is None:
+                return self.evaluate_lazy_scope(scope, stats)
+            with self.backend.activate():
+                return self.evaluate_lazy_scope(scope, stats)
+        finally:
+            if stats is not None:
+                stats.skipped_resolutions += sum(1 for name in syntaxtree.variables(self.tree) if name not in scope)
+
+    # the scope keeps the variables already resolved, the counters of the
+    # thunks start over
+    def evaluate_lazy_scope(self, scope: Scope, stats: LazyStats = None) -> any:
+        counters = None if stats is None else (stats.thunks, stats.forced)
+        try:
+            return evaluate_lazy(self.tree, scope, self.functions, stats)
+        except RecursionError:
+            if stats is not None:
+                stats.thunks, stats.forced = counters
+            return evaluate_lazy_iterative(self.tree, scope, self.functions, stats)
+
+    def __repr__(self):
+        return f'Expression({self.source!r})'
+
+
+# continuations of `Parser.iterative_expression`
+INFIX, UNARY, PARENTHESIS, ARGUMENTS = range(4)
+
+
+class ParseContext:
+    """
+    The state of one call to `Parser.build`: the tokenizer over the input and
+    the token being looked at. Keeping it out of the parser lets one parser
+    compile expressions in many threads at once.
+    """
+    __slots__ = ('input', 'tokenizer', 'lookahead', 'functions')
+
+    def __init__(self, input: str, tokenizer: Tokenizer, functions: FunctionRegistry):
+        self.input = input
+        self.tokenizer = tokenizer
+        self.functions = functions
+        self.lookahead: Token = tokenizer.get_next_token()
+
+    # expect a particular token, consume it, and move to the next token
+    def consume(self, token_type: TokenType) -> Token:
+        token = self.lookahead
+
+        if token is None:
+            raise ParserError(f'unexpected end of input at pos [{self.tokenizer.cursor}], expected {token_type}')
+
+        if token.type != token_type:
+            raise ParserError(f'unexpected token: [{token.type}], expected [{token_type}]')
+
+        # advance to the next token
+        self.lookahead = self.tokenizer.get_next_token()
+
+        return token
+
+
 class Parser:
     """
     The parser implements the Pratt algorithm to evaluate math expressions.
@@ -38,6 +411,7 @@ class Parser:
         - basic trig functions: `sin, cos, tan`
         - power functions (same python signature): `log, sqrt, pow`
         - `max, min`
+        - conditionals: `if(condition, then, otherwise)`, `clamp(value, low, high)`
 
     Next is a valid example of math expression for this parser. Check the `test`
     folder for more examples:
@@ -45,47 +419,126 @@ class Parser:
         5 * (sqrt(9) + sin(2 * 3.14)) - x / 2
         # runtime{'x': 10}
         ```
-    """
-    def __init__(self, runtime: dict[str, float] = {}):
-        self.runtime = runtime
 
-    def parse(self, input: str):
-        self.input: str = input
-        self.tokenizer: Tokenizer = Tokenizer(input)
-        self.lookahead: Token = self.tokenizer.get_next_token()
-
-        self.operators = {
-            '^': 5,
-            # a unary operation (-) technically has higher precedence than multiplication/division
-            # but lower precedence than exponentiation.
-            'unary': 4,
-            '*': 3,
-            '/': 3,
-            '+': 2,
-            '-': 2,
-        }
+    Use `compile` instead of `parse` when the same expression is evaluated many
+    times, it returns an `Expression` that skips tokenizing and parsing:
+        ```
+        expression = parser.compile('5 * x - 2')
+        expression.evaluate({'x': 10})
+        ```
 
-        result = self.expression()
+    Generated expressions may nest deeper than Python's recursion limit, for
+    those create the parser with `iterative=True`. It parses with an explicit
+    stack instead of recursive calls.
 
-        if self.tokenizer.has_more_tokens():
-            raise ParserError(f'parser cannot process the entire expression, error before pos [{self.tokenizer.cursor}]'
-                              f' leftover: [{self.tokenizer.input_left_over()}]')
-        return result
+    Pass a `numeric.Backend` to compute with another number type than floats,
+    e.g. `numeric.FRACTION` or `numeric.decimal_backend(context)`. Literals
+    are converted when the expression is compiled.
 
-    # expect a particular token, consume it, and move to the next token
-    def consume(self, token_type: TokenType) -> Token:
-        token = self.lookahead
+    With `lazy=True` the arguments of `if`, `clamp`, `max` and `min` (and of
+    any function registered with a `lazy` callable) are evaluated only if the
+    function needs them, see `Expression.evaluate_lazy`.
 
-        if token is None:
-            raise ParserError(f'unexpected end of input at pos [{self.tokenizer.cursor}], expected {token_type}')
+    Pass an `ExpressionCache` to reuse the compiled form of expressions that
+    were already seen by this (or any other parser sharing the cache and the
+    same functions and backend).
 
-        if token.type != token_type:
-            raise ParserError(f'unexpected token: [{token.type}], expected [{token_type}]')
+    Pass an `instrumentation.Instrumentation` to time the tokenize, parse and
+    evaluate phases of each expression and count its tokens, nodes, function
+    calls and variable lookups.
 
-        # advance to the next token
-        self.lookahead = self.tokenizer.get_next_token()
+    New functions are registered per parser, they are also recognized by its
+    tokenizer:
+        ```
+        parser.register_function('hypot', math.hypot, 2)
+        parser.parse('hypot(3, 4)')
+        ```
 
-        return token
+    Parsing and evaluating keep their state in local objects, a parser can be
+    shared by many threads as long as functions are registered before it is
+    shared. `parse` takes an optional runtime that replaces the runtime of the
+    parser for that call:
+        ```
+        parser = Parser()
+        executor.map(lambda x: parser.parse('x * 2', {'x': x}), range(100))
+        ```
+    """
+    # the precedence table is built once, by the registry, and shared
+    operators: dict[str, int] = PRECEDENCE
+
+    def __init__(self, runtime: dict[str, float] = None, cache: ExpressionCache = None,
+                 functions: FunctionRegistry = DEFAULT_FUNCTIONS, iterative: bool = False, instrumentation=None,
+                 lazy: bool = False, backend=None):
+        self.runtime = {} if runtime is None else runtime
+        self.cache = cache
+        self.backend = backend
+        self.functions = functions if backend is None else backend.adapt(functions)
+        # registries shared with other parsers are copied on the first registration
+        self.shared_functions = self.functions is DEFAULT_FUNCTIONS or backend is not None
+        self.iterative = iterative
+        self.instrumentation = instrumentation
+        self.lazy = lazy
+
+    def register_function(self, name: str, callable: Callable, min_arity: int = 1, max_arity: int = -1,
+                          vectorized: Callable = None, lazy: Callable = None) -> Function:
+        if self.shared_functions:
+            self.functions = self.functions.copy()
+            self.shared_functions = False
+        return self.functions.register(name, callable, min_arity, max_arity, vectorized, lazy)
+
+    # `runtime` replaces the runtime of the parser for this call only
+    def parse(self, input: str, runtime: dict[str, float] = None):
+        runtime = self.runtime if runtime is None else runtime
+        if self.instrumentation is not None:
+            return self.instrumentation.evaluate(self.compile(input), runtime, self.lazy)
+        if self.lazy:
+            return self.compile(input).evaluate_lazy(runtime)
+        return self.compile(input).evaluate(runtime)
+
+    def compile(self, input: str) -> Expression:
+        if self.cache is not None:
+            return self.cache.get_or_compile(input, self.build, self.cache_key(input))
+        return self.build(input)
+
+    # registries and backends are compared by identity, a parser registering a
+    # function gets its own registry, thus its own entries
+    def cache_key(self, input: str) -> tuple:
+        return input, self.functions, self.backend
+
+    def validate(self, input: str, variables=None, limit: int = 10) -> list[Diagnostic]:
+        """
+        Checks `input` without compiling it, returns its errors
+        (see `validation.validate`).
+        """
+        literal = float if self.backend is None else self.backend.literal
+        return validate(input, self.functions, variables, literal, limit)
+
+    def build(self, input: str) -> Expression:
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            started = perf_counter()
+
+        functions = self.functions
+        if instrumentation is None:
+            tokenizer = Tokenizer(input, functions.token_pattern)
+        else:
+            tokenizer = instrumentation.tokenizer(input, functions.token_pattern)
+        context = ParseContext(input, tokenizer, functions)
+
+        tree = self.iterative_expression(context) if self.iterative else self.expression(context)
+
+        # the tokenizer is already past the lookahead, a token left after a
+        # complete expression
+        lookahead = context.lookahead
+        if lookahead is not None:
+            position = tokenizer.cursor - len(lookahead.value)
+            raise ParserError(f'parser cannot process the entire expression, error before pos [{position}]'
+                              f' leftover: [{input[position:]}]')
+
+        expression = Expression(input, tree, functions, self.backend)
+        if instrumentation is not None:
+            instrumentation.parsed(expression, tokenizer, perf_counter() - started)
+        return expression
 
     def get_precedence(self, token: Token) -> int:
         if token == 'unary':
@@ -100,11 +553,11 @@ class Parser:
     # Expression
     #   = Prefix (Infix)*
     ###
-    def expression(self, precedence: int = 0) -> any:
-        left = self.prefix()
+    def expression(self, context: ParseContext, precedence: int = 0) -> Node:
+        left = self.prefix(context)
 
-        while precedence < self.get_precedence(self.lookahead):
-            left = self.infix(left, self.lookahead.type)
+        while precedence < self.get_precedence(context.lookahead):
+            left = self.infix(context, left, context.lookahead.type)
 
         return left
 
@@ -116,120 +569,174 @@ class Parser:
     #   | VarExpression
     #   | NUMBER
     ###
-    def prefix(self) -> any:
-        if self.lookahead.type == TokenType.PARENTHESIS_LEFT:
-            return self.parenthesized_expression()
+    def prefix(self, context: ParseContext) -> Node:
+        lookahead = context.lookahead
+
+        # reports the unexpected end of input
+        if lookahead is None:
+            return self.number_expression(context)
+
+        if lookahead.type == TokenType.PARENTHESIS_LEFT:
+            return self.parenthesized_expression(context)
+
+        if lookahead.type == TokenType.SUBTRACTION:
+            return self.unary_expression(context)
 
-        if self.lookahead.type == TokenType.SUBTRACTION:
-            return self.unary_expression()
+        if lookahead.type == TokenType.FUNCTION:
+            return self.function_expression(context)
 
-        if self.lookahead.type == TokenType.FUNCTION:
-            return self.function_expression()
+        if lookahead.type == TokenType.IDENTIFIER:
+            return self.var_expression(context)
 
-        if self.lookahead.type == TokenType.IDENTIFIER:
-            return self.var_expression()
+        return self.number_expression(context)
 
-        token = self.consume(TokenType.NUMBER)
+    # NUMBER, converted once, here, to the number type of the backend
+    def number_expression(self, context: ParseContext) -> Node:
+        token = context.consume(TokenType.NUMBER)
         try:
-            return float(token.value)
-        except ValueError:
+            return syntaxtree.number(float(token.value) if self.backend is None else self.backend.literal(token.value))
+        except (ValueError, ArithmeticError):
             raise ParserError(f'cannot convert {token.value} into a valid number')
 
     ###
     # Infix
     #   = ("+" / "-" / "*" / "/" / "^") Expression
     ###
-    def infix(self, left, operator_type: TokenType) -> any:
-        token = self.consume(operator_type)
+    def infix(self, context: ParseContext, left: Node, operator_type: TokenType) -> Node:
+        token = context.consume(operator_type)
         new_precedence = self.operators[token.value]  # new precedence we pass to the "Expression" method
-        if token.type == TokenType.ADDITION:
-            return left + self.expression(new_precedence)
-        elif token.type == TokenType.SUBTRACTION:
-            return left - self.expression(new_precedence)
-        elif token.type == TokenType.MULTIPLICATION:
-            return left * self.expression(new_precedence)
-        elif token.type == TokenType.DIVISION:
-            return left / self.expression(new_precedence)
-        elif token.type == TokenType.EXPONENTIATION:
+        if OPERATORS[token.type].right_associative:
             # exponentiation has right-associativity, this means 2^2^3 = 256
             # thus, we need to subtract one from a precedence we pass into the
             # Expression method.
-            return left ** self.expression(new_precedence - 1)
+            new_precedence -= 1
+        return syntaxtree.binary(token.type, left, self.expression(context, new_precedence))
 
     ###
     # ParenthesizedExpression
     #   = "(" Expression ")"
     ###
-    def parenthesized_expression(self) -> any:
-        self.consume(TokenType.PARENTHESIS_LEFT)
-        expression = self.expression()
-        self.consume(TokenType.PARENTHESIS_RIGHT)
+    def parenthesized_expression(self, context: ParseContext) -> Node:
+        context.consume(TokenType.PARENTHESIS_LEFT)
+        expression = self.expression(context)
+        context.consume(TokenType.PARENTHESIS_RIGHT)
         return expression
 
     ###
     # UnaryExpression
     #   = "-" Expression
     ###
-    def unary_expression(self) -> any:
-        self.consume(TokenType.SUBTRACTION)
-        return -self.expression(self.get_precedence('unary'))
+    def unary_expression(self, context: ParseContext) -> Node:
+        context.consume(TokenType.SUBTRACTION)
+        return syntaxtree.unary(self.expression(context, self.get_precedence('unary')))
 
     # VarExpression
     #   = IDENTIFIER
-    def var_expression(self) -> any:
-        id = self.consume(TokenType.IDENTIFIER).value
-        try:
-            return self.runtime[id]
-        except KeyError:
-            raise ParserError(f'cannot resolve variable [{id}]')
+    def var_expression(self, context: ParseContext) -> Node:
+        id = context.consume(TokenType.IDENTIFIER).value
+        return syntaxtree.variable(id)
 
     ###
     # FunctionExpression
     #   = FUNCTION ParenthesizedExpression
     ###
-    def function_expression(self) -> any:
-        id = self.consume(TokenType.FUNCTION).value
-        expressions = self.fn_arg_expression()
-        return self.fn(id, expressions)
+    def function_expression(self, context: ParseContext) -> Node:
+        id = context.consume(TokenType.FUNCTION).value
+        expressions = self.fn_arg_expression(context)
+        check_arity(context.functions[id], len(expressions))
+        return syntaxtree.function(id, expressions)
 
     ###
     # FnArgExpression
-    #   = "(" Expression ")"
-    #   | "(" Expression "," Expression ")"
+    #   = "(" Expression ("," Expression)* ")"
     ###
-    def fn_arg_expression(self) -> any:
+    def fn_arg_expression(self, context: ParseContext) -> list[Node]:
         expressions = []
-        self.consume(TokenType.PARENTHESIS_LEFT)
-        expressions.append(self.expression())
+        context.consume(TokenType.PARENTHESIS_LEFT)
+        expressions.append(self.expression(context))
 
-        if self.lookahead.type == TokenType.COMMA:
-            self.consume(TokenType.COMMA)
-            expressions.append(self.expression())
+        while context.lookahead and context.lookahead.type == TokenType.COMMA:
+            context.consume(TokenType.COMMA)
+            expressions.append(self.expression(context))
 
-        self.consume(TokenType.PARENTHESIS_RIGHT)
+        context.consume(TokenType.PARENTHESIS_RIGHT)
         return expressions
 
-    # when adding support to new methods, also edit the tokenizer
-    # function list
-    def fn(self, id: str, value: list[str]):
-        try:
-            if id == 'sin':
-                return math.sin(value[0])
-            elif id == 'cos':
-                return math.cos(value[0])
-            elif id == 'tan':
-                return math.tan(value[0])
-            elif id == 'sqrt':
-                return math.sqrt(value[0])
-            elif id == 'log':
-                return math.log(value[0], value[1])
-            elif id == 'pow':
-                return math.pow(value[0], value[1])
-            elif id == 'max':
-                return max(value[0], value[1])
-            elif id == 'min':
-                return min(value[0], value[1])
+    def fn(self, id: str, value: list[float]):
+        return call(self.functions, id, value)
+
+    ###
+    # Expression, parsed with an explicit stack
+    #
+    # Same grammar and precedences as `expression`. Each grammar rule waiting
+    # for a sub-expression pushes a continuation instead of recursing:
+    #   - INFIX:  (precedence, left, operator type)
+    #   - UNARY:  (precedence,)
+    #   - PARENTHESIS: (precedence,)
+    #   - ARGUMENTS: (precedence, function name, parsed arguments)
+    # where `precedence` is the one of the enclosing expression.
+    ###
+    def iterative_expression(self, context: ParseContext) -> Node:
+        continuations = []
+        precedence = 0
+
+        while True:
+            # Prefix
+            lookahead_type = context.lookahead.type if context.lookahead else None
+            if lookahead_type == TokenType.PARENTHESIS_LEFT:
+                context.consume(TokenType.PARENTHESIS_LEFT)
+                continuations.append((PARENTHESIS, precedence))
+                precedence = 0
+                continue
+
+            if lookahead_type == TokenType.SUBTRACTION:
+                context.consume(TokenType.SUBTRACTION)
+                continuations.append((UNARY, precedence))
+                precedence = self.get_precedence('unary')
+                continue
+
+            if lookahead_type == TokenType.FUNCTION:
+                id = context.consume(TokenType.FUNCTION).value
+                context.consume(TokenType.PARENTHESIS_LEFT)
+                continuations.append((ARGUMENTS, precedence, id, []))
+                precedence = 0
+                continue
+
+            if lookahead_type == TokenType.IDENTIFIER:
+                left = self.var_expression(context)
             else:
-                raise ParserError(f'ivalid operation: {id}')
-        except IndexError:
-            raise ParserError(f'function [{id}] received wrong number of parameters [{len(value)}]')
+                left = self.number_expression(context)
+
+            # Infix, and return the value to the rules waiting for it
+            while True:
+                if precedence < self.get_precedence(context.lookahead):
+                    token = context.consume(context.lookahead.type)
+                    continuations.append((INFIX, precedence, left, token.type))
+                    precedence = self.operators[token.value]
+                    if OPERATORS[token.type].right_associative:
+                        precedence -= 1
+                    break
+
+                if not continuations:
+                    return left
+
+                continuation = continuations.pop()
+                kind, precedence = continuation[0], continuation[1]
+                if kind == INFIX:
+                    left = syntaxtree.binary(continuation[3], continuation[2], left)
+                elif kind == UNARY:
+                    left = syntaxtree.unary(left)
+                elif kind == PARENTHESIS:
+                    context.consume(TokenType.PARENTHESIS_RIGHT)
+                else:
+                    _, _, id, arguments = continuation
+                    arguments.append(left)
+                    if context.lookahead and context.lookahead.type == TokenType.COMMA:
+                        context.consume(TokenType.COMMA)
+                        continuations.append(continuation)
+                        precedence = 0
+                        break
+
+                    context.consume(TokenType.PARENTHESIS_RIGHT)
+                    check_arity(context.functions[id], len(arguments))
+                    left = syntaxtree.function(id, arguments)
@@ -0,0 +1,99 @@
+# Bulk pre-fetching of the variables of a batch of expressions
+#
+# The variables of compiled expressions are known before they are evaluated. A
+# `PrefetchPlan` merges the variables of many expressions, so a store can load
+# all of them in a single round trip, and evaluates the expressions once they
+# are loaded.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+from collections import ChainMap
+from typing import Callable, Iterable, Mapping
+
+from batch import ITEM_ERRORS, Result
+from prattparser import Expression, Parser
+
+# receives the names of the variables to load, returns their values by name
+Loader = Callable[[list[str]], Mapping[str, any]]
+
+
+class PrefetchPlan:
+    """
+    The variables and functions referenced by a batch of expressions:
+        ```
+        plan = plan_prefetch(['price * amount', 'max(price, floor) - discount'])
+        plan.variables  # ('price', 'amount', 'floor', 'discount')
+        plan.evaluate(store.get_many, {'amount': 3})
+        # store.get_many(['price', 'floor', 'discount']) is called once
+        ```
+
+    Variables read by dynamic variables through the scope, e.g.
+    `lambda scope: scope['b']`, are not known before the evaluation and are not
+    part of the plan. With lazy evaluation the plan may load variables that are
+    never read.
+    """
+    def __init__(self, expressions: Iterable[Expression]):
+        self.expressions: list[Expression] = list(expressions)
+        self.references = [expression.references() for expression in self.expressions]
+        self.variables: tuple[str] = tuple(dict.fromkeys(
+            name for references in self.references for name in references.variables))
+        self.functions: tuple[str] = tuple(dict.fromkeys(
+            name for references in self.references for name in references.functions))
+
+    def __len__(self):
+        return len(self.expressions)
+
+    def __repr__(self):
+        return f'PrefetchPlan({len(self.expressions)} expressions, {len(self.variables)} variables)'
+
+    def missing(self, runtime: Mapping[str, any] = None) -> list[str]:
+        """
+        Returns the variables of the plan that `runtime` does not bind.
+        """
+        if runtime is None:
+            return list(self.variables)
+        return [name for name in self.variables if name not in runtime]
+
+    def fetch(self, loader: Loader, runtime: Mapping[str, any] = None) -> ChainMap:
+        """
+        Calls `loader` once with the variables missing from `runtime`, unless
+        none is missing, and returns a runtime with the loaded values and the
+        ones of `runtime`. Values of `runtime` are not loaded again.
+        """
+        runtime = {} if runtime is None else runtime
+        names = self.missing(runtime)
+        loaded = dict(loader(names)) if names else {}
+        return ChainMap(loaded, runtime)
+
+    def evaluate_results(self, loader: Loader, runtime: Mapping[str, any] = None) -> list[Result]:
+        """
+        Fetches the missing variables, then evaluates every expression of the
+        plan. Returns one `Result` per expression, in order. A variable the
+        loader did not return fails the expressions that read it.
+        """
+        runtime = self.fetch(loader, runtime)
+        results = []
+        for expression in self.expressions:
+            try:
+                results.append(Result(expression.evaluate(runtime), None))
+            except ITEM_ERRORS as error:
+                results.append(Result(None, error))
+        return results
+
+    def evaluate(self, loader: Loader, runtime: Mapping[str, any] = None) -> list:
+        """
+        Returns the value of every expression of the plan, in order. Raises the
+        error of the first expression that fails.
+        """
+        results = self.evaluate_results(loader, runtime)
+        for result in results:
+            if result.error is not None:
+                raise result.error
+        return [result.value for result in results]
+
+
+def plan_prefetch(sources: Iterable[str], parser: Parser = None) -> PrefetchPlan:
+    parser = parser or Parser()
+    return PrefetchPlan(parser.compile(source) for source in sources)
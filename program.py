@@ -0,0 +1,220 @@
+# Compact postfix representation of compiled expressions
+#
+# A `Program` stores an expression as a flat sequence of stack machine
+# instructions in `array` buffers, instead of a tree of Python objects:
+#
+#   5 * x - sqrt(y)   =>   CONST 0, LOAD 0, MUL, LOAD 1, CALL sqrt/1, SUB
+#
+# with the numbers in a constant pool and the variable and function names
+# interned in tables. Programs use a fraction of the memory of a tree and can
+# be serialized to bytes and back.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import struct
+import sys
+from array import array
+
+import syntaxtree
+from prattparser import Expression, ParserError, Scope
+from registry import DEFAULT_FUNCTIONS, FunctionRegistry
+from tokenizer import TokenType
+
+# opcodes, the operand of CONST is an index in the constant pool, of LOAD an
+# index in the names table and of CALL `function index << 16 | argument count`
+CONST, LOAD, NEG, ADD, SUB, MUL, DIV, POW, CALL = range(9)
+
+# bounds of the argument count and the function index packed in a CALL operand
+MAX_ARGUMENTS = 0xFFFF
+MAX_FUNCTIONS = 2 ** (8 * array('I').itemsize - 16)
+
+OPCODES: dict[TokenType, int] = {
+    TokenType.ADDITION: ADD,
+    TokenType.SUBTRACTION: SUB,
+    TokenType.MULTIPLICATION: MUL,
+    TokenType.DIVISION: DIV,
+    TokenType.EXPONENTIATION: POW,
+}
+
+MAGIC = b'PPRG'
+VERSION = 1
+# magic, version, instructions, constants, names, functions, source size
+HEADER = struct.Struct('<4sBIIIII')
+
+
+def little_endian(buffer: array) -> bytes:
+    if sys.byteorder == 'big':
+        buffer = array(buffer.typecode, buffer)
+        buffer.byteswap()
+    return buffer.tobytes()
+
+
+def from_little_endian(typecode: str, data) -> array:
+    buffer = array(typecode)
+    buffer.frombytes(data)
+    if sys.byteorder == 'big':
+        buffer.byteswap()
+    return buffer
+
+
+class Program:
+    """
+    An expression compiled to postfix instructions for a stack machine:
+        ```
+        program = Program.from_expression(Parser().compile('5 * x - sqrt(y)'))
+        program.evaluate({'x': 1, 'y': 4})
+        data = program.to_bytes()
+        Program.from_bytes(data).evaluate({'x': 2, 'y': 9})
+        ```
+
+    Programs give the same results as `Expression.evaluate`. They compute with
+    floats only, expressions compiled with a `numeric.Backend` are rejected.
+    """
+    __slots__ = ('source', 'opcodes', 'operands', 'constants', 'names', 'function_names', 'callables')
+
+    def __init__(self, source: str, opcodes: array, operands: array, constants: array, names: tuple[str],
+                 function_names: tuple[str], functions: FunctionRegistry = DEFAULT_FUNCTIONS):
+        self.source = source
+        self.opcodes = opcodes
+        self.operands = operands
+        self.constants = constants
+        self.names = names
+        self.function_names = function_names
+
+        try:
+            self.callables = tuple(functions[name].callable for name in function_names)
+        except KeyError as error:
+            raise ParserError(f'ivalid operation: {error.args[0]}')
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def __repr__(self):
+        return f'Program({self.source!r})'
+
+    @classmethod
+    def from_expression(cls, expression: Expression) -> 'Program':
+        if expression.backend is not None:
+            raise ParserError(f'programs compute with floats only, cannot compile [{expression.source}]'
+                              f' with the {expression.backend.name} backend')
+
+        opcodes, operands = array('B'), array('I')
+        constants, constant_indexes = array('d'), {}
+        names, function_names = {}, {}
+
+        def intern(table: dict, key) -> int:
+            return table.setdefault(key, len(table))
+
+        # post-order traversal: children are emitted before their parent
+        stack = [(expression.tree, False)]
+        while stack:
+            node, visited = stack.pop()
+            if node.children and not visited:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
+                continue
+
+            if node.type == TokenType.NUMBER:
+                index = constant_indexes.get(node.value)
+                if index is None:
+                    index = constant_indexes[node.value] = len(constants)
+                    constants.append(node.value)
+                opcode, operand = CONST, index
+            elif node.type == TokenType.IDENTIFIER:
+                opcode, operand = LOAD, intern(names, sys.intern(node.value))
+            elif node.type == TokenType.FUNCTION:
+                index = intern(function_names, node.value)
+                if len(node.children) > MAX_ARGUMENTS or index >= MAX_FUNCTIONS:
+                    raise ParserError(f'programs call functions with at most {MAX_ARGUMENTS} arguments and at most'
+                                      f' {MAX_FUNCTIONS} distinct functions, cannot call [{node.value}]'
+                                      f' with [{len(node.children)}] arguments')
+                opcode, operand = CALL, index << 16 | len(node.children)
+            elif syntaxtree.is_unary(node):
+                opcode, operand = NEG, 0
+            else:
+                opcode, operand = OPCODES[node.type], 0
+
+            opcodes.append(opcode)
+            operands.append(operand)
+
+        return cls(expression.source, opcodes, operands, constants, tuple(names), tuple(function_names),
+                   expression.functions)
+
+    def evaluate(self, runtime: dict[str, float] = None) -> any:
+        scope = Scope({} if runtime is None else runtime)
+        constants, names, callables = self.constants, self.names, self.callables
+        stack = []
+        push, pop = stack.append, stack.pop
+
+        for opcode, operand in zip(self.opcodes, self.operands):
+            if opcode == CONST:
+                push(constants[operand])
+            elif opcode == LOAD:
+                push(scope[names[operand]])
+            elif opcode == MUL:
+                right = pop()
+                stack[-1] = stack[-1] * right
+            elif opcode == ADD:
+                right = pop()
+                stack[-1] = stack[-1] + right
+            elif opcode == SUB:
+                right = pop()
+                stack[-1] = stack[-1] - right
+            elif opcode == DIV:
+                right = pop()
+                stack[-1] = stack[-1] / right
+            elif opcode == POW:
+                right = pop()
+                stack[-1] = stack[-1] ** right
+            elif opcode == NEG:
+                stack[-1] = -stack[-1]
+            else:
+                count = operand & 0xFFFF
+                arguments = stack[-count:]
+                del stack[-count:]
+                push(callables[operand >> 16](*arguments))
+
+        return stack[0]
+
+    def to_bytes(self) -> bytes:
+        source = self.source.encode()
+        names = '\n'.join(self.names).encode()
+        function_names = '\n'.join(self.function_names).encode()
+        header = HEADER.pack(MAGIC, VERSION, len(self.opcodes), len(self.constants), len(names),
+                             len(function_names), len(source))
+        return b''.join([header, self.opcodes.tobytes(), little_endian(self.operands),
+                         little_endian(self.constants), names, function_names, source])
+
+    @classmethod
+    def from_bytes(cls, data: bytes, functions: FunctionRegistry = DEFAULT_FUNCTIONS) -> 'Program':
+        """
+        Loads a program serialized by `to_bytes`, `data` may be any bytes-like
+        object, e.g. a `memoryview` of a memory mapped file.
+        """
+        data = memoryview(data)
+        try:
+            magic, version, instructions, constants, names, function_names, source = HEADER.unpack_from(data)
+        except struct.error:
+            raise ParserError('invalid program: truncated header')
+
+        if magic != MAGIC or version != VERSION:
+            raise ParserError(f'invalid program: unsupported format [{bytes(magic)!r} v{version}]')
+
+        sizes = [instructions, instructions * array('I').itemsize, constants * array('d').itemsize, names,
+                 function_names, source]
+        if HEADER.size + sum(sizes) > len(data):
+            raise ParserError('invalid program: truncated data')
+
+        sections = []
+        offset = HEADER.size
+        for size in sizes:
+            sections.append(data[offset:offset + size])
+            offset += size
+
+        def split(section) -> tuple[str]:
+            return tuple(sys.intern(name) for name in bytes(section).decode().split('\n')) if section else ()
+
+        return cls(bytes(sections[5]).decode(), array('B', sections[0]), from_little_endian('I', sections[1]),
+                   from_little_endian('d', sections[2]), split(sections[3]), split(sections[4]), functions)
@@ -0,0 +1,168 @@
+# Registry of the operators and functions understood by the parser
+#
+# Every function is described once, by its name, arity and callable. The
+# parser checks the arity of a call when it compiles the expression and the
+# evaluation dispatches through a dictionary lookup.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import hashlib
+import math
+import operator
+from collections import namedtuple
+from typing import Callable
+
+from tokenizer import TokenPattern, TokenType, compile_token_spec, token_spec
+
+# `max_arity` is None for variadic functions, `vectorized` is an optional
+# elementwise (NumPy) equivalent of `callable` and `lazy` an optional equivalent
+# that receives its arguments as thunks, see `prattparser.evaluate_lazy`
+Function = namedtuple('Function', 'name callable min_arity max_arity vectorized lazy', defaults=(None, None))
+
+Operator = namedtuple('Operator', 'symbol precedence right_associative callable')
+
+OPERATORS: dict[TokenType, Operator] = {
+    TokenType.EXPONENTIATION: Operator('^', 5, True, operator.pow),
+    TokenType.MULTIPLICATION: Operator('*', 3, False, operator.mul),
+    TokenType.DIVISION: Operator('/', 3, False, operator.truediv),
+    TokenType.ADDITION: Operator('+', 2, False, operator.add),
+    TokenType.SUBTRACTION: Operator('-', 2, False, operator.sub),
+}
+
+# a unary operation (-) technically has higher precedence than multiplication/division
+# but lower precedence than exponentiation.
+UNARY_PRECEDENCE: int = 4
+
+PRECEDENCE: dict[str, int] = {op.symbol: op.precedence for op in OPERATORS.values()} | {'unary': UNARY_PRECEDENCE}
+
+
+class FunctionRegistry:
+    """
+    Maps function names to their definition.
+
+    The registry also owns the tokenizer pattern that recognizes its function
+    names, the pattern is rebuilt once per registration instead of once per
+    token. Registries are cheap to copy, use `copy` to extend the default
+    functions without changing them for every parser:
+        ```
+        functions = DEFAULT_FUNCTIONS.copy()
+        functions.register('hypot', math.hypot, 2)
+        parser = Parser(functions=functions)
+        ```
+    """
+    def __init__(self, functions: list[Function] = ()):
+        self.functions: dict[str, Function] = {function.name: function for function in functions}
+        self.token_pattern: TokenPattern = self.compile_token_pattern()
+
+    def __getitem__(self, name: str) -> Function:
+        return self.functions[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.functions
+
+    def __iter__(self):
+        return iter(self.functions.values())
+
+    def __len__(self):
+        return len(self.functions)
+
+    def compile_token_pattern(self) -> TokenPattern:
+        return compile_token_spec(token_spec(list(self.functions)))
+
+    def register(self, name: str, callable: Callable, min_arity: int = 1, max_arity: int = -1,
+                 vectorized: Callable = None, lazy: Callable = None) -> Function:
+        """
+        Registers a function, `max_arity` defaults to `min_arity`, pass None to
+        accept any number of arguments after the first `min_arity` ones.
+        """
+        if not name.isidentifier():
+            raise ValueError(f'invalid function name: [{name}]')
+
+        if max_arity == -1:
+            max_arity = min_arity
+
+        function = Function(name, callable, min_arity, max_arity, vectorized, lazy)
+        self.functions[name] = function
+        self.token_pattern = self.compile_token_pattern()
+        return function
+
+    def copy(self) -> 'FunctionRegistry':
+        return FunctionRegistry(self.functions.values())
+
+    def fingerprint(self) -> bytes:
+        """
+        Digest of the functions of the registry and of the operators, it changes
+        whenever a definition changes. Callables are identified by their module
+        and qualified name.
+        """
+        digest = hashlib.sha256()
+        for function in sorted(self.functions.values(), key=lambda function: function.name):
+            callable_name = f'{getattr(function.callable, "__module__", None)}.' \
+                            f'{getattr(function.callable, "__qualname__", type(function.callable).__qualname__)}'
+            digest.update(f'F {function.name} {function.min_arity} {function.max_arity} {callable_name}\n'.encode())
+        for token_type, op in OPERATORS.items():
+            digest.update(f'O {token_type.name} {op.symbol} {op.precedence} {op.right_associative}\n'.encode())
+        digest.update(f'U {UNARY_PRECEDENCE}\n'.encode())
+        return digest.digest()
+
+
+# conditionals, a condition is true when it is not zero
+def choose(condition, then, otherwise):
+    return then if condition else otherwise
+
+
+def clamp(value, low, high):
+    return low if value < low else high if value > high else value
+
+
+# the lazy equivalents force only the arguments that decide the result
+def lazy_choose(condition, then, otherwise):
+    return then() if condition() else otherwise()
+
+
+def lazy_clamp(value, low, high):
+    value, low = value(), low()
+    if value < low:
+        return low
+    high = high()
+    return high if value > high else value
+
+
+# `max` stops at infinity and `min` at minus infinity, no other argument can
+# change their result
+def lazy_max(*arguments):
+    result = arguments[0]()
+    for argument in arguments[1:]:
+        if result == math.inf:
+            break
+        value = argument()
+        if value > result:
+            result = value
+    return result
+
+
+def lazy_min(*arguments):
+    result = arguments[0]()
+    for argument in arguments[1:]:
+        if result == -math.inf:
+            break
+        value = argument()
+        if value < result:
+            result = value
+    return result
+
+
+DEFAULT_FUNCTIONS = FunctionRegistry([
+    Function('sin', math.sin, 1, 1),
+    Function('cos', math.cos, 1, 1),
+    Function('tan', math.tan, 1, 1),
+    Function('pow', math.pow, 2, 2),
+    Function('sqrt', math.sqrt, 1, 1),
+    Function('log', math.log, 2, 2),
+    Function('max', max, 2, None, lazy=lazy_max),
+    Function('min', min, 2, None, lazy=lazy_min),
+    Function('if', choose, 3, 3, lazy=lazy_choose),
+    Function('clamp', clamp, 3, 3, lazy=lazy_clamp),
+])
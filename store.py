@@ -0,0 +1,186 @@
+# Persistent store of compiled expressions
+#
+# Saves a catalog of expressions, compiled to `Program`s, in a single binary
+# file that workers memory map when they start. Looking an expression up reads
+# only its index entry and its program, so the start up time does not depend
+# on the size of the catalog.
+#
+# File layout (little-endian):
+#
+#   header  magic, store version, program version, functions fingerprint,
+#           number of entries
+#   index   entries sorted by key: key (16 bytes), offset (8 bytes), size (4 bytes)
+#   data    the serialized programs
+#
+# The key of an expression is a hash of the fingerprint of the functions and of
+# its source, entries compiled with other function or operator definitions are
+# never returned.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import hashlib
+import mmap
+import os
+import stat
+import struct
+import tempfile
+from typing import Iterable
+
+import program
+from prattparser import Parser, ParserError
+from program import Program
+from registry import DEFAULT_FUNCTIONS, FunctionRegistry
+from tokenizer import TokenizerError
+
+MAGIC = b'PPST'
+VERSION = 1
+HEADER = struct.Struct('<4sBB32sI')
+ENTRY = struct.Struct('<16sQI')
+
+
+def key_of(fingerprint: bytes, source: str) -> bytes:
+    return hashlib.sha256(fingerprint + b'\0' + source.encode()).digest()[:16]
+
+
+# the mode of the file at `path`, or the one `open` gives a new file
+def file_mode(path: str) -> int:
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+class ExpressionStore:
+    """
+    Read-only, memory mapped store of compiled expressions:
+        ```
+        ExpressionStore.write('catalog.bin', sources)
+
+        with ExpressionStore('catalog.bin') as store:
+            program = store.get('5 * x - sqrt(y)')  # None if not in the store
+        ```
+
+    A store written with different functions or operators than `functions` is
+    stale: all of its lookups miss and `stale` is True.
+    """
+    def __init__(self, path: str, functions: FunctionRegistry = DEFAULT_FUNCTIONS):
+        self.path = path
+        self.functions = functions
+        self.fingerprint = functions.fingerprint()
+
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(file.fileno()).st_size else b''
+
+        try:
+            self.check_header()
+        except ParserError:
+            self.close()
+            raise
+
+    def check_header(self):
+        try:
+            magic, version, program_version, fingerprint, self.count = HEADER.unpack_from(self.data)
+        except struct.error:
+            raise ParserError(f'invalid expression store [{self.path}]: truncated header')
+
+        if magic != MAGIC or version != VERSION:
+            raise ParserError(f'invalid expression store [{self.path}]: unsupported format')
+
+        if HEADER.size + self.count * ENTRY.size > len(self.data):
+            raise ParserError(f'invalid expression store [{self.path}]: truncated index')
+
+        self.stale = fingerprint != self.fingerprint or program_version != program.VERSION
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self):
+        return 0 if self.stale else self.count
+
+    def __contains__(self, source: str):
+        return self.find(source) is not None
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def entry(self, index: int) -> tuple[bytes, int, int]:
+        return ENTRY.unpack_from(self.data, HEADER.size + index * ENTRY.size)
+
+    # binary search in the sorted index
+    def find(self, source: str) -> tuple[int, int]:
+        if self.stale:
+            return None
+
+        key = key_of(self.fingerprint, source)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_key, offset, size = self.entry(middle)
+            if entry_key < key:
+                low = middle + 1
+            elif entry_key > key:
+                high = middle
+            else:
+                return offset, size
+        return None
+
+    def get(self, source: str) -> Program:
+        found = self.find(source)
+        if found is None:
+            return None
+
+        offset, size = found
+        compiled = Program.from_bytes(memoryview(self.data)[offset:offset + size], self.functions)
+        # guards against (very unlikely) collisions of the truncated key
+        return compiled if compiled.source == source else None
+
+    @staticmethod
+    def write(path: str, sources: Iterable[str], functions: FunctionRegistry = DEFAULT_FUNCTIONS) -> list[tuple]:
+        """
+        Compiles `sources` and writes them to a new store at `path`, replacing it
+        atomically. Returns the sources that could not be compiled, as
+        `(source, error)`.
+        """
+        parser = Parser(functions=functions)
+        fingerprint = functions.fingerprint()
+        programs: dict[bytes, bytes] = {}
+        errors = []
+
+        for source in sources:
+            try:
+                programs[key_of(fingerprint, source)] = Program.from_expression(parser.compile(source)).to_bytes()
+            except (ParserError, TokenizerError) as error:
+                errors.append((source, error))
+
+        keys = sorted(programs)
+        offset = HEADER.size + len(keys) * ENTRY.size
+        index = []
+        for key in keys:
+            index.append(ENTRY.pack(key, offset, len(programs[key])))
+            offset += len(programs[key])
+
+        # the temporary file is created with mode 0600, the store gets the mode
+        # of the file it replaces or the one of a new file
+        mode = file_mode(path)
+        directory = os.path.dirname(os.path.abspath(path))
+        file = tempfile.NamedTemporaryFile('wb', dir=directory, delete=False)
+        try:
+            with file:
+                file.write(HEADER.pack(MAGIC, VERSION, program.VERSION, fingerprint, len(keys)))
+                file.writelines(index)
+                file.writelines(programs[key] for key in keys)
+            os.chmod(file.name, mode)
+            os.replace(file.name, path)
+        except BaseException:
+            os.unlink(file.name)
+            raise
+
+        return errors
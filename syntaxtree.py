@@ -0,0 +1,156 @@
+# Abstract syntax tree for compiled math expressions
+#
+# `Parser.compile` builds a tree of `Node`s once per expression, the tree can
+# then be evaluated many times against different runtimes without paying the
+# cost of tokenizing and parsing the input again.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import math
+from collections import namedtuple
+from decimal import Decimal
+from typing import Callable
+
+from registry import OPERATORS, UNARY_PRECEDENCE
+from tokenizer import TokenType
+
+ATOM_PRECEDENCE = math.inf
+
+
+# A node mirrors the `Token` it was built from:
+#   - NUMBER:      value is the converted number, no children
+#   - IDENTIFIER:  value is the variable name, no children
+#   - FUNCTION:    value is the function name, children are the arguments
+#   - operators:   value is the operator symbol, children are the operands
+#                  (a single child for the unary minus)
+Node = namedtuple('Node', 'type value children')
+
+
+def number(value) -> Node:
+    return Node(TokenType.NUMBER, value, ())
+
+
+def variable(name: str) -> Node:
+    return Node(TokenType.IDENTIFIER, name, ())
+
+
+def unary(operand: Node) -> Node:
+    return Node(TokenType.SUBTRACTION, '-', (operand,))
+
+
+def binary(operator_type: TokenType, left: Node, right: Node) -> Node:
+    return Node(operator_type, operator_type.value, (left, right))
+
+
+def function(name: str, arguments: list[Node]) -> Node:
+    return Node(TokenType.FUNCTION, name, tuple(arguments))
+
+
+def is_unary(node: Node) -> bool:
+    return node.type == TokenType.SUBTRACTION and len(node.children) == 1
+
+
+# iterates over the nodes of a tree in pre-order without recursion
+def walk(node: Node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children))
+
+
+# the variables and functions referenced by a tree, in order of appearance
+References = namedtuple('References', 'variables functions')
+
+
+def references(node: Node) -> References:
+    variables, functions = {}, {}
+    for child in walk(node):
+        if child.type == TokenType.IDENTIFIER:
+            variables[child.value] = None
+        elif child.type == TokenType.FUNCTION:
+            functions[child.value] = None
+    return References(tuple(variables), tuple(functions))
+
+
+# the names of the variables referenced by a tree, in order of appearance
+def variables(node: Node) -> list[str]:
+    return list(references(node).variables)
+
+
+# rebuilds a tree with each leaf (number or variable) replaced by `replace(leaf)`,
+# without recursion
+def map_leaves(node: Node, replace: Callable[[Node], Node]) -> Node:
+    replaced: dict[int, Node] = {}
+    root = node
+    stack = [(node, False)]
+    while stack:
+        node, visited = stack.pop()
+        if node.children and not visited:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.children)
+            continue
+
+        if node.children:
+            replaced[id(node)] = node._replace(children=tuple(replaced[id(child)] for child in node.children))
+        else:
+            replaced[id(node)] = replace(node)
+    return replaced[id(root)]
+
+
+def format_number(value) -> str:
+    # the tokenizer does not read exponents, e.g. `1e-05`
+    text = repr(value) if isinstance(value, float) else str(value)
+    if 'e' in text or 'E' in text:
+        text = format(Decimal(text), 'f')
+    return text
+
+
+# precedence of a node when printed, atoms bind the tightest
+def printed_precedence(node: Node) -> int:
+    if node.type == TokenType.NUMBER:
+        precedence = UNARY_PRECEDENCE if node.value < 0 or math.copysign(1, node.value) < 0 else ATOM_PRECEDENCE
+        # fractions are printed as a division, e.g. `1/3`
+        if getattr(node.value, 'denominator', 1) != 1:
+            precedence = min(precedence, OPERATORS[TokenType.DIVISION].precedence)
+        return precedence
+    if node.type in (TokenType.IDENTIFIER, TokenType.FUNCTION):
+        return ATOM_PRECEDENCE
+    if is_unary(node):
+        return UNARY_PRECEDENCE
+    return OPERATORS[node.type].precedence
+
+
+def to_source(node: Node) -> str:
+    """
+    Prints a tree as an expression that parses back to an equivalent tree, with
+    only the parentheses required by the precedences. Numbers that are not
+    finite, e.g. `inf`, have no source form and are printed as Python does.
+    """
+    if node.type == TokenType.NUMBER:
+        return format_number(node.value)
+
+    if node.type == TokenType.IDENTIFIER:
+        return node.value
+
+    if node.type == TokenType.FUNCTION:
+        return f'{node.value}({", ".join(to_source(child) for child in node.children)})'
+
+    def operand(child: Node, parenthesize: bool) -> str:
+        return f'({to_source(child)})' if parenthesize else to_source(child)
+
+    if is_unary(node):
+        child = node.children[0]
+        return '-' + operand(child, printed_precedence(child) <= UNARY_PRECEDENCE)
+
+    precedence = OPERATORS[node.type].precedence
+    right_associative = OPERATORS[node.type].right_associative
+    left, right = node.children
+    left_precedence, right_precedence = printed_precedence(left), printed_precedence(right)
+    # operands that bind as tightly as the operator are parenthesized on the side
+    # it does not associate to
+    parenthesize_left = left_precedence < precedence or (right_associative and left_precedence == precedence)
+    parenthesize_right = right_precedence < precedence or (not right_associative and right_precedence == precedence)
+    return f'{operand(left, parenthesize_left)} {node.value} {operand(right, parenthesize_right)}'
@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+
+from asynceval import evaluate_async
+from prattparser import Parser, ParserError
+
+
+class FakeBackend:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self.calls = 0
+
+    def variable(self, value):
+        async def resolver():
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            try:
+                await asyncio.sleep(self.delay)
+            finally:
+                self.running -= 1
+            return value
+        return resolver
+
+
+class TestAsyncEvaluation(unittest.IsolatedAsyncioTestCase):
+
+    async def testResolvesConcurrently(self):
+        backend = FakeBackend()
+        runtime = {name: backend.variable(value) for name, value in zip('abcd', range(1, 5))}
+        self.assertEqual(await evaluate_async(Parser().compile('a + b * c - d'), runtime), 3)
+        self.assertEqual(backend.max_running, 4)
+
+    async def testConcurrencyLimit(self):
+        backend = FakeBackend()
+        runtime = {name: backend.variable(1) for name in 'abcd'}
+        self.assertEqual(await evaluate_async(Parser().compile('a + b + c + d'), runtime, concurrency=2), 4)
+        self.assertEqual(backend.max_running, 2)
+
+    async def testOnlyReferencedVariables(self):
+        backend = FakeBackend()
+        runtime = {'a': backend.variable(1), 'unused': backend.variable(2)}
+        await evaluate_async(Parser().compile('a + a'), runtime)
+        self.assertEqual(backend.calls, 1)
+
+    async def testMixedVariables(self):
+        backend = FakeBackend()
+        runtime = {'a': backend.variable(2), 'b': 3, 'c': lambda scope: scope['a'] * 10}
+        self.assertEqual(await evaluate_async(Parser().compile('a * b + c'), runtime), 26)
+
+    async def testAwaitableValue(self):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(5)
+        self.assertEqual(await evaluate_async(Parser().compile('x + 1'), {'x': future}), 6)
+
+    async def testAwaitedThroughDynamicVariable(self):
+        backend = FakeBackend()
+        runtime = {'a': lambda scope: scope['b'] * 10, 'b': backend.variable(2), 'c': 1}
+        self.assertEqual(await evaluate_async(Parser().compile('a + c'), runtime), 21)
+        self.assertEqual(backend.calls, 1)
+
+    async def testAsyncCallableObject(self):
+        class Price:
+            async def __call__(self):
+                await asyncio.sleep(0)
+                return 4
+
+        self.assertEqual(await evaluate_async(Parser().compile('price * 2'), {'price': Price()}), 8)
+
+    async def testTimeout(self):
+        runtime = {'a': FakeBackend(delay=1).variable(1)}
+        with self.assertRaisesRegex(ParserError, r'timeout when resolving variable \[a\]'):
+            await evaluate_async(Parser().compile('a + 1'), runtime, timeout=0.01)
+
+    async def testUnresolvedVariable(self):
+        with self.assertRaises(ParserError):
+            await evaluate_async(Parser().compile('a + 1'), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+import batch
+from batch import Result, evaluate_many, iter_evaluate
+from prattparser import Parser, ParserError
+from tokenizer import TokenizerError
+
+
+class TestBatchEvaluation(unittest.TestCase):
+    pairs = [
+        ('a + 1', {'a': 1}),
+        ('2 * x', {'x': 3}),
+        ('a + 1', {'a': 10}),
+        ('(1 + 2', {}),
+        ('1 / a', {'a': 0}),
+        ('2 # 3', {}),
+        ('a + z', {'a': 1}),
+        ('(1 + 2', {}),
+        ('max(a, b, 3)', {'a': 1, 'b': 5}),
+    ]
+
+    def assertResults(self, results):
+        self.assertEqual(len(results), len(self.pairs))
+        self.assertEqual(results[0], Result(2, None))
+        self.assertEqual(results[1], Result(6, None))
+        self.assertEqual(results[2], Result(11, None))
+        self.assertIsInstance(results[3].error, ParserError)
+        self.assertIsInstance(results[4].error, ZeroDivisionError)
+        self.assertIsInstance(results[5].error, TokenizerError)
+        self.assertIsInstance(results[6].error, ParserError)
+        self.assertIsInstance(results[7].error, ParserError)
+        self.assertEqual(results[8], Result(5, None))
+
+    def testInProcess(self):
+        self.assertResults(evaluate_many(self.pairs, workers=1, chunksize=2))
+
+    def testProcessPool(self):
+        self.assertResults(evaluate_many(self.pairs, workers=2, chunksize=2))
+
+    def testOrderIsPreserved(self):
+        pairs = [('x * 2', {'x': i}) for i in range(1000)]
+        results = evaluate_many(pairs, workers=2, chunksize=64)
+        self.assertEqual([result.value for result in results], [2 * i for i in range(1000)])
+
+    def testDistinctExpressionsAreCompiledOnce(self):
+        pairs = [('x * 2', {'x': 1}), ('x * 2', {'x': 2}), ('x + 2', {'x': 3}), ('(', {})]
+        expressions, items, errors = batch.compile_batch(pairs, Parser())
+        self.assertEqual([expression.source for expression in expressions], ['x * 2', 'x + 2'])
+        self.assertEqual([index for index, _ in items], [0, 0, 1])
+        self.assertEqual([position for position, _ in errors], [3])
+
+    def testNestedInProcessBatches(self):
+        def nested():
+            return evaluate_many([('3', {})], workers=1)[0].value
+
+        results = evaluate_many([('a + 1', {'a': nested}), ('b * 10', {'b': 2})], workers=1)
+        self.assertEqual(results, [Result(4, None), Result(20, None)])
+
+    def testResultsAreYieldedPerChunk(self):
+        pairs = [('x * 2', {'x': i}) for i in range(100)] + [('(', {})]
+        for workers in [1, 2]:
+            results = iter_evaluate(pairs, workers=workers, chunksize=8)
+            self.assertEqual(next(results), Result(0, None))
+            self.assertEqual([result.value for result in results][:-1], [2 * i for i in range(1, 100)])
+
+        evaluated = []
+        results = iter_evaluate([('x', {'x': lambda i=i: evaluated.append(i) or i}) for i in range(100)],
+                                workers=1, chunksize=8)
+        next(results)
+        self.assertEqual(len(evaluated), 8)
+
+    def testEmptyBatch(self):
+        self.assertEqual(evaluate_many([], workers=1), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
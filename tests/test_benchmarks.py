@@ -0,0 +1,29 @@
+import unittest
+
+from benchmarks.generator import GeneratorConfig, generate
+from benchmarks.suite import compare
+from prattparser import Parser
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def testGeneratorIsDeterministic(self):
+        config = GeneratorConfig(length=10, depth=3, function_density=0.5, variables=4)
+        self.assertEqual(generate(20, config, seed=7), generate(20, config, seed=7))
+        self.assertNotEqual(generate(20, config, seed=7), generate(20, config, seed=8))
+
+    def testGeneratedExpressionsEvaluate(self):
+        parser = Parser()
+        for source, runtime in generate(50, GeneratorConfig(length=8, depth=4, function_density=0.8)):
+            self.assertIsInstance(parser.compile(source).evaluate(runtime), float)
+
+    def testNoFunctionsOrVariables(self):
+        for source, runtime in generate(20, GeneratorConfig(length=5, depth=2, function_density=0, variables=0)):
+            self.assertEqual(runtime, {})
+            self.assertNotRegex(source, '[a-z]')
+
+    def testCompare(self):
+        baseline = {'results': {'parses/sec': 1000.0, 'tokens/sec': 1000.0}}
+        current = {'results': {'parses/sec': 850.0, 'tokens/sec': 950.0}}
+        self.assertEqual(compare(baseline, current, 0.1), [('parses/sec', 1000.0, 850.0, 0.85)])
+        self.assertEqual(compare(baseline, current, 0.2), [])
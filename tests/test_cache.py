@@ -0,0 +1,89 @@
+import threading
+import unittest
+from decimal import Decimal
+
+from cache import ExpressionCache
+from numeric import DECIMAL
+from prattparser import Parser, ParserError
+
+
+class TestExpressionCache(unittest.TestCase):
+
+    def testHitsAndMisses(self):
+        cache = ExpressionCache(maxsize=4)
+        parser = Parser({'x': 2}, cache=cache)
+        self.assertEqual(parser.parse('x * 3'), 6)
+        self.assertEqual(parser.parse('x * 3'), 6)
+        self.assertEqual(cache.info(), (1, 1, 0, 4, 1))
+
+    def testReusesCompiledExpression(self):
+        parser = Parser(cache=ExpressionCache())
+        self.assertIs(parser.compile('1 + 2'), parser.compile('1 + 2'))
+
+    def testLeastRecentlyUsedEviction(self):
+        cache = ExpressionCache(maxsize=2)
+        parser = Parser(cache=cache)
+        parser.compile('1')
+        parser.compile('2')
+        parser.compile('1')
+        parser.compile('3')
+        self.assertIn(parser.cache_key('1'), cache)
+        self.assertNotIn(parser.cache_key('2'), cache)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(len(cache), 2)
+
+    def testErrorsAreNotCached(self):
+        cache = ExpressionCache()
+        parser = Parser(cache=cache)
+        self.assertRaises(ParserError, parser.compile, '(1')
+        self.assertEqual(len(cache), 0)
+
+    def testSharedAcrossParsers(self):
+        cache = ExpressionCache()
+        Parser(cache=cache).compile('a + b')
+        self.assertEqual(Parser({'a': 1, 'b': 2}, cache=cache).parse('a + b'), 3)
+        self.assertEqual(cache.hits, 1)
+
+    def testNotSharedAcrossFunctions(self):
+        cache = ExpressionCache()
+        parser = Parser(cache=cache)
+        parser.register_function('sq', lambda x: x * x, 1, 1)
+        self.assertEqual(parser.parse('sq(3)'), 9)
+        self.assertRaises(ParserError, Parser(cache=cache).compile, 'sq(3)')
+
+    def testNotSharedAcrossBackends(self):
+        cache = ExpressionCache()
+        self.assertEqual(Parser(cache=cache).parse('0.1 + 0.2'), 0.1 + 0.2)
+        self.assertEqual(Parser(cache=cache, backend=DECIMAL).parse('0.1 + 0.2'), Decimal('0.3'))
+        self.assertEqual(cache.hits, 0)
+
+    def testClear(self):
+        cache = ExpressionCache()
+        Parser(cache=cache).compile('1')
+        cache.clear()
+        self.assertEqual(cache.info(), (0, 0, 0, 128, 0))
+
+    def testInvalidSize(self):
+        self.assertRaises(ValueError, ExpressionCache, 0)
+
+    def testThreadSafety(self):
+        cache = ExpressionCache(maxsize=8)
+
+        def work():
+            parser = Parser(cache=cache)
+            for i in range(500):
+                parser.compile(f'{i % 16} + 1')
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        info = cache.info()
+        self.assertEqual(info.hits + info.misses, 8 * 500)
+        self.assertLessEqual(info.currsize, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import decimal
+import math
+import unittest
+
+from canonical import StructureIndex, canonicalize, fingerprint
+from numeric import DECIMAL, decimal_backend
+from prattparser import Parser, ParserError
+
+
+class TestCanonicalForm(unittest.TestCase):
+
+    def testWhitespaceAndParentheses(self):
+        parser = Parser()
+        sources = ['a + b*2', '(a)+(b * 2)', ' a+ ( (b) *2.0 ) ', '((a + (b * 2)))']
+        canonicals = [canonicalize(parser.compile(source)) for source in sources]
+        self.assertEqual({canonical.source for canonical in canonicals}, {'a + b * 2.0'})
+        self.assertEqual(len({canonical.fingerprint for canonical in canonicals}), 1)
+
+    def testDifferentStructures(self):
+        parser = Parser()
+        self.assertNotEqual(fingerprint(parser.compile('a + b * 2')), fingerprint(parser.compile('(a + b) * 2')))
+        self.assertNotEqual(fingerprint(parser.compile('a - b - c')), fingerprint(parser.compile('a - (b - c)')))
+        self.assertNotEqual(fingerprint(parser.compile('x + y')), fingerprint(parser.compile('a + b')))
+
+    def testAlphaRenaming(self):
+        parser = Parser()
+        first = canonicalize(parser.compile('x * y + x'), rename=True)
+        second = canonicalize(parser.compile('(alpha * beta) + alpha'), rename=True)
+        self.assertEqual(first.source, '_0 * _1 + _0')
+        self.assertEqual(first.fingerprint, second.fingerprint)
+        self.assertEqual(first.variables, ('x', 'y'))
+        self.assertEqual(second.variables, ('alpha', 'beta'))
+        self.assertNotEqual(first.fingerprint, fingerprint(parser.compile('x * y + y'), rename=True))
+
+    def testFunctionsArePartOfTheFingerprint(self):
+        other = Parser()
+        other.register_function('sin', math.cos, 1, 1)
+        self.assertNotEqual(fingerprint(Parser().compile('sin(x)')), fingerprint(other.compile('sin(x)')))
+
+    def testBackendIsPartOfTheFingerprint(self):
+        fingerprints = {fingerprint(Parser(backend=backend).compile('x / 3')) for backend in [
+            None, DECIMAL, decimal_backend(decimal.Context(prec=5)),
+            decimal_backend(decimal.Context(prec=5, rounding=decimal.ROUND_DOWN))]}
+        self.assertEqual(len(fingerprints), 4)
+        self.assertEqual(fingerprint(Parser(backend=decimal_backend()).compile('x / 3')),
+                         fingerprint(Parser(backend=DECIMAL).compile('x / 3')))
+
+    def testCanonicalSourceCompilesToTheSameTree(self):
+        parser = Parser()
+        for source in ['-(x) ^ 2', '2 ^ (3 ^ 2)', 'max(a, (b), -c) / (d * e)', '0.00001 * x']:
+            canonical = canonicalize(parser.compile(source))
+            self.assertEqual(parser.compile(canonical.source).tree, canonical.tree)
+
+    def testDecimalLiterals(self):
+        canonical = canonicalize(Parser(backend=DECIMAL).compile('(1.10) * x'))
+        self.assertEqual(canonical.source, '1.10 * x')
+
+
+class TestStructureIndex(unittest.TestCase):
+
+    def testSharedCompiledForm(self):
+        index = StructureIndex()
+        first, second, third = index.add('a + b*2'), index.add('(a)+(b * 2)'), index.add('a * 2')
+        self.assertIs(first.expression, second.expression)
+        self.assertIsNot(first.expression, third.expression)
+        self.assertEqual(first.expression.source, 'a + b * 2.0')
+        self.assertEqual(index.stats(), (3, 2))
+        self.assertIs(index.add('a + b*2'), first)
+        self.assertEqual(sorted(map(len, index.groups().values())), [1, 2])
+
+    def testRenamedMembers(self):
+        index = StructureIndex(rename=True)
+        first = index.add('a + b*2')
+        second = index.add('(x)+(y * 2)')
+        self.assertIs(first.expression, second.expression)
+        self.assertEqual(index.compile('q + r * 2').source, '_0 + _1 * 2.0')
+        self.assertEqual(first.evaluate({'a': 1, 'b': 2}), 5.0)
+        self.assertEqual(second.evaluate({'x': 1, 'y': 3}), 7.0)
+        self.assertEqual(len(index), 1)
+
+    def testRenamedMissingAndDynamicVariables(self):
+        member = StructureIndex(rename=True).add('x * y')
+        with self.assertRaisesRegex(ParserError, r'\[y\]'):
+            member.evaluate({'x': 1})
+        self.assertEqual(member.evaluate({'x': 2, 'y': lambda scope: scope['x'] + 1}), 6)
+
+    def testCompileErrors(self):
+        index = StructureIndex()
+        with self.assertRaises(ParserError):
+            index.add('1 +')
+        self.assertEqual(index.stats(), (0, 0))
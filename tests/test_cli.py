@@ -0,0 +1,108 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import cli
+
+
+class TestCommandLine(unittest.TestCase):
+
+    def run_cli(self, argv, input_str=''):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        status = cli.main(argv, io.StringIO(input_str), stdout, stderr)
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def testPlainLines(self):
+        status, output, _ = self.run_cli([], '1 + 2\n\n2 ^ 2 ^ 3\n')
+        self.assertEqual(status, 0)
+        self.assertEqual(output, '3.0\n\n256.0\n')
+
+    def testJsonLines(self):
+        lines = [
+            json.dumps({'expression': 'a * 2', 'runtime': {'a': 4}}),
+            json.dumps({'expression': 'max(a, b)', 'runtime': {'a': 4, 'b': 5}}),
+        ]
+        status, output, _ = self.run_cli(['--json'], '\n'.join(lines))
+        self.assertEqual(status, 0)
+        self.assertEqual([json.loads(line) for line in output.splitlines()], [{'value': 8.0}, {'value': 5}])
+
+    def testStopsAtFirstError(self):
+        status, output, errors = self.run_cli([], '1 + 1\n(1 + 2\n3\n')
+        self.assertEqual(status, 1)
+        self.assertEqual(output, '2.0\n')
+        self.assertIn('line 2:', errors)
+
+    def testKeepGoing(self):
+        status, output, _ = self.run_cli(['--keep-going'], '1 / 0\n2 # 3\n3\n')
+        self.assertEqual(status, 1)
+        lines = output.splitlines()
+        self.assertTrue(lines[0].startswith('ERROR:'))
+        self.assertTrue(lines[1].startswith('ERROR:'))
+        self.assertEqual(lines[2], '3.0')
+
+    def testDeeplyNestedLine(self):
+        nested = '(' * 3000 + '1' + ')' * 3000
+        status, output, _ = self.run_cli(['--keep-going'], f'1 + 1\n{nested}\n-' + '(' * 3000 + '\n3\n')
+        self.assertEqual(status, 1)
+        lines = output.splitlines()
+        self.assertEqual(lines[:2], ['2.0', '1.0'])
+        self.assertTrue(lines[2].startswith('ERROR:'))
+        self.assertEqual(lines[3], '3.0')
+
+        # parsers that recurse report the line as an error
+        records = cli.parse_records([nested], False, {})
+        (_, result), = cli.evaluate_records(records, cli.Parser())
+        self.assertIsInstance(result.error, RecursionError)
+
+    def testResultsAreWrittenWhenTheInputFails(self):
+        def lines():
+            yield '1 + 1\n'
+            raise OSError('input closed')
+
+        stdout = io.StringIO()
+        with self.assertRaises(OSError):
+            cli.write_buffered(lines(), stdout, 1024)
+        self.assertEqual(stdout.getvalue(), '1 + 1\n')
+
+    def testInvalidJsonRecord(self):
+        status, output, _ = self.run_cli(['--json', '--keep-going'], 'not json\n{"expression": "1"}\n')
+        self.assertEqual(status, 1)
+        self.assertIn('error', json.loads(output.splitlines()[0]))
+        self.assertEqual(json.loads(output.splitlines()[1]), {'value': 1.0})
+
+    def testValuesWithoutJsonType(self):
+        status, output, _ = self.run_cli(['--json', '--keep-going'],
+                                         '{"expression": "(0-8) ^ 0.5"}\n{"expression": "1"}\n')
+        self.assertEqual(status, 0)
+        self.assertEqual([json.loads(line) for line in output.splitlines()],
+                         [{'value': str((0 - 8) ** 0.5)}, {'value': 1.0}])
+
+    def testFilesAndSharedRuntime(self):
+        with tempfile.TemporaryDirectory() as directory:
+            expressions = os.path.join(directory, 'expressions.txt')
+            runtime = os.path.join(directory, 'runtime.json')
+            with open(expressions, 'w') as file:
+                file.write('x + 1\nx * y\n')
+            with open(runtime, 'w') as file:
+                json.dump({'x': 2, 'y': 3}, file)
+
+            status, output, _ = self.run_cli([expressions, '--runtime', runtime, '--buffer-size', '1'])
+        self.assertEqual(status, 0)
+        self.assertEqual(output, '3.0\n6\n')
+
+    def testPipelineIsLazy(self):
+        def lines():
+            yield '1\n'
+            yield '(\n'
+            raise AssertionError('read past the first error')
+
+        records = cli.parse_records(lines(), False, {})
+        results = cli.evaluate_records(records, cli.Parser())
+        self.assertEqual(next(results)[1].value, 1)
+        self.assertIsNotNone(next(results)[1].error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from codegen import compile_function
+from prattparser import Parser, ParserError
+
+
+class TestCodeGeneration(unittest.TestCase):
+    runtime = {'a': 1, 'b': 2, 'c': 3, 'x': 2.5}
+
+    def assertSameResult(self, input_str):
+        expression = Parser().compile(input_str)
+        self.assertEqual(compile_function(expression)(self.runtime), expression.evaluate(self.runtime))
+
+    def testOperators(self):
+        self.assertSameResult('1 + 2 * 3.0 - 4 / 2')
+
+    def testExponentiationIsRightAssociative(self):
+        self.assertSameResult('2 ^ 2 ^ 3')
+
+    def testUnaryMinus(self):
+        self.assertSameResult('-2 ^ 2 + - - - x')
+
+    def testNegativeExponent(self):
+        self.assertSameResult('2 ^ -3')
+
+    def testFunctions(self):
+        self.assertSameResult('sin(x) + cos(x) + tan(x) + sqrt(c) + log(100, 10) + pow(c, b)')
+        self.assertSameResult('max(min(a, 5), pow(3, sqrt(4))) - 1')
+
+    def testVariables(self):
+        self.assertSameResult('a * (b + c) - x / 2')
+
+    def testAssociativity(self):
+        self.assertSameResult('a - (b - c) - (x - a) / (b / c) / x')
+        self.assertSameResult('(2 ^ 2) ^ 3 + (-2) ^ 2 - -(2 ^ 2) + -(a + b) * -c')
+
+    def testLongChain(self):
+        terms = [f'x{index}' for index in range(500)]
+        expression = Parser().compile(' + '.join(terms) + ' - ' + ' * '.join(['1'] * 500))
+        runtime = {term: index for index, term in enumerate(terms)}
+        self.assertEqual(compile_function(expression)(runtime), sum(range(500)) - 1)
+
+    def testSource(self):
+        function = compile_function(Parser().compile('5 * x - sqrt(y)'))
+        self.assertIn("return 5.0 * v0 - _sqrt(v1)", function.source)
+        self.assertIn("return 5.0 * scope['x'] - _sqrt(scope['y'])", function.source)
+
+    def testUnresolvedVariable(self):
+        function = compile_function(Parser().compile('a + z'))
+        self.assertRaisesRegex(ParserError, r'cannot resolve variable \[z\]', function, {'a': 1})
+
+    def testVariadicFunctions(self):
+        self.assertSameResult('max(a, b, c, x) - min(c, x, b)')
+
+    def testRegisteredFunction(self):
+        parser = Parser()
+        parser.register_function('double', lambda value: 2 * value)
+        expression = parser.compile('double(x) + 1')
+        self.assertEqual(compile_function(expression)({'x': 4}), 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
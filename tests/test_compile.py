@@ -0,0 +1,48 @@
+import math
+import unittest
+
+from prattparser import Expression, Parser, ParserError
+from tokenizer import TokenType
+
+
+class TestCompiledExpression(unittest.TestCase):
+
+    def compile(self, input_str):
+        return Parser().compile(input_str)
+
+    def testCompileReturnsExpression(self):
+        expression = self.compile('1 + 2')
+        self.assertIsInstance(expression, Expression)
+        self.assertEqual(expression.source, '1 + 2')
+
+    def testTreeShape(self):
+        tree = self.compile('1 + 2 * x').tree
+        self.assertEqual(tree.type, TokenType.ADDITION)
+        self.assertEqual(tree.children[0].value, 1.0)
+        self.assertEqual(tree.children[1].type, TokenType.MULTIPLICATION)
+        self.assertEqual(tree.children[1].children[1].value, 'x')
+
+    def testEvaluateManyRuntimes(self):
+        expression = self.compile('5 * (sqrt(9) + sin(2 * 3.14)) - x / 2')
+        for x in range(10):
+            self.assertEqual(expression.evaluate({'x': x}), 5 * (math.sqrt(9) + math.sin(2 * 3.14)) - x / 2)
+
+    def testEvaluateWithoutRuntime(self):
+        self.assertEqual(self.compile('2 ^ 2 ^ 3').evaluate(), 256)
+
+    def testSameResultAsParse(self):
+        runtime = {'a': 1, 'b': 2, 'c': 3}
+        input_str = 'a+b * (pow(c,b) * sqrt(9)) - -c'
+        self.assertEqual(self.compile(input_str).evaluate(runtime), Parser(runtime).parse(input_str))
+
+    def testUnresolvedVariableOnlyFailsOnEvaluate(self):
+        expression = self.compile('a + 1')
+        self.assertRaises(ParserError, expression.evaluate, {})
+        self.assertEqual(expression.evaluate({'a': 1}), 2)
+
+    def testSyntaxErrorFailsOnCompile(self):
+        self.assertRaises(ParserError, self.compile, '(1 + 2')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import math
+import unittest
+from decimal import Decimal
+
+from cse import ExpressionGroup, compile_group
+from numeric import DECIMAL, FRACTION
+from prattparser import Parser, ParserError
+
+
+class TestCommonSubexpressions(unittest.TestCase):
+
+    def testSameResultsAsSeparateEvaluation(self):
+        sources = ['sqrt(a^2 + b^2) / 2', 'max(sqrt(a^2 + b^2), c)', 'log(x, 10) * -a', 'log(x, 10) + 1',
+                   '2 ^ 3 ^ 2', 'a - b - c']
+        runtime = {'a': 3, 'b': 4, 'c': 1, 'x': 1000}
+        group = compile_group(sources)
+        self.assertEqual(group.evaluate(runtime), [Parser(runtime).parse(source) for source in sources])
+
+    def testStats(self):
+        group = compile_group(['sqrt(a^2 + b^2) / 2', 'max(sqrt(a^2 + b^2), c)'])
+        stats = group.stats
+        self.assertEqual(stats.expressions, 2)
+        self.assertEqual(stats.tree_nodes, 20)
+        self.assertEqual(stats.dag_nodes, 10)
+        self.assertEqual(stats.deduplicated, 10)
+
+    def testSharedNodesAreEvaluatedOnce(self):
+        calls = []
+
+        def hypot(a, b):
+            calls.append((a, b))
+            return math.hypot(a, b)
+
+        parser = Parser()
+        parser.register_function('hypot', hypot, 2, 2)
+        group = compile_group(['hypot(a, b) / 2', 'max(hypot(a, b), c)', 'hypot(a, b)'], parser)
+
+        self.assertEqual(group.evaluate({'a': 3, 'b': 4, 'c': 1}), [2.5, 5.0, 5.0])
+        self.assertEqual(calls, [(3, 4)])
+
+    def testDynamicVariablesAreResolvedOnce(self):
+        resolved = []
+        runtime = {'a': lambda: resolved.append('a') or 2}
+        self.assertEqual(compile_group(['a + 1', 'a * 2', 'a']).evaluate(runtime), [3.0, 4.0, 2])
+        self.assertEqual(resolved, ['a'])
+
+    def testDifferentFunctionsAreNotMerged(self):
+        first, second = Parser(), Parser()
+        first.register_function('f', lambda x: x + 1, 1, 1)
+        second.register_function('f', lambda x: x * 10, 1, 1)
+        group = ExpressionGroup([first.compile('f(2)'), second.compile('f(2)')])
+        self.assertEqual(group.evaluate(), [3.0, 20.0])
+        self.assertEqual(group.stats.deduplicated, 1)
+
+    def testBackend(self):
+        group = compile_group(['x * 0.1', 'x * 0.1 + 0.2'], Parser(backend=DECIMAL))
+        self.assertEqual(group.evaluate({'x': 1}), [Decimal('0.1'), Decimal('0.3')])
+
+    def testBackendsAreNotMixed(self):
+        self.assertRaises(ParserError, ExpressionGroup, [Parser().compile('x'), Parser(backend=FRACTION).compile('x')])
+
+    def testNumbersAreNotConfused(self):
+        group = compile_group(['0 * -1', '-0 * 1'])
+        self.assertEqual([math.copysign(1, value) for value in group.evaluate()], [-1.0, -1.0])
+
+    def testErrorsFailOnlyTheirExpressions(self):
+        group = compile_group(['1 / a + 1', 'b + 1', '2 / a'])
+        results = group.evaluate_results({'a': 0, 'b': 1})
+        self.assertIsInstance(results[0].error, ZeroDivisionError)
+        self.assertEqual(results[1].value, 2.0)
+        self.assertIsInstance(results[2].error, ZeroDivisionError)
+
+        with self.assertRaises(ParserError):
+            group.evaluate({'a': 1})
+
+    def testDeepExpressions(self):
+        source = '1' + ' + 1' * 5000
+        self.assertEqual(compile_group([source, source], Parser(iterative=True)).evaluate(), [5001.0, 5001.0])
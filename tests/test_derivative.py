@@ -0,0 +1,122 @@
+import decimal
+import math
+import unittest
+from decimal import Decimal
+from fractions import Fraction
+
+import syntaxtree
+from derivative import Gradient, derivatives, differentiate, gradient
+from numeric import FRACTION, decimal_backend
+from prattparser import Parser, ParserError
+from syntaxtree import to_source
+from tokenizer import TokenType
+
+
+class TestDifferentiation(unittest.TestCase):
+    runtime = {'x': 1.3, 'y': 2.2}
+    sources = [
+        'x + y - 3', 'x * y', 'x / y', '-x ^ 2', 'x ^ y', '2 ^ x', 'x ^ 3 * y',
+        'sin(x) * cos(y)', 'tan(x * y)', 'sqrt(x + y)', 'log(x, 10)', 'log(x, y)', 'pow(x, y)', 'pow(y, 2)',
+        'max(x, y) - min(x * y, 1)', 'max(x, y, 2 * x)', 'if(x - 1, y ^ 2, x)', 'clamp(x * y, 0, 2)',
+        '5 * (sqrt(9) + sin(2 * 3.14)) - x / 2',
+    ]
+
+    def finite_difference(self, expression, name, step=1e-6):
+        after = expression.evaluate({**self.runtime, name: self.runtime[name] + step})
+        before = expression.evaluate({**self.runtime, name: self.runtime[name] - step})
+        return (after - before) / (2 * step)
+
+    def testSymbolicDerivatives(self):
+        parser = Parser()
+        for source in self.sources:
+            expression = parser.compile(source)
+            for name in self.runtime:
+                derivative = differentiate(expression, name)
+                self.assertAlmostEqual(derivative.evaluate(self.runtime), self.finite_difference(expression, name),
+                                       places=5, msg=f'{source} d/d{name}: {derivative.source}')
+
+    def testGradient(self):
+        parser = Parser()
+        for source in self.sources:
+            expression = parser.compile(source)
+            value, partials = gradient(expression, self.runtime)
+            self.assertEqual(value, expression.evaluate(self.runtime))
+            for name in partials:
+                self.assertAlmostEqual(partials[name], self.finite_difference(expression, name), places=5,
+                                       msg=f'{source} d/d{name}')
+
+    def testGradientMatchesSymbolicDerivatives(self):
+        expression = Parser().compile('x ^ 2 * sin(y) + x * y')
+        _, partials = Gradient(expression).evaluate(self.runtime)
+        for name, derivative in derivatives(expression).items():
+            self.assertAlmostEqual(partials[name], derivative.evaluate(self.runtime))
+
+    def testDerivativeSource(self):
+        parser = Parser()
+        self.assertEqual(differentiate(parser.compile('x ^ 2 * sin(y)'), 'x').source, '2.0 * x * sin(y)')
+        self.assertEqual(differentiate(parser.compile('3 * x + y'), 'x').source, '3.0')
+        self.assertEqual(differentiate(parser.compile('y'), 'x').source, '0.0')
+
+        derivative = differentiate(parser.compile('x / y - -x ^ 3'), 'y')
+        self.assertEqual(parser.compile(derivative.source).tree, derivative.tree)
+
+    def testGradientOfEveryVariable(self):
+        value, partials = Gradient(Parser().compile('a * a + b * 0 + 4')).evaluate({'a': 3, 'b': 1})
+        self.assertEqual(value, 13.0)
+        self.assertEqual(partials, {'a': 6.0, 'b': 0.0})
+
+    def testReuse(self):
+        gradient = Gradient(Parser().compile('x * y'))
+        self.assertEqual(gradient.evaluate({'x': 2, 'y': 3}), (6, {'x': 3.0, 'y': 2.0}))
+        self.assertEqual(gradient.evaluate({'x': 5, 'y': 1}), (5, {'x': 1.0, 'y': 5.0}))
+
+    def testUnknownFunctions(self):
+        parser = Parser()
+        parser.register_function('hypot', math.hypot, 2, 2)
+        expression = parser.compile('hypot(x, 1)')
+        with self.assertRaises(ParserError):
+            differentiate(expression, 'x')
+        with self.assertRaises(ParserError):
+            Gradient(expression)
+
+        # constant subtrees are not differentiated
+        self.assertEqual(differentiate(parser.compile('x * hypot(3, 4)'), 'x').evaluate(), 5.0)
+
+    def testOverriddenFunctions(self):
+        parser = Parser()
+        parser.register_function('sin', math.cos, 1, 1)
+        with self.assertRaises(ParserError):
+            differentiate(parser.compile('sin(x)'), 'x')
+
+    def testBackends(self):
+        derivative = differentiate(Parser(backend=FRACTION).compile('x ^ 3 / 3 + pow(x, 2)'), 'x')
+        self.assertIs(derivative.backend, FRACTION)
+        self.assertEqual(derivative.evaluate({'x': 0.5}), Fraction(5, 4))
+
+        backend = decimal_backend(decimal.Context(prec=5))
+        derivative = differentiate(Parser(backend=backend).compile('x ^ 2 / 3 + sqrt(x)'), 'x')
+        self.assertIsInstance(derivative.evaluate({'x': 1.5}), Decimal)
+        self.assertAlmostEqual(float(derivative.evaluate({'x': 1.5})), 1 + 1 / (2 * math.sqrt(1.5)), places=3)
+
+        with self.assertRaises(ParserError):
+            Gradient(Parser(backend=backend).compile('x ^ 2'))
+
+
+class TestToSource(unittest.TestCase):
+
+    def testRoundTrip(self):
+        parser = Parser()
+        for source in ['-x ^ 2', '(-x) ^ 2', '2 ^ 3 ^ 2', '(2 ^ 3) ^ 2', 'a - (b - c)', 'a - b - c', 'a / (b * c)',
+                       '-(a + b)', '- - a', '-a * b', 'a * -b', 'max(a, -b, c)', 'sqrt(a) ^ -b', '0.00001 * x']:
+            tree = parser.compile(source).tree
+            self.assertEqual(parser.compile(to_source(tree)).tree, tree, source)
+
+    def testMinimalParentheses(self):
+        parser = Parser()
+        self.assertEqual(to_source(parser.compile('((a * b)) + (c)').tree), 'a * b + c')
+        self.assertEqual(to_source(parser.compile('(a + b) * c').tree), '(a + b) * c')
+
+    def testFractions(self):
+        tree = syntaxtree.binary(TokenType.EXPONENTIATION, syntaxtree.variable('x'), syntaxtree.number(Fraction(1, 3)))
+        self.assertEqual(to_source(tree), 'x ^ (1/3)')
+        self.assertEqual(Parser(backend=FRACTION).parse(to_source(tree), {'x': 8}), 2.0)
@@ -0,0 +1,74 @@
+import unittest
+
+from codegen import compile_function
+from prattparser import Parser, ParserError, Scope
+
+
+class Counter:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+class TestDynamicVariables(unittest.TestCase):
+
+    def testCallableVariable(self):
+        self.assertEqual(Parser({'a': lambda: 41}).parse('a + 1'), 42)
+
+    def testResolvedOncePerEvaluation(self):
+        a = Counter(2)
+        expression = Parser().compile('a * a + a ^ a')
+        self.assertEqual(expression.evaluate({'a': a}), 8)
+        self.assertEqual(a.calls, 1)
+
+        expression.evaluate({'a': a})
+        self.assertEqual(a.calls, 2)
+
+    def testOnlyReferencedVariablesAreResolved(self):
+        unused = Counter(1)
+        Parser({'a': lambda: 1, 'unused': unused}).parse('a + 1')
+        self.assertEqual(unused.calls, 0)
+
+    def testDependentVariables(self):
+        b = Counter(42)
+        runtime = {
+            'a': lambda scope: 3 + scope['b'],
+            'b': b,
+        }
+        self.assertEqual(Parser(runtime).parse('a + b + 1'), 88)
+        self.assertEqual(b.calls, 1)
+
+    def testCycle(self):
+        runtime = {
+            'a': lambda scope: 3 + scope['b'],
+            'b': lambda scope: 42 + scope['a'],
+        }
+        self.assertRaisesRegex(ParserError, r'cycle identified when resolving variable \[a\]: a -> b -> a',
+                               Parser(runtime).parse, 'a + b + 1')
+
+    def testSelfReference(self):
+        self.assertRaisesRegex(ParserError, r'a -> a', Parser({'a': lambda scope: scope['a']}).parse, 'a')
+
+    def testUnresolvedDependency(self):
+        self.assertRaisesRegex(ParserError, r'cannot resolve variable \[c\]',
+                               Parser({'a': lambda scope: scope['c']}).parse, 'a')
+
+    def testScopeKeepsValues(self):
+        scope = Scope({'a': lambda: 1, 'b': 2})
+        self.assertEqual(scope['a'] + scope['b'], 3)
+        self.assertEqual(dict(scope), {'a': 1, 'b': 2})
+
+    def testCompiledFunction(self):
+        a = Counter(3)
+        function = compile_function(Parser().compile('a * a + b'))
+        self.assertEqual(function({'a': a, 'b': lambda scope: scope['a']}), 12)
+        self.assertEqual(a.calls, 1)
+        self.assertRaises(ParserError, function, {'a': 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import math
+import unittest
+from fractions import Fraction
+
+from incremental import IncrementalEvaluator
+from numeric import FRACTION
+from prattparser import Parser, ParserError
+
+
+class TestIncrementalEvaluator(unittest.TestCase):
+
+    def evaluator(self, input_str, runtime):
+        return IncrementalEvaluator(Parser().compile(input_str), runtime)
+
+    def testInitialValue(self):
+        self.assertEqual(self.evaluator('a * 2 + sqrt(b)', {'a': 1, 'b': 9}).value, 5)
+
+    def testUpdate(self):
+        runtime = {'a': 1, 'b': 9, 'c': 2}
+        evaluator = self.evaluator('a * 2 + sqrt(b) - max(a, c) ^ 2', runtime)
+        for a, b in [(2, 9), (3, 16), (-1, 4)]:
+            runtime.update(a=a, b=b)
+            self.assertEqual(evaluator.update(a=a, b=b), Parser(runtime).parse('a * 2 + sqrt(b) - max(a, c) ^ 2'))
+            self.assertEqual(evaluator.value, evaluator.expression.evaluate(runtime))
+
+    def testUpdateWithDictionary(self):
+        evaluator = self.evaluator('a + b', {'a': 1, 'b': 2})
+        self.assertEqual(evaluator.update({'a': 10}, b=20), 30)
+
+    def testOnlyDependentPathIsRecomputed(self):
+        terms = ' + '.join(f'sin(x{i}) * {i}' for i in range(200))
+        runtime = {f'x{i}': i for i in range(200)}
+        evaluator = self.evaluator(terms, runtime)
+
+        evaluator.evaluations = 0
+        runtime['x100'] = 0.5
+        self.assertAlmostEqual(evaluator.update(x100=0.5), Parser(runtime).parse(terms))
+        # sin, multiplication and the additions of the balanced sum
+        self.assertLessEqual(evaluator.evaluations, 2 + math.ceil(math.log2(200)))
+
+    def testLongChainsAreBalanced(self):
+        terms = ' * '.join(f'x{i}' for i in range(1000))
+        runtime = {f'x{i}': 1 for i in range(1000)}
+        evaluator = self.evaluator(terms, runtime)
+
+        evaluator.evaluations = 0
+        self.assertEqual(evaluator.update(x999=2), 2)
+        self.assertEqual(evaluator.update(x0=3), 6)
+        self.assertLessEqual(evaluator.evaluations, 2 * math.ceil(math.log2(1000)))
+
+    def testShallowPathIsCheap(self):
+        evaluator = self.evaluator('(a + b) * (c + d)', {'a': 1, 'b': 2, 'c': 3, 'd': 4})
+        evaluator.evaluations = 0
+        self.assertEqual(evaluator.update(a=2), 28)
+        self.assertEqual(evaluator.evaluations, 2)
+
+    def testUnchangedSubtreeStopsPropagation(self):
+        evaluator = self.evaluator('max(a, 10) * b', {'a': 1, 'b': 2})
+        evaluator.evaluations = 0
+        self.assertEqual(evaluator.update(a=5), 20)
+        self.assertEqual(evaluator.evaluations, 1)
+
+    def testVariableUsedManyTimes(self):
+        evaluator = self.evaluator('x * x + x', {'x': 1})
+        self.assertEqual(evaluator.update(x=3), 12)
+
+    def testVariableOnly(self):
+        self.assertEqual(self.evaluator('x', {'x': 1}).update(x=math.pi), math.pi)
+
+    def testDynamicVariablesAreResolvedOnce(self):
+        evaluator = self.evaluator('a + b', {'a': lambda: 1, 'b': 2})
+        self.assertEqual(evaluator.update(b=3), 4)
+
+    def testDependentDynamicVariables(self):
+        resolutions = []
+
+        def c():
+            resolutions.append('c')
+            return 1
+
+        evaluator = self.evaluator('a + c', {'a': lambda scope: scope['m'] * 2, 'm': lambda scope: scope['b'],
+                                             'b': 1, 'c': c})
+        self.assertEqual(evaluator.value, 3)
+        self.assertEqual(evaluator.update(b=5), 11)
+        self.assertEqual(evaluator.update(m=lambda: 7), 15)
+        self.assertEqual(evaluator.update(b=0), 15)
+        self.assertEqual(resolutions, ['c'])
+
+    def testBackend(self):
+        evaluator = IncrementalEvaluator(Parser(backend=FRACTION).compile('x / 3 + y'), {'x': 0.1, 'y': 0})
+        self.assertEqual(evaluator.value, Fraction(1, 30))
+        self.assertEqual(evaluator.update(y=0.2), Fraction(7, 30))
+
+    def testFailedUpdateIsRecomputedByTheNextUpdate(self):
+        evaluator = self.evaluator('sqrt(a) + b', {'a': 4, 'b': 1})
+        self.assertRaises(ValueError, evaluator.update, a=-1)
+        self.assertRaises(ValueError, evaluator.update, b=5)
+        self.assertEqual(evaluator.update(a=9), 8)
+
+    def testFailedResolutionIsResolvedByTheNextUpdate(self):
+        evaluator = self.evaluator('a + b', {'a': 1, 'b': 1})
+        self.assertRaises(ParserError, evaluator.update, a=lambda scope: scope['c'])
+        self.assertRaises(ParserError, evaluator.update, b=2)
+        self.assertEqual(evaluator.update(c=3), 5)
+
+    def testUnresolvedVariable(self):
+        self.assertRaises(ParserError, self.evaluator, 'a + b', {'a': 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import decimal
+import threading
+import unittest
+from decimal import Decimal
+
+from cache import ExpressionCache
+from instrumentation import EVALUATE, PARSE, TOKENIZE, Instrumentation
+from numeric import decimal_backend
+from prattparser import Parser, ParserError
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def testCounters(self):
+        instrumentation = Instrumentation()
+        parser = Parser({'x': 2, 'y': lambda scope: scope['x'] + 7}, instrumentation=instrumentation)
+        self.assertEqual(parser.parse('x * sqrt(y) + max(x, 1)'), 8.0)
+
+        profile, = instrumentation.report()
+        self.assertEqual(profile.source, 'x * sqrt(y) + max(x, 1)')
+        self.assertEqual(profile.compilations, 1)
+        self.assertEqual(profile.evaluations, 1)
+        self.assertEqual(profile.tokens, 13)
+        self.assertEqual(profile.nodes, 8)
+        self.assertEqual(profile.function_calls, 2)
+        # x, y and x again, plus the read of x by y
+        self.assertEqual(profile.variable_lookups, 4)
+        self.assertEqual(profile.variable_resolutions, 2)
+        self.assertGreater(profile.tokenize_time, 0)
+        self.assertGreater(profile.parse_time, 0)
+        self.assertGreaterEqual(profile.evaluate_time, profile.function_time)
+
+    def testHooks(self):
+        events = []
+        parser = Parser({'a': 1}, instrumentation=Instrumentation(hooks=[events.append]))
+        parser.parse('a + 1')
+        self.assertEqual([event.phase for event in events], [TOKENIZE, PARSE, EVALUATE])
+        self.assertEqual(events[0].counters, {'tokens': 3})
+        self.assertEqual(events[1].counters, {'nodes': 3})
+        self.assertEqual(events[2].counters['variable_lookups'], 1)
+
+    def testCachedExpressionsAreNotParsedAgain(self):
+        instrumentation = Instrumentation()
+        parser = Parser(cache=ExpressionCache(), instrumentation=instrumentation)
+        for _ in range(3):
+            parser.parse('2 * 3')
+
+        profile, = instrumentation.report()
+        self.assertEqual(profile.compilations, 1)
+        self.assertEqual(profile.evaluations, 3)
+
+    def testFailedEvaluationsAreMeasured(self):
+        instrumentation = Instrumentation()
+        with self.assertRaises(ParserError):
+            Parser(instrumentation=instrumentation).parse('1 + z')
+        self.assertEqual(instrumentation.report()[0].evaluations, 1)
+
+    def testBackend(self):
+        parser = Parser(backend=decimal_backend(decimal.Context(prec=5)), instrumentation=Instrumentation())
+        self.assertEqual(parser.parse('1 / 3'), Decimal('0.33333'))
+        self.assertEqual(parser.parse('x + 0.1', {'x': 0.2}), Decimal('0.3'))
+
+    def testLazy(self):
+        instrumentation = Instrumentation()
+        parser = Parser({'a': 1, 'b': 2, 'c': lambda: self.fail('c is resolved')}, lazy=True,
+                        instrumentation=instrumentation)
+        self.assertEqual(parser.parse('if(a, b, c) + sqrt(4)'), 4.0)
+
+        profile, = instrumentation.report()
+        self.assertEqual(profile.function_calls, 2)
+        self.assertEqual(profile.variable_resolutions, 2)
+
+    def testReportRanksSlowestFirst(self):
+        instrumentation = Instrumentation()
+        parser = Parser({'slow': lambda: sum(range(200000))}, instrumentation=instrumentation)
+        parser.parse('1 + 1')
+        parser.parse('slow * 2')
+        parser.parse('2 + 2')
+
+        report = instrumentation.report(limit=2)
+        self.assertEqual(len(report), 2)
+        self.assertEqual(report[0].source, 'slow * 2')
+        self.assertIn('slow * 2', instrumentation.format_report())
+
+    def testProfilesAreBounded(self):
+        instrumentation = Instrumentation(max_profiles=10)
+        parser = Parser({'slow': lambda: sum(range(200000))}, instrumentation=instrumentation)
+        parser.parse('slow * 2')
+        for index in range(100):
+            parser.parse(f'{index} + 1')
+
+        self.assertLessEqual(len(instrumentation.profiles), 10)
+        self.assertEqual(instrumentation.dropped + len(instrumentation.profiles), 101)
+        self.assertEqual(instrumentation.report(limit=1)[0].source, 'slow * 2')
+
+    def testSharedBetweenThreads(self):
+        instrumentation = Instrumentation()
+
+        def work():
+            parser = Parser({'a': 3}, instrumentation=instrumentation)
+            for _ in range(200):
+                parser.parse('a * 2')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(instrumentation.report()[0].evaluations, 800)
+
+    def testUninstrumentedCompile(self):
+        instrumentation = Instrumentation()
+        expression = Parser(instrumentation=instrumentation).compile('1 + 2')
+        self.assertEqual(instrumentation.evaluate(expression), 3.0)
+        self.assertEqual(Parser().compile('1 + 2').evaluate(), 3.0)
@@ -0,0 +1,62 @@
+import sys
+import unittest
+
+from prattparser import Parser, ParserError
+
+
+class TestIterativeParser(unittest.TestCase):
+    runtime = {'a': 1, 'b': 2, 'x': 0.5}
+
+    def assertSameTree(self, input_str):
+        expected = Parser().compile(input_str)
+        actual = Parser(iterative=True).compile(input_str)
+        self.assertEqual(actual.tree, expected.tree)
+        self.assertEqual(actual.evaluate(self.runtime), expected.evaluate(self.runtime))
+
+    def testPrecedence(self):
+        self.assertSameTree('1 + 2 * 3.0 - 4 / 2')
+        self.assertSameTree('5 - 2 - 1')
+        self.assertSameTree('12 / 2 / 3')
+
+    def testExponentiationIsRightAssociative(self):
+        self.assertSameTree('2 ^ 2 ^ 3')
+        self.assertSameTree('(2 ^ 2) ^ 3')
+
+    def testUnaryMinus(self):
+        self.assertSameTree('-2 ^ 2 + 1')
+        self.assertSameTree('2 ^ -3 * - - a')
+        self.assertSameTree('-(2 * 2)')
+
+    def testFunctions(self):
+        self.assertSameTree('max(min(a, 5), pow(3, sqrt(4)), b) - log(100, 10) * sin(x)')
+
+    def testErrors(self):
+        parser = Parser(iterative=True)
+        for input_str in ['(1 + 2', '1 + 3) * 3', '5 - * 2', '^ 2', 'log(100)', 'max()', '2 +', '']:
+            self.assertRaises(ParserError, parser.compile, input_str)
+
+    def testDeepParentheses(self):
+        depth = sys.getrecursionlimit() * 5
+        expression = Parser(iterative=True).compile('(' * depth + 'a' + ')' * depth)
+        self.assertEqual(expression.evaluate(self.runtime), 1)
+
+    def testDeepRightNesting(self):
+        depth = sys.getrecursionlimit() * 5
+        expression = Parser(iterative=True).compile('1 + (' * depth + 'b' + ')' * depth)
+        self.assertEqual(expression.evaluate(self.runtime), depth + 2)
+
+    def testLongUnaryChain(self):
+        depth = sys.getrecursionlimit() * 5
+        self.assertEqual(Parser(iterative=True).parse('- ' * depth + '3'), 3)
+
+    def testLongExponentiationChain(self):
+        depth = sys.getrecursionlimit() * 5
+        self.assertEqual(Parser(iterative=True).parse('1' + ' ^ 1' * depth), 1)
+
+    def testDeepFunctionNesting(self):
+        depth = sys.getrecursionlimit() * 5
+        self.assertEqual(Parser(iterative=True).parse('max(1, ' * depth + '2' + ')' * depth), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import math
+import sys
+import unittest
+
+from codegen import compile_function
+from prattparser import LazyStats, Parser, ParserError
+from program import Program
+
+
+class TestLazyEvaluation(unittest.TestCase):
+
+    def expensive(self, value=1.0):
+        def resolve():
+            self.resolved.append(value)
+            return value
+        return resolve
+
+    def setUp(self):
+        self.resolved = []
+
+    def testConditionals(self):
+        parser = Parser({'a': 5})
+        self.assertEqual(parser.parse('if(a - 5, 1, 2)'), 2.0)
+        self.assertEqual(parser.parse('if(a, 1, 2)'), 1.0)
+        self.assertEqual(parser.parse('clamp(a, 0, 3)'), 3.0)
+        self.assertEqual(parser.parse('clamp(-a, 0, 3)'), 0.0)
+        self.assertEqual(parser.parse('clamp(a / 2, 0, 3)'), 2.5)
+
+    def testSameResultsAsEagerEvaluation(self):
+        runtime = {'a': 2, 'b': -3, 'c': 0}
+        for source in ['if(c, a, b)', 'if(a, b, c) * 2', 'clamp(a * b, b, a)', 'max(a, b, c) - min(a, b, c)',
+                       'max(1 / c, 2)', 'min(-(1 / c), a)', 'max(if(a, 1, 2), clamp(b, c, a))']:
+            try:
+                expected = Parser(runtime).parse(source)
+            except ZeroDivisionError:
+                continue
+            self.assertEqual(Parser(runtime, lazy=True).parse(source), expected, source)
+
+    def testSkipsUnusedBranches(self):
+        stats = LazyStats()
+        runtime = {'a': 1, 'b': self.expensive(2), 'c': self.expensive(3)}
+        self.assertEqual(Parser().compile('if(a, b, c)').evaluate_lazy(runtime, stats), 2)
+        self.assertEqual(self.resolved, [2])
+        self.assertEqual((stats.thunks, stats.forced, stats.skipped, stats.skipped_resolutions), (3, 2, 1, 1))
+
+    def testEagerEvaluationResolvesEverything(self):
+        runtime = {'a': 1, 'b': self.expensive(2), 'c': self.expensive(3)}
+        Parser(runtime).parse('if(a, b, c)')
+        self.assertEqual(self.resolved, [2, 3])
+
+    def testClampSkipsTheUpperBound(self):
+        stats = LazyStats()
+        runtime = {'x': -1, 'high': self.expensive(10)}
+        self.assertEqual(Parser().compile('clamp(x, 0, high)').evaluate_lazy(runtime, stats), 0.0)
+        self.assertEqual(self.resolved, [])
+        self.assertEqual(stats.skipped_resolutions, 1)
+
+    def testMaxAndMinStopAtInfinity(self):
+        stats = LazyStats()
+        runtime = {'inf': math.inf, 'slow': self.expensive()}
+        parser = Parser()
+        self.assertEqual(parser.compile('max(inf, slow, slow * 2)').evaluate_lazy(runtime, stats), math.inf)
+        self.assertEqual(parser.compile('min(-inf, slow)').evaluate_lazy(runtime, stats), -math.inf)
+        self.assertEqual(self.resolved, [])
+        self.assertEqual(stats.skipped, 3)
+
+        self.assertEqual(parser.compile('max(1, slow, 0)').evaluate_lazy(runtime), 1)
+        self.assertEqual(self.resolved, [1.0])
+
+    def testArgumentsAreForcedOnce(self):
+        runtime = {'x': self.expensive(4)}
+        parser = Parser(runtime, lazy=True)
+        parser.register_function('twice', lambda x: x + x, 1, 1, lazy=lambda x: x() + x())
+        self.assertEqual(parser.parse('twice(x * 1)'), 8.0)
+        self.assertEqual(self.resolved, [4])
+
+    def testErrorsInSkippedBranchesAreNotRaised(self):
+        parser = Parser({'a': 0}, lazy=True)
+        self.assertEqual(parser.parse('if(a, 1 / a, 2)'), 2.0)
+        with self.assertRaises(ZeroDivisionError):
+            Parser({'a': 0}).parse('if(a, 1 / a, 2)')
+        with self.assertRaises(ParserError):
+            parser.parse('if(1, missing, 2)')
+
+    def testDeepExpressionsStayLazy(self):
+        depth = sys.getrecursionlimit() * 2
+        expression = Parser(iterative=True).compile('if(a, 1 / a + missing, 2)' + ' + 1' * depth)
+        stats = LazyStats()
+        self.assertEqual(expression.evaluate_lazy({'a': 0}, stats), 2 + depth)
+        self.assertEqual((stats.thunks, stats.forced), (3, 2))
+
+        nested = Parser(iterative=True).compile('if(a, ' * 10 + '(1' + ' + 1' * depth + ')' + ', 1 / a)' * 10)
+        self.assertEqual(nested.evaluate_lazy({'a': 1}), 1 + depth)
+
+    def testConditionalsInCompiledForms(self):
+        runtime = {'a': 0, 'b': 4}
+        for source in ['if(a, b, -b)', 'clamp(b, a, 3)']:
+            expression = Parser().compile(source)
+            expected = expression.evaluate(runtime)
+            self.assertEqual(compile_function(expression)(runtime), expected)
+            self.assertEqual(Program.from_expression(expression).evaluate(runtime), expected)
+
+    def testIfIsAFunctionName(self):
+        self.assertEqual(Parser({'iffy': 3}).parse('iffy + if(1, 2, 3)'), 5.0)
+        with self.assertRaises(ParserError):
+            Parser().parse('if(1, 2)')
@@ -0,0 +1,80 @@
+import decimal
+import unittest
+from decimal import Decimal
+from fractions import Fraction
+
+from codegen import compile_function
+from numeric import DECIMAL, FLOAT, FRACTION, INTEGER, decimal_backend
+from prattparser import LazyStats, Parser, ParserError
+from program import Program
+
+
+class TestNumericBackends(unittest.TestCase):
+
+    def testFloatIsTheDefault(self):
+        self.assertEqual(Parser().parse('0.1 + 0.2'), 0.1 + 0.2)
+        self.assertEqual(Parser(backend=FLOAT).parse('0.1 + 0.2'), 0.1 + 0.2)
+
+    def testDecimal(self):
+        parser = Parser(backend=DECIMAL)
+        self.assertEqual(parser.parse('0.1 + 0.2'), Decimal('0.3'))
+        self.assertEqual(parser.parse('x * 3', {'x': 0.1}), Decimal('0.3'))
+        self.assertEqual(parser.parse('x / 4', {'x': '1.10'}), Decimal('0.275'))
+        self.assertEqual(parser.parse('sqrt(16) + log(1000, 10) + pow(2, 3) + max(1, 2.5)'), Decimal('17.5'))
+        self.assertIsInstance(parser.parse('sin(1)'), Decimal)
+
+    def testDecimalContext(self):
+        parser = Parser(backend=decimal_backend(decimal.Context(prec=5, rounding=decimal.ROUND_DOWN)))
+        self.assertEqual(parser.parse('2 / 3'), Decimal('0.66666'))
+        self.assertEqual(parser.parse('sqrt(2)'), Decimal('1.4142'))
+        # the context of the thread is not changed
+        self.assertEqual(decimal.getcontext().prec, 28)
+
+    def testFraction(self):
+        parser = Parser(backend=FRACTION)
+        self.assertEqual(parser.parse('1 / 3 + 1 / 6'), Fraction(1, 2))
+        self.assertEqual(parser.parse('x * 3', {'x': 0.1}), Fraction(3, 10))
+        self.assertEqual(parser.parse('sqrt(9 / 4) + 2 ^ -2'), Fraction(7, 4))
+        self.assertIsInstance(parser.parse('sqrt(2)'), float)
+
+    def testIntegerLiterals(self):
+        parser = Parser(backend=INTEGER)
+        self.assertEqual(parser.parse('2 ^ 100'), 2 ** 100)
+        self.assertIsInstance(parser.parse('3 * 4'), int)
+        self.assertIsInstance(parser.parse('3.0 * 4'), float)
+        self.assertEqual(parser.parse('7 / 2'), 3.5)
+
+    def testLiteralsAreConvertedOnce(self):
+        expression = Parser(backend=DECIMAL).compile('1.10 * x')
+        self.assertEqual(expression.tree.children[0].value, Decimal('1.10'))
+        self.assertEqual(expression.evaluate({'x': 2}), Decimal('2.20'))
+
+    def testInvalidLiterals(self):
+        for backend in (FLOAT, INTEGER, DECIMAL, FRACTION):
+            with self.assertRaises(ParserError):
+                Parser(backend=backend).parse('3. 14')
+
+    def testApplyBackend(self):
+        expression = Parser().compile('0.1 * 3 + x')
+        self.assertEqual(DECIMAL.apply(expression).evaluate({'x': 1}), Decimal('1.3'))
+        self.assertEqual(FRACTION.apply(expression).evaluate({'x': Fraction(1, 3)}), Fraction(19, 30))
+        self.assertEqual(DECIMAL.apply(FRACTION.apply(expression)).evaluate({'x': 0}), Decimal('0.3'))
+        self.assertEqual(expression.evaluate({'x': 1}), 0.1 * 3 + 1)
+
+    def testRegisteredFunctionsAreKept(self):
+        parser = Parser(backend=DECIMAL)
+        parser.register_function('double', lambda x: x * 2, 1)
+        self.assertEqual(parser.parse('double(1.1)'), Decimal('2.2'))
+        self.assertNotIn('double', Parser(backend=DECIMAL).functions)
+
+    def testLazyAndDynamicVariables(self):
+        parser = Parser({'a': lambda: 0.1, 'b': 1}, backend=FRACTION)
+        self.assertEqual(parser.compile('if(b, a * 10, 2)').evaluate_lazy(parser.runtime, LazyStats()), 1)
+        self.assertIsInstance(parser.parse('a'), Fraction)
+
+    def testCompiledFunction(self):
+        expression = Parser(backend=DECIMAL).compile('x * 0.1 + 1')
+        self.assertEqual(compile_function(expression)({'x': 2}), Decimal('1.2'))
+
+        with self.assertRaises(ParserError):
+            Program.from_expression(expression)
@@ -0,0 +1,82 @@
+import decimal
+import math
+import unittest
+from decimal import Decimal
+from fractions import Fraction
+
+import syntaxtree
+from numeric import FRACTION, decimal_backend
+from optimizer import optimize
+from prattparser import Parser
+from tokenizer import TokenType
+
+
+class TestOptimizer(unittest.TestCase):
+
+    def optimize(self, input_str):
+        return optimize(Parser().compile(input_str))
+
+    def assertOptimized(self, input_str, expected_str):
+        optimized, _ = self.optimize(input_str)
+        self.assertEqual(optimized.tree, Parser().compile(expected_str).tree)
+
+    def testFoldConstantExpression(self):
+        optimized, folds = self.optimize('pow(3,2) * sqrt(9)')
+        self.assertEqual(optimized.tree, syntaxtree.number(27.0))
+        self.assertEqual([fold.rule for fold in folds], ['constant', 'constant', 'constant'])
+
+    def testFoldConstantSubtree(self):
+        optimized, _ = self.optimize('x + sin(2 * 3.14)')
+        self.assertEqual(optimized.tree.type, TokenType.ADDITION)
+        self.assertEqual(optimized.tree.children[1], syntaxtree.number(math.sin(2 * 3.14)))
+
+    def testIdentities(self):
+        self.assertOptimized('x * 1', 'x')
+        self.assertOptimized('1 * x', 'x')
+        self.assertOptimized('x + 0', 'x')
+        self.assertOptimized('0 + x', 'x')
+        self.assertOptimized('x - 0', 'x')
+        self.assertOptimized('x / 1', 'x')
+        self.assertOptimized('x ^ 1', 'x')
+        self.assertOptimized('- - x', 'x')
+        self.assertOptimized('- - - x', '-x')
+
+    def testIdentityAfterFolding(self):
+        optimized, folds = self.optimize('(x + y) * (3 - 2) ^ 2')
+        self.assertEqual(optimized.tree, Parser().compile('x + y').tree)
+        self.assertEqual(folds[-1].rule, 'x * 1')
+        self.assertEqual(folds[-1].original.type, TokenType.MULTIPLICATION)
+
+    def testNoIdentityForOtherOperands(self):
+        self.assertOptimized('0 - x', '0 - x')
+        self.assertOptimized('1 / x', '1 / x')
+        self.assertOptimized('1 ^ x', '1 ^ x')
+
+    def testSameResult(self):
+        runtime = {'x': 2.5, 'y': -3}
+        expression = Parser().compile('5 * (sqrt(9) + sin(2 * 3.14)) - x / 2 * 1 + - - y ^ 1')
+        optimized, folds = optimize(expression)
+        self.assertTrue(folds)
+        self.assertAlmostEqual(optimized.evaluate(runtime), expression.evaluate(runtime))
+
+    def testErrorsAreKept(self):
+        optimized, folds = self.optimize('x + sqrt(0 - 1) + 1 / 0')
+        self.assertEqual([fold.original.type for fold in folds], [TokenType.SUBTRACTION])
+        self.assertRaises(ValueError, optimized.evaluate, {'x': 1})
+
+    def testSourceIsKept(self):
+        optimized, _ = self.optimize('1 + 1')
+        self.assertEqual(optimized.source, '1 + 1')
+
+    def testBackendIsKept(self):
+        optimized, _ = optimize(Parser(backend=FRACTION).compile('x / 3 * (1 + 1)'))
+        self.assertIs(optimized.backend, FRACTION)
+        self.assertEqual(optimized.evaluate({'x': 0.1}), Fraction(1, 15))
+
+        backend = decimal_backend(decimal.Context(prec=5))
+        optimized, _ = optimize(Parser(backend=backend).compile('x + 1 / 3'))
+        self.assertEqual(optimized.evaluate({'x': 1.5}), Decimal('1.8333'))
+
+
+if __name__ == "__main__":
+    unittest.main()
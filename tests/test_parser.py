@@ -59,7 +59,8 @@ class TestStatementParser(unittest.TestCase):
         self.assertParser('-(2 * 2)', -4)
 
     def testExample13(self):
-        self.assertParser('- - 2)', 2)
+        self.assertRaises(ParserError, self.assertParser, '- - 2)', None)
+        self.assertRaises(ParserError, self.assertParser, '1 2', None)
 
     def testExample14(self):
         self.assertParser('- - - 2', -2)
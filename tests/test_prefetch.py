@@ -0,0 +1,70 @@
+import unittest
+
+from prattparser import Parser, ParserError
+from prefetch import PrefetchPlan, plan_prefetch
+
+
+class Loader:
+
+    def __init__(self, values: dict):
+        self.values = values
+        self.calls = []
+
+    def __call__(self, names: list[str]) -> dict:
+        self.calls.append(names)
+        return {name: self.values[name] for name in names if name in self.values}
+
+
+class TestReferences(unittest.TestCase):
+
+    def testVariablesAndFunctions(self):
+        references = Parser().compile('max(x, y) * sqrt(x) - -z + 1').references()
+        self.assertEqual(references.variables, ('x', 'y', 'z'))
+        self.assertEqual(references.functions, ('max', 'sqrt'))
+
+    def testConstantExpression(self):
+        references = Parser().compile('2 * 3').references()
+        self.assertEqual(references, ((), ()))
+
+    def testDeepExpression(self):
+        references = Parser(iterative=True).compile('-' * 5000 + 'x').references()
+        self.assertEqual(references.variables, ('x',))
+
+
+class TestPrefetchPlan(unittest.TestCase):
+
+    def testMergesVariables(self):
+        plan = plan_prefetch(['price * amount', 'max(price, floor) - discount', 'sqrt(amount)'])
+        self.assertEqual(len(plan), 3)
+        self.assertEqual(plan.variables, ('price', 'amount', 'floor', 'discount'))
+        self.assertEqual(plan.functions, ('max', 'sqrt'))
+        self.assertEqual(plan.missing({'amount': 3}), ['price', 'floor', 'discount'])
+
+    def testLoaderIsCalledOnce(self):
+        plan = plan_prefetch(['price * amount', 'max(price, floor) - discount'])
+        loader = Loader({'price': 2.0, 'floor': 1.0, 'discount': 0.5, 'amount': 100.0})
+        self.assertEqual(plan.evaluate(loader, {'amount': 3}), [6.0, 1.5])
+        self.assertEqual(loader.calls, [['price', 'floor', 'discount']])
+
+    def testNothingToLoad(self):
+        plan = plan_prefetch(['x + 1', '2'])
+        loader = Loader({})
+        self.assertEqual(plan.evaluate(loader, {'x': 1}), [2.0, 2.0])
+        self.assertEqual(loader.calls, [])
+
+    def testMissingValueFailsOnlyItsExpressions(self):
+        plan = PrefetchPlan(Parser().compile(source) for source in ['a + 1', 'b + 1'])
+        results = plan.evaluate_results(Loader({'a': 1.0}))
+        self.assertEqual(results[0].value, 2.0)
+        self.assertIsInstance(results[1].error, ParserError)
+        with self.assertRaises(ParserError):
+            plan.evaluate(Loader({'a': 1.0}))
+
+    def testRuntimeIsNotModified(self):
+        runtime = {'amount': 3}
+        plan_prefetch(['price * amount']).evaluate(Loader({'price': 2.0}), runtime)
+        self.assertEqual(runtime, {'amount': 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
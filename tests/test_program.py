@@ -0,0 +1,102 @@
+import random
+import unittest
+
+from numeric import INTEGER
+from prattparser import Parser, ParserError
+from program import CALL, CONST, LOAD, MUL, SUB, Program
+from registry import DEFAULT_FUNCTIONS
+
+
+class TestProgram(unittest.TestCase):
+    runtime = {'a': 1, 'b': 2, 'c': 3, 'x': 0.5}
+
+    def compile(self, input_str, parser=None):
+        return Program.from_expression((parser or Parser()).compile(input_str))
+
+    def assertSameResult(self, input_str):
+        expression = Parser().compile(input_str)
+        self.assertEqual(Program.from_expression(expression).evaluate(self.runtime), expression.evaluate(self.runtime))
+
+    def testInstructions(self):
+        program = self.compile('5 * x - sqrt(x)')
+        self.assertEqual(list(program.opcodes), [CONST, LOAD, MUL, LOAD, CALL, SUB])
+        self.assertEqual(list(program.constants), [5.0])
+        self.assertEqual(program.names, ('x',))
+        self.assertEqual(program.function_names, ('sqrt',))
+
+    def testConstantPoolAndNamesAreShared(self):
+        program = self.compile('2 * x + 2 * x')
+        self.assertEqual(list(program.constants), [2.0])
+        self.assertEqual(program.names, ('x',))
+
+    def testSameResult(self):
+        self.assertSameResult('1 + 2 * 3.0 - 4 / 2')
+        self.assertSameResult('2 ^ 2 ^ 3')
+        self.assertSameResult('-2 ^ 2 + - - - x')
+        self.assertSameResult('max(min(a, 5), pow(3, sqrt(4)), b, c) - log(100, 10) * sin(x)')
+
+    def testRandomExpressions(self):
+        random.seed(7)
+
+        def generate(depth):
+            if depth == 0 or random.random() < 0.2:
+                return random.choice(['1', '2.5', 'a', 'b', 'x'])
+            choice = random.random()
+            if choice < 0.6:
+                return f'{generate(depth - 1)} {random.choice("+-*/")} {generate(depth - 1)}'
+            if choice < 0.7:
+                return f'-{generate(depth - 1)}'
+            if choice < 0.8:
+                return f'({generate(depth - 1)})'
+            return f'max({generate(depth - 1)}, {generate(depth - 1)}, {generate(depth - 1)})'
+
+        for _ in range(200):
+            self.assertSameResult(generate(5))
+
+    def testRoundTrip(self):
+        program = self.compile('max(a, b, c) * 2.5 - sin(x) / -a')
+        loaded = Program.from_bytes(program.to_bytes())
+        self.assertEqual(loaded.source, program.source)
+        self.assertEqual(loaded.opcodes, program.opcodes)
+        self.assertEqual(loaded.operands, program.operands)
+        self.assertEqual(loaded.constants, program.constants)
+        self.assertEqual(loaded.names, program.names)
+        self.assertEqual(loaded.evaluate(self.runtime), program.evaluate(self.runtime))
+
+    def testRoundTripConstant(self):
+        self.assertEqual(Program.from_bytes(self.compile('42').to_bytes()).evaluate(), 42)
+
+    def testRegisteredFunction(self):
+        parser = Parser()
+        parser.register_function('double', lambda value: 2 * value)
+        program = self.compile('double(a) + 1', parser)
+        self.assertEqual(program.evaluate(self.runtime), 3)
+        self.assertRaises(ParserError, Program.from_bytes, program.to_bytes(), DEFAULT_FUNCTIONS)
+        self.assertEqual(Program.from_bytes(program.to_bytes(), parser.functions).evaluate(self.runtime), 3)
+
+    def testInvalidBytes(self):
+        self.assertRaises(ParserError, Program.from_bytes, b'PP')
+        self.assertRaises(ParserError, Program.from_bytes, b'XXXX' + bytes(32))
+        self.assertRaises(ParserError, Program.from_bytes, self.compile('1 + a').to_bytes()[:-3])
+
+    def testDynamicAndMissingVariables(self):
+        program = self.compile('a * a')
+        self.assertEqual(program.evaluate({'a': lambda: 3}), 9)
+        self.assertRaises(ParserError, program.evaluate, {})
+
+    def testArgumentCountIsBounded(self):
+        arguments = ', '.join(['1'] * 0xFFFF)
+        self.assertEqual(Program.from_expression(Parser().compile(f'max({arguments})')).evaluate(), 1)
+        with self.assertRaises(ParserError):
+            Program.from_expression(Parser().compile(f'max({arguments}, 2)'))
+
+    def testBackendsAreRejected(self):
+        parser = Parser(backend=INTEGER)
+        with self.assertRaises(ParserError):
+            Program.from_expression(parser.compile('3 ^ 35 + 1 - 3 ^ 35'))
+        with self.assertRaises(ParserError):
+            Program.from_expression(parser.compile('7 * x'))
+
+
+if __name__ == "__main__":
+    unittest.main()
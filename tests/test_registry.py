@@ -0,0 +1,80 @@
+import math
+import unittest
+
+from prattparser import Parser, ParserError
+from registry import DEFAULT_FUNCTIONS, OPERATORS, FunctionRegistry
+from tokenizer import Tokenizer, TokenType
+
+
+class TestFunctionRegistry(unittest.TestCase):
+
+    def testDefaultFunctions(self):
+        self.assertEqual([function.name for function in DEFAULT_FUNCTIONS],
+                         ['sin', 'cos', 'tan', 'pow', 'sqrt', 'log', 'max', 'min', 'if', 'clamp'])
+        self.assertIs(DEFAULT_FUNCTIONS['sqrt'].callable, math.sqrt)
+
+    def testOperators(self):
+        self.assertTrue(OPERATORS[TokenType.EXPONENTIATION].right_associative)
+        self.assertEqual(OPERATORS[TokenType.MULTIPLICATION].precedence, 3)
+
+    def testRegisterRebuildsTokenPattern(self):
+        functions = FunctionRegistry()
+        pattern = functions.token_pattern
+        functions.register('double', lambda value: 2 * value)
+        self.assertIsNot(functions.token_pattern, pattern)
+
+        tokens = list(Tokenizer('double(x)', functions.token_pattern))
+        self.assertEqual(tokens[0], (TokenType.FUNCTION, 'double'))
+
+    def testEmptyRegistry(self):
+        tokens = list(Tokenizer('sin(x)', FunctionRegistry().token_pattern))
+        self.assertEqual(tokens[0], (TokenType.IDENTIFIER, 'sin'))
+
+    def testCopyIsIndependent(self):
+        functions = DEFAULT_FUNCTIONS.copy()
+        functions.register('hypot', math.hypot, 2)
+        self.assertIn('hypot', functions)
+        self.assertNotIn('hypot', DEFAULT_FUNCTIONS)
+
+    def testInvalidName(self):
+        self.assertRaises(ValueError, FunctionRegistry().register, 'not a name', abs)
+
+
+class TestParserFunctions(unittest.TestCase):
+
+    def testRegisterFunction(self):
+        parser = Parser({'x': 3})
+        parser.register_function('hypot', math.hypot, 2)
+        self.assertEqual(parser.parse('hypot(x, 4) + 1'), 6)
+
+    def testRegistrationIsPerParser(self):
+        parser = Parser()
+        parser.register_function('hypot', math.hypot, 2)
+        self.assertNotIn('hypot', DEFAULT_FUNCTIONS)
+        self.assertRaises(ParserError, Parser().parse, 'hypot(3, 4)')
+
+    def testFunctionNamePrefix(self):
+        parser = Parser()
+        parser.register_function('log10', math.log10)
+        self.assertEqual(parser.parse('log10(100) + log(8, 2)'), 5)
+
+    def testIdentifierStartingWithFunctionName(self):
+        self.assertEqual(Parser({'single': 2, 'e': 3}).parse('single * e'), 6)
+
+    def testVariadicFunctions(self):
+        self.assertEqual(Parser().parse('max(1, 5, 3, 2)'), 5)
+        self.assertEqual(Parser().parse('min(4, 5, 3, 7)'), 3)
+
+    def testArityIsCheckedOnCompile(self):
+        self.assertRaises(ParserError, Parser().compile, 'sin(1, 2)')
+        self.assertRaises(ParserError, Parser().compile, 'max(1)')
+        self.assertRaises(ParserError, Parser().compile, 'pow(1, 2, 3)')
+
+    def testVariadicRegistration(self):
+        parser = Parser()
+        parser.register_function('sum', lambda *values: sum(values), 1, None)
+        self.assertEqual(parser.parse('sum(1) + sum(1, 2, 3)'), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
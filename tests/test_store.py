@@ -0,0 +1,100 @@
+import math
+import os
+import tempfile
+import unittest
+
+from prattparser import Parser, ParserError
+from program import Program
+from registry import DEFAULT_FUNCTIONS
+from store import ExpressionStore
+
+
+class TestExpressionStore(unittest.TestCase):
+    sources = [
+        '5 * x - sqrt(y)',
+        'max(x, y, 3) ^ 2',
+        'log(x + 10, 2) * pow(y, 2)',
+        '42',
+    ]
+    runtime = {'x': 2, 'y': 9}
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'catalog.bin')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testLookup(self):
+        self.assertEqual(ExpressionStore.write(self.path, self.sources), [])
+        with ExpressionStore(self.path) as store:
+            self.assertEqual(len(store), len(self.sources))
+            for source in self.sources:
+                program = store.get(source)
+                self.assertIsInstance(program, Program)
+                self.assertEqual(program.evaluate(self.runtime), Parser(self.runtime).parse(source))
+
+    def testMiss(self):
+        ExpressionStore.write(self.path, self.sources)
+        with ExpressionStore(self.path) as store:
+            self.assertIsNone(store.get('x + 1'))
+            self.assertNotIn('x + 1', store)
+            self.assertIn('42', store)
+
+    def testManyEntries(self):
+        sources = [f'x * {i} + y' for i in range(2000)]
+        ExpressionStore.write(self.path, sources)
+        with ExpressionStore(self.path) as store:
+            for i in range(0, 2000, 97):
+                self.assertEqual(store.get(sources[i]).evaluate(self.runtime), 2 * i + 9)
+
+    def testReplacedStoreKeepsItsMode(self):
+        ExpressionStore.write(self.path, self.sources)
+        os.chmod(self.path, 0o644)
+        ExpressionStore.write(self.path, ['1'])
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o644)
+
+    def testTemporaryFileIsRemovedOnError(self):
+        os.mkdir(self.path)
+        with self.assertRaises(OSError):
+            ExpressionStore.write(self.path, self.sources)
+        self.assertEqual(os.listdir(self.directory.name), ['catalog.bin'])
+
+    def testCompileErrors(self):
+        errors = ExpressionStore.write(self.path, ['1 +', 'x + 1'])
+        self.assertEqual([source for source, _ in errors], ['1 +'])
+        with ExpressionStore(self.path) as store:
+            self.assertEqual(len(store), 1)
+
+    def testInvalidatedWhenFunctionsChange(self):
+        ExpressionStore.write(self.path, self.sources)
+        functions = DEFAULT_FUNCTIONS.copy()
+        functions.register('hypot', math.hypot, 2)
+        with ExpressionStore(self.path, functions) as store:
+            self.assertTrue(store.stale)
+            self.assertEqual(len(store), 0)
+            self.assertIsNone(store.get(self.sources[0]))
+
+    def testCustomFunctions(self):
+        functions = DEFAULT_FUNCTIONS.copy()
+        functions.register('hypot', math.hypot, 2)
+        ExpressionStore.write(self.path, ['hypot(x, 4)'], functions)
+        with ExpressionStore(self.path, functions) as store:
+            self.assertEqual(store.get('hypot(x, 4)').evaluate({'x': 3}), 5)
+
+    def testEmptyStore(self):
+        ExpressionStore.write(self.path, [])
+        with ExpressionStore(self.path) as store:
+            self.assertIsNone(store.get('1'))
+
+    def testInvalidFile(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'not a store')
+        self.assertRaises(ParserError, ExpressionStore, self.path)
+
+        open(self.path, 'wb').close()
+        self.assertRaises(ParserError, ExpressionStore, self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import random
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import ExpressionCache
+from prattparser import Parser, ParserError
+
+
+def workload(seed, count=300):
+    rng = random.Random(seed)
+    items = []
+    for _ in range(count):
+        a, b, c = rng.randint(1, 9), rng.randint(1, 9), rng.randint(1, 9)
+        source = rng.choice(['x * {} + max({}, y) - {}', '({} - x) ^ 2 / ({} + y) * {}',
+                             'sqrt(x * x) + -{} * (y - {}) + {}']).format(a, b, c)
+        items.append((source, {'x': rng.uniform(-5, 5), 'y': rng.uniform(-5, 5)}))
+    return items
+
+
+class TestSharedParser(unittest.TestCase):
+
+    def stress(self, parser, threads=8):
+        items = [item for seed in range(threads) for item in workload(seed)]
+        expected = [Parser(runtime).parse(source) for source, runtime in items]
+
+        # all threads start parsing at the same time
+        barrier = threading.Barrier(threads)
+
+        def work(chunk):
+            barrier.wait()
+            return [parser.parse(source, runtime) for source, runtime in chunk]
+
+        chunks = [items[start::threads] for start in range(threads)]
+        with ThreadPoolExecutor(threads) as executor:
+            results = list(executor.map(work, chunks))
+
+        for start, chunk_results in enumerate(results):
+            self.assertEqual(chunk_results, expected[start::threads])
+
+    def testSharedParser(self):
+        self.stress(Parser())
+
+    def testSharedParserAndCache(self):
+        self.stress(Parser(cache=ExpressionCache(16)))
+
+    def testSharedIterativeParser(self):
+        self.stress(Parser(iterative=True))
+
+    def testErrorsDoNotLeakBetweenCalls(self):
+        parser = Parser()
+
+        def work(index):
+            if index % 2:
+                with self.assertRaises(ParserError):
+                    parser.parse('1 + (2 *')
+                return None
+            return parser.parse(f'{index} + (2 * 3)')
+
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(work, range(400)))
+        self.assertEqual(results[::2], [index + 6.0 for index in range(0, 400, 2)])
+
+    def testRuntimeIsNotShared(self):
+        first, second = Parser(), Parser()
+        first.runtime['a'] = 1
+        self.assertEqual(second.runtime, {})
+
+    def testRuntimePerCall(self):
+        parser = Parser({'a': 1})
+        self.assertEqual(parser.parse('a + 1', {'a': 10}), 11.0)
+        self.assertEqual(parser.parse('a + 1'), 2.0)
@@ -1,5 +1,5 @@
 import unittest
-from tokenizer import Tokenizer, TokenizerError
+from tokenizer import Tokenizer, TokenizerError, TokenType
 
 class TestStatementTokenization(unittest.TestCase):
 
@@ -39,6 +39,19 @@ class TestStatementTokenization(unittest.TestCase):
 
         # self.assertEqual(len(input_str), tokenizer.cursor, f'cannot tokenize whole input, leftover: {tokenizer.input_left_over()}')
 
+    def testTokenStream(self):
+        tokens = [(token.type, token.value) for token in Tokenizer(' sin(2.5) *x_1 ')]
+        self.assertEqual(tokens, [(TokenType.FUNCTION, 'sin'), (TokenType.PARENTHESIS_LEFT, '('),
+                                  (TokenType.NUMBER, '2.5'), (TokenType.PARENTHESIS_RIGHT, ')'),
+                                  (TokenType.MULTIPLICATION, '*'), (TokenType.IDENTIFIER, 'x_1')])
+
+    def testLongPaddedStatement(self):
+        self.assertTokenization('1' + ' + 1    ' * 100000, '')
+
+    def testErrorPosition(self):
+        tokenizer = Tokenizer('2 +   $ 3')
+        self.assertRaisesRegex(TokenizerError, r"unexpected token at pos 6: '\$ 3'", list, tokenizer)
+
     def testInvalidOperators1(self):
         self.assertTokenizationFails("2 + $")
 
@@ -0,0 +1,82 @@
+import random
+import unittest
+
+from numeric import FRACTION
+from prattparser import Parser, ParserError
+from tokenizer import TokenizerError
+from validation import (ARITY, INVALID_NUMBER, MISSING_ARGUMENTS, MISSING_OPERAND, MISSING_OPERATOR,
+                        UNCLOSED, UNEXPECTED_CHARACTER, UNEXPECTED_END, UNKNOWN_FUNCTION, UNKNOWN_VARIABLE,
+                        UNMATCHED, Diagnostic, validate)
+
+
+def spans(diagnostics: list[Diagnostic]) -> list[tuple]:
+    return [(diagnostic.code, diagnostic.start, diagnostic.end) for diagnostic in diagnostics]
+
+
+class TestValidation(unittest.TestCase):
+
+    def testValidSources(self):
+        for source in ['1 + 2', '-(-x)', 'max(1, 2, 3) ^ 2', 'if(x, 1, 2) + clamp(1, 2, 3)', ' sqrt( 4 ) ']:
+            self.assertEqual(validate(source), [], source)
+
+    def testSeveralErrors(self):
+        self.assertEqual(spans(validate('max(1) + * y', variables={'x'})),
+                         [(ARITY, 0, 6), (MISSING_OPERAND, 9, 10), (UNKNOWN_VARIABLE, 11, 12)])
+
+    def testSyntaxErrors(self):
+        self.assertEqual(spans(validate('1 +')), [(UNEXPECTED_END, 3, 3)])
+        self.assertEqual(spans(validate('1 2')), [(MISSING_OPERATOR, 2, 3)])
+        self.assertEqual(spans(validate('(1 + 2')), [(UNCLOSED, 0, 1)])
+        self.assertEqual(spans(validate('1 + 2)')), [(UNMATCHED, 5, 6)])
+        self.assertEqual(spans(validate('1, 2')), [(UNMATCHED, 1, 2)])
+        self.assertEqual(spans(validate('max(1,,2)')), [(MISSING_OPERAND, 6, 7)])
+        self.assertEqual(spans(validate('1 $$ 2')), [(UNEXPECTED_CHARACTER, 2, 4), (MISSING_OPERATOR, 5, 6)])
+
+    def testFunctions(self):
+        self.assertEqual(spans(validate('pow(1, 2, 3)')), [(ARITY, 0, 12)])
+        self.assertEqual(spans(validate('max (1)')), [(ARITY, 0, 7)])
+        self.assertEqual(spans(validate('1 + max   (1)')), [(ARITY, 4, 13)])
+        self.assertEqual(spans(validate('sin 3')), [(MISSING_ARGUMENTS, 0, 3), (MISSING_OPERATOR, 4, 5)])
+        self.assertEqual(spans(validate('foo(1)', variables={'foo'})), [(UNKNOWN_FUNCTION, 0, 3)])
+
+        parser = Parser()
+        parser.register_function('sum', lambda *values: sum(values), 1, None)
+        self.assertEqual(parser.validate('sum(1, 2, 3, 4)'), [])
+        self.assertEqual(spans(Parser().validate('sum(1, 2)')), [(UNKNOWN_FUNCTION, 0, 3)])
+
+    def testVariables(self):
+        self.assertEqual(validate('a + b'), [])
+        self.assertEqual(validate('a + b', variables={'a': 1, 'b': lambda: 2}), [])
+        self.assertEqual(spans(validate('a + b', variables={'a': 1})), [(UNKNOWN_VARIABLE, 4, 5)])
+
+    def testNumbersOfTheBackend(self):
+        self.assertEqual(Parser(backend=FRACTION).validate('1.5 + 2'), [])
+        self.assertEqual(spans(validate('1.5', literal=int)), [(INVALID_NUMBER, 0, 3)])
+
+    def testLimit(self):
+        self.assertEqual(len(validate('x $ ' * 100)), 10)
+        self.assertEqual(len(validate('x $ ' * 100, limit=3)), 3)
+
+    def testMessages(self):
+        arity, operand, variable = validate('max(1) + * y', variables=())
+        self.assertEqual(arity.message, 'function [max] received wrong number of parameters [1]')
+        self.assertEqual(operand.message, 'expected an operand at pos 9, found [*]')
+        self.assertEqual(str(variable), 'cannot resolve variable [y]')
+        self.assertEqual(variable.text, 'y')
+
+    def testAgreesWithTheParser(self):
+        tokens = ['1', '2.5', 'x', '+', '-', '*', '^', '(', ')', ',', 'max', 'sin', 'pow', 'foo', ' ', '#', '.']
+        parser = Parser()
+        generator = random.Random(7)
+        for _ in range(2000):
+            source = ''.join(generator.choice(tokens) for _ in range(generator.randint(1, 8)))
+            try:
+                parser.compile(source)
+                compiles = True
+            except (ParserError, TokenizerError):
+                compiles = False
+            self.assertEqual(compiles, not validate(source), source)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import math
+import unittest
+
+from prattparser import Parser, ParserError
+
+try:
+    import numpy as np
+    from vectorized import evaluate_batch
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestVectorizedEvaluation(unittest.TestCase):
+    rows = [
+        {'x': 1.0, 'y': 4.0},
+        {'x': 2.5, 'y': -1.0},
+        {'x': 0.5, 'y': 9.0},
+        {'x': 3.0, 'y': 2.0},
+    ]
+
+    def assertBatch(self, input_str):
+        columns = {name: [row[name] for row in self.rows] for name in self.rows[0]}
+        expression = Parser().compile(input_str)
+        expected = [expression.evaluate(row) for row in self.rows]
+        np.testing.assert_allclose(evaluate_batch(expression, columns), expected)
+
+    def testOperators(self):
+        self.assertBatch('1 + x * 2 - y / 4 ^ 2')
+
+    def testUnaryMinus(self):
+        self.assertBatch('-x ^ 2 + - - y')
+
+    def testFunctions(self):
+        self.assertBatch('sin(x) + cos(y) - tan(x) + sqrt(x) + log(x + 10, 2) + pow(x, 2)')
+
+    def testMaxMinAreElementwise(self):
+        self.assertBatch('max(x, y) - min(x, y)')
+
+    def testConditionalsAreElementwise(self):
+        self.assertBatch('if(x - 1, y, -y) + clamp(y, 0, x)')
+
+    def testBroadcastScalars(self):
+        expression = Parser().compile('x * k + 1')
+        result = evaluate_batch(expression, {'x': np.arange(3), 'k': 2})
+        np.testing.assert_array_equal(result, [1, 3, 5])
+
+    def testConstantExpression(self):
+        self.assertEqual(float(evaluate_batch(Parser().compile('2 ^ 3'), {})), 8)
+
+    def testLengthMismatch(self):
+        expression = Parser().compile('x + y')
+        self.assertRaises(ParserError, evaluate_batch, expression, {'x': [1, 2], 'y': [1, 2, 3]})
+
+    def testUnresolvedVariable(self):
+        self.assertRaises(ParserError, evaluate_batch, Parser().compile('x + z'), {'x': [1]})
+
+    def testVariadicMaxMin(self):
+        self.assertBatch('max(x, y, 2) - min(y, x, 1)')
+
+    def testRegisteredFunction(self):
+        parser = Parser()
+        parser.register_function('double', lambda value: 2 * value)
+        parser.register_function('triple', lambda value: 3 * value, vectorized=lambda value: value * 3)
+        result = evaluate_batch(parser.compile('double(x) + triple(x)'), {'x': [1, 2]})
+        np.testing.assert_array_equal(result, [5, 10])
+
+    def testFunctionRegisteredWithDefaultName(self):
+        parser = Parser()
+        parser.register_function('max', lambda *values: sum(values), 2, None)
+        np.testing.assert_array_equal(evaluate_batch(parser.compile('max(x, 1)'), {'x': [1, 2]}), [2, 3])
+
+    def testInvalidValuesAreNan(self):
+        self.assertTrue(math.isnan(evaluate_batch(Parser().compile('sqrt(x)'), {'x': [-1]})[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -24,8 +24,8 @@ class TokenType(str, Enum):
         return self.name
 
 
-# add new function here to correctly capture it
-# also edit prattparser.fn method
+# functions recognized by the default tokenizer, see `registry.FunctionRegistry`
+# to add new functions
 FUNCTION_LIST: list[str] = [
     'sin',
     'cos',
@@ -34,23 +34,51 @@ FUNCTION_LIST: list[str] = [
     'sqrt',
     'log',
     'max',
-    'min'
+    'min',
+    'if',
+    'clamp'
 ]
 
-TOKEN_SPEC: list[tuple] = [
-    (r'^\s+', None),
-    (r'^(?:\d+(?:\.\s*\d*)?)', TokenType.NUMBER),
-    (rf'^({'|'.join(FUNCTION_LIST)})', TokenType.FUNCTION),
-    (r'^[A-Za-z_][A-Za-z0-9_]*', TokenType.IDENTIFIER),
-    (r'^\+', TokenType.ADDITION),
-    (r'^\-', TokenType.SUBTRACTION),
-    (r'^\*', TokenType.MULTIPLICATION),
-    (r'^\/', TokenType.DIVISION),
-    (r'^\^', TokenType.EXPONENTIATION),
-    (r'^\(', TokenType.PARENTHESIS_LEFT),
-    (r'^\)', TokenType.PARENTHESIS_RIGHT),
-    (r'^,', TokenType.COMMA)
-]
+
+# longer names are tried first and a function name must not be followed by an
+# identifier character, e.g., `single` is an identifier, not `sin` + `gle`
+def token_spec(functions: list[str]) -> list[tuple]:
+    names = '|'.join(sorted(functions, key=len, reverse=True)) or '(?!)'
+    return [
+        (r'^\s+', None),
+        (r'^(?:\d+(?:\.\s*\d*)?)', TokenType.NUMBER),
+        (rf'^({names})(?![A-Za-z0-9_])', TokenType.FUNCTION),
+        (r'^[A-Za-z_][A-Za-z0-9_]*', TokenType.IDENTIFIER),
+        (r'^\+', TokenType.ADDITION),
+        (r'^\-', TokenType.SUBTRACTION),
+        (r'^\*', TokenType.MULTIPLICATION),
+        (r'^\/', TokenType.DIVISION),
+        (r'^\^', TokenType.EXPONENTIATION),
+        (r'^\(', TokenType.PARENTHESIS_LEFT),
+        (r'^\)', TokenType.PARENTHESIS_RIGHT),
+        (r'^,', TokenType.COMMA)
+    ]
+
+
+TOKEN_SPEC: list[tuple] = token_spec(FUNCTION_LIST)
+
+TokenPattern = namedtuple('TokenPattern', 'regex groups')
+
+
+# all rules of `TOKEN_SPEC` joined in a single pattern, tried in the same order.
+# Each rule is captured in a named group `T<index>` so the matched rule is
+# recovered from `lastgroup` without trying the patterns one by one.
+def compile_token_spec(token_spec: list[tuple]) -> TokenPattern:
+    groups = {}
+    alternatives = []
+    for index, (regex, type) in enumerate(token_spec):
+        name = f'T{index}'
+        groups[name] = type
+        alternatives.append(f'(?P<{name}>{regex.removeprefix("^")})')
+    return TokenPattern(re.compile('|'.join(alternatives)), groups)
+
+
+TOKEN_PATTERN: TokenPattern = compile_token_spec(TOKEN_SPEC)
 
 
 class TokenizerError(RuntimeError):
@@ -61,9 +89,10 @@ class TokenizerError(RuntimeError):
 Token = namedtuple('Token', 'type value')
 
 class Tokenizer:
-    def __init__(self, input: str):
+    def __init__(self, input: str, token_pattern: TokenPattern = TOKEN_PATTERN):
         self.input: str = input
         self.cursor: int = 0
+        self.token_pattern: TokenPattern = token_pattern
 
     def __iter__(self):
         self.reset()
@@ -81,34 +110,25 @@ class Tokenizer:
     def has_more_tokens(self):
         return self.cursor < len(self.input)
 
-    def match(self, regex: str, input_slice: str) -> str:
-        matched = re.match(regex, input_slice)
-        if matched is None:
-            return None
-
-        self.cursor += len(matched[0])
-        return matched[0]
-
     def get_next_token(self) -> tuple[TokenType, str]:
-        if not self.has_more_tokens():
-            return None
-
-        input_slice = self.input[self.cursor:]
-
-        for regex, type in TOKEN_SPEC:
-            token_value = self.match(regex, input_slice)
+        regex, groups = self.token_pattern
+        while self.has_more_tokens():
+            matched = regex.match(self.input, self.cursor)
 
             # no rule was matched
-            if token_value is None:
-                continue
+            if matched is None:
+                raise TokenizerError(f'unexpected token at pos {self.cursor}: \'{self.input_left_over()}\'')
+
+            self.cursor = matched.end()
+            type = groups[matched.lastgroup]
 
             # skip whitespace
             if type is None:
-                return self.get_next_token()
+                continue
 
-            return Token(type, token_value)
+            return Token(type, matched[0])
 
-        raise TokenizerError(f'unexpected token at pos {self.cursor}: \'{self.input_left_over()}\'')
+        return None
 
     def input_left_over(self) -> str:
         return self.input[self.cursor:]
@@ -0,0 +1,217 @@
+# Validation of expressions without compiling or evaluating them
+#
+# Checks the syntax of a source, the arity of its function calls and, given the
+# known variables, its variable names in a single pass over its tokens. Errors
+# are collected as `Diagnostic`s with the span of the source they refer to,
+# instead of raising on the first one. No exception is raised and no message is
+# formatted unless the diagnostic's `message` is read, so validating many
+# invalid sources costs about as much as validating valid ones.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+from typing import Callable, Collection
+
+from registry import DEFAULT_FUNCTIONS, FunctionRegistry
+from tokenizer import TokenType
+
+UNEXPECTED_CHARACTER = 'unexpected-character'
+INVALID_NUMBER = 'invalid-number'
+MISSING_OPERAND = 'missing-operand'
+MISSING_OPERATOR = 'missing-operator'
+UNEXPECTED_END = 'unexpected-end'
+UNMATCHED = 'unmatched'
+UNCLOSED = 'unclosed'
+MISSING_ARGUMENTS = 'missing-arguments'
+UNKNOWN_FUNCTION = 'unknown-function'
+ARITY = 'arity'
+UNKNOWN_VARIABLE = 'unknown-variable'
+
+MESSAGES: dict[str, str] = {
+    UNEXPECTED_CHARACTER: 'unexpected characters at pos {start}: \'{text}\'',
+    INVALID_NUMBER: 'cannot convert {text} into a valid number',
+    MISSING_OPERAND: 'expected an operand at pos {start}, found [{text}]',
+    MISSING_OPERATOR: 'expected an operator at pos {start}, found [{text}]',
+    UNEXPECTED_END: 'unexpected end of input at pos {start}',
+    UNMATCHED: 'unmatched [{text}] at pos {start}',
+    UNCLOSED: 'parenthesis opened at pos {start} is never closed',
+    MISSING_ARGUMENTS: 'function [{text}] must be followed by its arguments in parentheses',
+    UNKNOWN_FUNCTION: 'unknown function [{text}]',
+    ARITY: 'function [{name}] received wrong number of parameters [{count}]',
+    UNKNOWN_VARIABLE: 'cannot resolve variable [{text}]',
+}
+
+OPERATORS = frozenset((TokenType.ADDITION, TokenType.SUBTRACTION, TokenType.MULTIPLICATION, TokenType.DIVISION,
+                       TokenType.EXPONENTIATION))
+
+
+class Diagnostic:
+    """
+    An error found by `validate`, spanning `source[start:end]`. `code` is one
+    of the constants of this module, the message is built when it is read.
+    """
+    __slots__ = ('code', 'start', 'end', 'source', 'details')
+
+    def __init__(self, code: str, start: int, end: int, source: str, details: dict = None):
+        self.code = code
+        self.start = start
+        self.end = end
+        self.source = source
+        self.details = details
+
+    @property
+    def text(self) -> str:
+        return self.source[self.start:self.end]
+
+    @property
+    def message(self) -> str:
+        return MESSAGES[self.code].format(start=self.start, end=self.end, text=self.text, **(self.details or {}))
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f'Diagnostic({self.code!r}, {self.start}, {self.end})'
+
+    def __eq__(self, other):
+        if not isinstance(other, Diagnostic):
+            return False
+        return (self.code, self.start, self.end, self.details) == (other.code, other.start, other.end, other.details)
+
+
+def validate(source: str, functions: FunctionRegistry = DEFAULT_FUNCTIONS, variables: Collection[str] = None,
+             literal: Callable[[str], any] = float, limit: int = 10) -> list[Diagnostic]:
+    """
+    Returns the errors of `source`, an empty list if it compiles:
+        ```
+        validate('max(1) + * y', variables={'x'})
+        # [Diagnostic('arity', 0, 6), Diagnostic('missing-operand', 9, 10), Diagnostic('unknown-variable', 11, 12)]
+        ```
+
+    Variables are checked only if `variables` is given (any collection, e.g. a
+    runtime). `literal` converts number literals, as the backend of a parser
+    does. Validation stops after `limit` errors. The rules are the ones of
+    `Parser.compile`.
+    """
+    regex, groups = functions.token_pattern
+    diagnostics: list[Diagnostic] = []
+    # open parentheses: [start, function name or None, start of the name, number
+    # of arguments]
+    groups_stack: list[list] = []
+    expect_operand = True
+    # a function name waiting for its "("
+    function_start = None
+    previous_type = previous_start = None
+    previous_end = 0
+    cursor, length = 0, len(source)
+
+    while cursor < length and len(diagnostics) < limit:
+        matched = regex.match(source, cursor)
+        if matched is None:
+            # skip the characters no rule matches, reported as one error
+            start = cursor
+            cursor += 1
+            while cursor < length and regex.match(source, cursor) is None:
+                cursor += 1
+            diagnostics.append(Diagnostic(UNEXPECTED_CHARACTER, start, cursor, source))
+            continue
+
+        token_type = groups[matched.lastgroup]
+        start, cursor = cursor, matched.end()
+        if token_type is None:
+            continue
+
+        if function_start is not None:
+            if token_type == TokenType.PARENTHESIS_LEFT:
+                groups_stack.append([start, source[function_start:previous_end], function_start, 1])
+                function_start = None
+                previous_type, previous_start, previous_end = token_type, start, cursor
+                continue
+
+            # recovers as if the function name was a variable
+            diagnostics.append(Diagnostic(MISSING_ARGUMENTS, function_start, previous_end, source))
+            function_start = None
+            expect_operand = False
+
+        if expect_operand:
+            if token_type == TokenType.NUMBER:
+                try:
+                    literal(source[start:cursor])
+                except (ValueError, ArithmeticError):
+                    diagnostics.append(Diagnostic(INVALID_NUMBER, start, cursor, source))
+                expect_operand = False
+            elif token_type == TokenType.IDENTIFIER:
+                if variables is not None and source[start:cursor] not in variables:
+                    diagnostics.append(Diagnostic(UNKNOWN_VARIABLE, start, cursor, source))
+                expect_operand = False
+            elif token_type == TokenType.FUNCTION:
+                function_start = start
+            elif token_type == TokenType.PARENTHESIS_LEFT:
+                groups_stack.append([start, None, start, 1])
+            elif token_type == TokenType.SUBTRACTION:
+                # unary minus
+                pass
+            else:
+                diagnostics.append(Diagnostic(MISSING_OPERAND, start, cursor, source))
+                # `)` and `,` are still applied, so the parentheses stay balanced
+                if token_type in (TokenType.PARENTHESIS_RIGHT, TokenType.COMMA):
+                    close_or_separate(token_type, start, cursor, source, functions, groups_stack, diagnostics)
+
+        elif token_type in OPERATORS:
+            expect_operand = True
+        elif token_type in (TokenType.PARENTHESIS_RIGHT, TokenType.COMMA):
+            expect_operand = close_or_separate(token_type, start, cursor, source, functions, groups_stack,
+                                               diagnostics)
+        elif token_type == TokenType.PARENTHESIS_LEFT and previous_type == TokenType.IDENTIFIER:
+            # a call of a function that is not registered, e.g. `foo(1)`
+            if diagnostics and diagnostics[-1].code == UNKNOWN_VARIABLE and diagnostics[-1].start == previous_start:
+                diagnostics.pop()
+            diagnostics.append(Diagnostic(UNKNOWN_FUNCTION, previous_start, previous_end, source))
+            groups_stack.append([start, source[previous_start:previous_end], previous_start, 1])
+            expect_operand = True
+        else:
+            # recovers as if an operator was missing
+            diagnostics.append(Diagnostic(MISSING_OPERATOR, start, cursor, source))
+            expect_operand = True
+            cursor = start
+            continue
+
+        previous_type, previous_start, previous_end = token_type, start, cursor
+
+    if len(diagnostics) >= limit:
+        return diagnostics[:limit]
+
+    if function_start is not None:
+        diagnostics.append(Diagnostic(MISSING_ARGUMENTS, function_start, previous_end, source))
+    elif expect_operand:
+        diagnostics.append(Diagnostic(UNEXPECTED_END, length, length, source))
+
+    for start, *_ in reversed(groups_stack):
+        diagnostics.append(Diagnostic(UNCLOSED, start, start + 1, source))
+
+    return diagnostics[:limit]
+
+
+# applies a `)` or a `,` to the innermost parenthesis, returns whether an operand
+# is expected next
+def close_or_separate(token_type: TokenType, start: int, end: int, source: str, functions: FunctionRegistry,
+                      groups_stack: list[list], diagnostics: list[Diagnostic]) -> bool:
+    if token_type == TokenType.COMMA:
+        if groups_stack and groups_stack[-1][1] is not None:
+            groups_stack[-1][3] += 1
+        else:
+            diagnostics.append(Diagnostic(UNMATCHED, start, end, source))
+        return True
+
+    if not groups_stack:
+        diagnostics.append(Diagnostic(UNMATCHED, start, end, source))
+        return False
+
+    _, name, name_start, count = groups_stack.pop()
+    # the arity of unknown functions was not checked
+    if name is not None and name in functions:
+        function = functions[name]
+        if count < function.min_arity or (function.max_arity is not None and count > function.max_arity):
+            diagnostics.append(Diagnostic(ARITY, name_start, end, source, {'name': name, 'count': count}))
+    return False
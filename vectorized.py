@@ -0,0 +1,141 @@
+# Vectorized evaluation of compiled expressions with NumPy
+#
+# Instead of evaluating an expression once per row, the whole expression is
+# evaluated once with array operations over the columns of a table. NumPy is an
+# optional dependency, it is only required when this module is used.
+#
+# The project is under MIT License
+#
+# Author: Adalberto R. Sampaio Jr (@adalrsjr1) [2023]
+
+import functools
+import math
+
+import registry
+import syntaxtree
+from prattparser import Expression, ParserError
+from registry import DEFAULT_FUNCTIONS, Function, FunctionRegistry
+from syntaxtree import Node
+from tokenizer import TokenType
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _log(value, base):
+    return np.log(value) / np.log(base)
+
+
+def _maximum(*values):
+    return functools.reduce(np.maximum, values)
+
+
+def _minimum(*values):
+    return functools.reduce(np.minimum, values)
+
+
+def _choose(condition, then, otherwise):
+    return np.where(condition != 0, then, otherwise)
+
+
+def _clamp(value, low, high):
+    return np.where(value < low, low, np.where(value > high, high, value))
+
+
+# elementwise equivalents of the default functions, keyed by their scalar
+# callable so a function registered under the same name is not replaced
+VECTORIZED_FUNCTIONS: dict[callable, callable] = {} if np is None else {
+    math.sin: np.sin,
+    math.cos: np.cos,
+    math.tan: np.tan,
+    math.sqrt: np.sqrt,
+    math.log: _log,
+    math.pow: np.power,
+    max: _maximum,
+    min: _minimum,
+    registry.choose: _choose,
+    registry.clamp: _clamp,
+}
+
+VECTORIZED_OPERATORS: dict[TokenType, callable] = {} if np is None else {
+    TokenType.ADDITION: np.add,
+    TokenType.SUBTRACTION: np.subtract,
+    TokenType.MULTIPLICATION: np.multiply,
+    TokenType.DIVISION: np.true_divide,
+    TokenType.EXPONENTIATION: np.power,
+}
+
+
+def columns_of(runtime: dict) -> dict:
+    """
+    Converts every runtime value into a float array, scalars become 0-d arrays
+    and are broadcast against the columns. All columns must have the same
+    length.
+    """
+    columns = {}
+    length = None
+    for name, value in runtime.items():
+        column = np.asarray(value, dtype=float)
+        if column.ndim > 0:
+            if length is not None and len(column) != length:
+                raise ParserError(f'column [{name}] has length [{len(column)}], expected [{length}]')
+            length = len(column)
+        columns[name] = column
+    return columns
+
+
+# prefer the `vectorized` callable of the registry, then the NumPy equivalent
+# of a default function, falling back to calling the scalar function per row
+def vectorize(function: Function) -> callable:
+    if function.vectorized is not None:
+        return function.vectorized
+
+    try:
+        return VECTORIZED_FUNCTIONS[function.callable]
+    except (KeyError, TypeError):
+        return np.vectorize(function.callable, otypes=[float])
+
+
+def evaluate_node(node: Node, columns: dict, functions: FunctionRegistry = DEFAULT_FUNCTIONS):
+    node_type = node.type
+
+    if node_type == TokenType.NUMBER:
+        return np.float64(node.value)
+
+    if node_type == TokenType.IDENTIFIER:
+        try:
+            return columns[node.value]
+        except KeyError:
+            raise ParserError(f'cannot resolve variable [{node.value}]')
+
+    # the arity was checked when the expression was compiled
+    if node_type == TokenType.FUNCTION:
+        function = vectorize(functions[node.value])
+        return function(*[evaluate_node(child, columns, functions) for child in node.children])
+
+    if syntaxtree.is_unary(node):
+        return np.negative(evaluate_node(node.children[0], columns, functions))
+
+    left = evaluate_node(node.children[0], columns, functions)
+    right = evaluate_node(node.children[1], columns, functions)
+    return VECTORIZED_OPERATORS[node_type](left, right)
+
+
+def evaluate_batch(expression: Expression, runtime: dict):
+    """
+    Evaluates `expression` once for all rows of `runtime`, a dictionary mapping
+    each variable to a column (any sequence accepted by `numpy.asarray`) or to a
+    scalar. Returns a NumPy array with one result per row, invalid operations
+    (e.g. `sqrt` of a negative number) produce `nan` instead of raising:
+        ```
+        expression = Parser().compile('max(x, y) * 2 + 1')
+        evaluate_batch(expression, {'x': np.arange(1_000_000), 'y': 10})
+        ```
+    """
+    if np is None:
+        raise ImportError('vectorized evaluation requires numpy: pip install numpy')
+
+    with np.errstate(all='ignore'):
+        return np.asarray(evaluate_node(expression.tree, columns_of(runtime), expression.functions))